@@ -0,0 +1,126 @@
+# /scripts/bench_db.py
+"""
+Per-call latency of MediaDB helpers: connect-per-call vs. pooled connections.
+
+    python scripts/bench_db.py [--rows 2000] [--threads 8]
+
+The "legacy" column re-creates the old ``MediaDB.conn()`` behaviour
+(fresh connection, three PRAGMAs, ``wal_checkpoint(TRUNCATE)`` on close);
+the "pooled" column calls the real helpers.  Both run against a throw-away
+database in a temp directory.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Import video.db without running video/__init__ (which boots the full stack)
+os.environ.setdefault("VIDEO_DATA_DIR", tempfile.mkdtemp(prefix="bench_data_"))
+_pkg = types.ModuleType("video")
+_pkg.__path__ = [str(ROOT / "video")]
+sys.modules.setdefault("video", _pkg)
+
+from video.db import MediaDB  # noqa: E402
+
+
+def _row(i: int) -> dict:
+    return {
+        "id": f"{i:040x}", "path": f"/bench/{i // 100}/{i}.mp4",
+        "size_bytes": i, "mtime": "2024-01-01T00:00:00", "mime": "video/mp4",
+        "width_px": 1920, "height_px": 1080, "duration_s": 1.0,
+        "batch": f"b{i % 10}", "sha1": f"{i:040x}",
+        "created_at": "2024-01-01T00:00:00", "preview_path": None,
+    }
+
+
+@contextmanager
+def _legacy_conn(db_path: Path):
+    cx = sqlite3.connect(db_path, timeout=30, check_same_thread=False,
+                         isolation_level=None)
+    cx.row_factory = sqlite3.Row
+    cx.execute("PRAGMA foreign_keys=ON;")
+    cx.execute("PRAGMA busy_timeout=5000;")
+    cx.execute("PRAGMA cache_size = -2000;")
+    try:
+        yield cx
+        cx.commit()
+        cx.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    finally:
+        cx.close()
+
+
+def _timed(fn, n: int, threads: int) -> list[float]:
+    samples: list[float] = []
+    lock = threading.Lock()
+
+    def _one(i: int) -> None:
+        t0 = time.perf_counter()
+        fn(i)
+        dt = time.perf_counter() - t0
+        with lock:
+            samples.append(dt)
+
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(_one, range(n)))
+    return samples
+
+
+def _fmt(name: str, legacy: list[float], pooled: list[float]) -> str:
+    def _us(xs, q):
+        return statistics.quantiles(xs, n=100)[q - 1] * 1e6
+    lm, pm = statistics.mean(legacy) * 1e6, statistics.mean(pooled) * 1e6
+    return (f"{name:<18} legacy mean {lm:8.1f}µs p95 {_us(legacy, 95):8.1f}µs │ "
+            f"pooled mean {pm:8.1f}µs p95 {_us(pooled, 95):8.1f}µs │ ×{lm / pm:5.1f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--threads", type=int, default=(os.cpu_count() or 2) * 2)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_db_"))
+    db = MediaDB(tmp / "bench.sqlite3")
+    upsert_sql = """
+        INSERT INTO files (id, path, size_bytes, mtime, mime, width_px, height_px,
+                           duration_s, batch, sha1, created_at, version, parent_id, preview_path)
+        VALUES (:id, :path, :size_bytes, :mtime, :mime, :width_px, :height_px,
+                :duration_s, :batch, :sha1, :created_at, 1, NULL, :preview_path)
+        ON CONFLICT(path) DO UPDATE SET size_bytes = excluded.size_bytes
+    """
+
+    def legacy_upsert(i):
+        with _legacy_conn(db.db_path) as cx:
+            cx.execute(upsert_sql, _row(i))
+
+    def legacy_get(i):
+        with _legacy_conn(db.db_path) as cx:
+            cx.execute("SELECT * FROM files WHERE path = ?", (_row(i)["path"],)).fetchone()
+
+    n, t = args.rows, args.threads
+    lu = _timed(legacy_upsert, n, t)
+    lg = _timed(legacy_get, n, t)
+    db.clean_all()
+    pu = _timed(lambda i: db.upsert_file(_row(i)), n, t)
+    pg = _timed(lambda i: db.get_file_by_path(_row(i)["path"]), n, t)
+
+    print(f"{n} calls × {t} threads, profile={os.getenv('VIDEO_DB_PROFILE', 'default')}")
+    print(_fmt("upsert_file", lu, pu))
+    print(_fmt("get_file_by_path", lg, pg))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
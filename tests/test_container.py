@@ -0,0 +1,104 @@
+# tests/test_container.py
+"""
+Header-only MP4/MOV + Matroska parsing.
+Run with `pytest -q tests/test_container.py`
+"""
+import struct
+
+from video.container import parse_header
+
+
+def _box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _full(kind: bytes, body: bytes, version: int = 0) -> bytes:
+    return _box(kind, bytes([version, 0, 0, 0]) + body)
+
+
+def _trak(handler: bytes, entry: bytes, matrix=(1, 0, 0, 1), wh=(0, 0)) -> bytes:
+    a, b, c, d = (v << 16 & 0xFFFFFFFF for v in matrix)
+    tkhd = _full(b"tkhd", struct.pack(">IIIII", 0, 0, 1, 0, 900) + b"\0" * 16 +
+                 struct.pack(">9I", a, b, 0, c, d, 0, 0, 0, 0x40000000) +
+                 struct.pack(">II", wh[0] << 16, wh[1] << 16))
+    mdhd = _full(b"mdhd", struct.pack(">IIII", 0, 0, 1000, 3000) + b"\0" * 4)
+    hdlr = _full(b"hdlr", b"\0" * 4 + handler + b"\0" * 12)
+    dref = _full(b"hdlr", b"mhlr" + b"alis" + b"\0" * 12)       # QuickTime data handler
+    stsd = _full(b"stsd", struct.pack(">I", 1) + entry)
+    stbl = _box(b"stbl", stsd)
+    minf = _box(b"minf", dref + stbl)
+    return _box(b"trak", tkhd + _box(b"mdia", mdhd + hdlr + minf))
+
+
+def _mp4(tmp_path, name="clip.mov", fragmented=False):
+    video = _box(b"hvc1", b"\0" * 6 + b"\0\1" + b"\0" * 16 +
+                 struct.pack(">HH", 3840, 2160) + b"\0" * 50)
+    audio = _box(b"mp4a", b"\0" * 6 + b"\0\1" + b"\0" * 8 +
+                 struct.pack(">HHHHI", 2, 16, 0, 0, 48000 << 16))
+    mvhd = _full(b"mvhd", struct.pack(">IIII", 3_700_000_000, 0, 600, 1800) + b"\0" * 80)
+    moov = _box(b"moov", mvhd + _trak(b"vide", video, matrix=(0, 1, -1, 0)) +
+                _trak(b"soun", audio))
+    data = _box(b"ftyp", b"qt  \0\0\0\0qt  ") + _box(b"mdat", b"\xAB" * 4096) + moov
+    if fragmented:
+        data += _box(b"moof", b"\0" * 8)
+    p = tmp_path / name
+    p.write_bytes(data)
+    return p
+
+
+def _ebml(eid: int, payload: bytes) -> bytes:
+    idb = eid.to_bytes((eid.bit_length() + 7) // 8, "big")
+    return idb + bytes([0x01]) + len(payload).to_bytes(7, "big") + payload
+
+
+def _uint(eid: int, v: int) -> bytes:
+    return _ebml(eid, v.to_bytes(2, "big"))
+
+
+def test_mp4_moov_at_end(tmp_path):
+    info = parse_header(_mp4(tmp_path))
+    assert info["source"] == "header"
+    assert float(info["format"]["duration"]) == 3.0
+    assert info["format"]["tags"]["creation_time"].startswith("2021-")
+    v, a = info["streams"]
+    assert (v["codec_name"], v["width"], v["height"]) == ("hevc", 3840, 2160)
+    assert v["side_data_list"] == [{"rotation": -90}]
+    assert (a["codec_name"], a["channels"], a["sample_rate"]) == ("aac", 2, "48000")
+
+
+def test_mkv_info_and_tracks(tmp_path):
+    info = _ebml(0x1549A966, _ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big")) +
+                 _ebml(0x4489, struct.pack(">d", 12_500.0)))
+    video = _ebml(0xAE, _uint(0x83, 1) + _ebml(0x86, b"V_VP9") +
+                  _ebml(0xE0, _uint(0xB0, 1920) + _uint(0xBA, 1080)))
+    audio = _ebml(0xAE, _uint(0x83, 2) + _ebml(0x86, b"A_OPUS") +
+                  _ebml(0xE1, _uint(0x9F, 2) + _ebml(0xB5, struct.pack(">f", 48000.0))))
+    seg = _ebml(0x18538067, info + _ebml(0x1654AE6B, video + audio) +
+                _ebml(0x1F43B675, b"\0" * 64))
+    p = tmp_path / "clip.webm"
+    p.write_bytes(_ebml(0x1A45DFA3, _ebml(0x4282, b"webm")) + seg)
+
+    got = parse_header(p)
+    assert float(got["format"]["duration"]) == 12.5
+    v, a = got["streams"]
+    assert (v["codec_name"], v["width"], v["height"]) == ("vp9", 1920, 1080)
+    assert (a["codec_name"], a["sample_rate"]) == ("opus", "48000")
+
+
+def test_unparseable_files_fall_back(tmp_path, monkeypatch):
+    assert parse_header(_mp4(tmp_path, "frag.mp4", fragmented=True)) is None
+    junk = tmp_path / "junk.mp4"
+    junk.write_bytes(b"\xff" * 1000)
+    assert parse_header(junk) is None
+    for i, data in enumerate((b"", bytes.fromhex("1A45DFA3"),
+                              _ebml(0x1A45DFA3, _ebml(0x4282, b"webm")))):
+        cut = tmp_path / f"cut{i}.mkv"                  # truncated after the EBML header
+        cut.write_bytes(data)
+        assert parse_header(cut) is None
+
+    from video import probe
+    calls = []
+    monkeypatch.setattr(probe, "probe_media", lambda p, timeout=10: calls.append(p) or None)
+    assert probe.probe_cached(_mp4(tmp_path), "x" * 40, db=None)["source"] == "header"
+    assert probe.probe_cached(junk, "y" * 40, db=None) is None
+    assert calls == [junk]                              # ffprobe only for the failure
@@ -0,0 +1,445 @@
+# tests/test_db.py
+"""
+MediaDB unit tests – run against a throw-away SQLite file.
+Run with `pytest -q tests/test_db.py`
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from video.db import SCHEMA_VERSION, SQL_PROFILER, MediaDB, migrate
+
+
+def _row(i: int, **over) -> dict:
+    row = {
+        "id": f"{i:040x}", "path": f"/media/d{i % 3}/f{i}.mp4",
+        "size_bytes": 100 + i, "mtime": "2024-01-01T00:00:00",
+        "mime": "video/mp4", "width_px": 1920, "height_px": 1080,
+        "duration_s": 1.5, "batch": f"b{i % 2}", "sha1": f"{i:040x}",
+        "created_at": f"2024-01-01T00:00:{i % 60:02d}", "preview_path": None,
+    }
+    row.update(over)
+    return row
+
+
+@pytest.fixture
+def db(tmp_path):
+    d = MediaDB(tmp_path / "media.sqlite3")
+    yield d
+    d.close()
+
+
+def test_pool_reuses_connection_per_thread(db):
+    with db.conn() as a:
+        pass
+    with db.conn() as b:
+        pass
+    assert a is b
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(db._get_pool().reader()))
+    t.start(); t.join()
+    assert other[0] is not a
+
+
+def test_parallel_upserts_and_reads(db):
+    def _work(k):
+        for i in range(k * 25, k * 25 + 25):
+            db.upsert_file(_row(i))
+            assert db.get_file_by_path(_row(i)["path"]) is not None
+
+    threads = [threading.Thread(target=_work, args=(k,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert db.get_stats()["total_files"] == 100
+
+
+def test_writer_rolls_back_on_error(db):
+    with pytest.raises(RuntimeError):
+        with db.writer() as cx:
+            cx.execute("INSERT INTO copies(sha1, dest, ts) VALUES ('x', '/x', 0)")
+            raise RuntimeError("boom")
+    assert not db.already_copied("x")
+
+
+def test_close_then_reuse(db):
+    db.upsert_file(_row(1))
+    db.close()
+    assert db.get_file_by_path(_row(1)["path"])["sha1"] == _row(1)["sha1"]
+
+
+def test_upsert_many_keeps_version_semantics(db):
+    assert db.upsert_many([_row(1), _row(2)]) == 2
+    # same path, new content → version bump + parent_id = previous id
+    db.upsert_many([_row(1, id="new", sha1="new")])
+    rec = db.get_file_by_path(_row(1)["path"])
+    assert rec["version"] == 2
+    assert rec["parent_id"] == _row(1)["id"]
+
+
+def test_unit_of_work_batches_and_flushes(db):
+    with db.unit_of_work(batch_rows=10, batch_secs=60) as uow:
+        for i in range(25):
+            uow.upsert(_row(i))
+        assert uow.written == 20 and uow.pending == 5
+    assert uow.written == 25
+    assert db.get_stats()["total_files"] == 25
+
+
+@pytest.mark.parametrize("writer_thread", [False, True])
+def test_unit_of_work_skips_duplicate_content(tmp_path, writer_thread):
+    db = MediaDB(tmp_path / "dup.sqlite3", writer_thread=writer_thread)
+    try:
+        copy = _row(3, path="/media/elsewhere/copy.mp4")   # same id, new path
+        with db.unit_of_work(batch_rows=8) as uow:
+            for i in range(20):
+                uow.upsert(_row(i))
+                if i == 10:
+                    uow.upsert(copy)
+        assert uow.written == 20 and uow.pending == 0
+        assert [r["path"] for r, _ in uow.rejected] == [copy["path"]]
+        assert "UNIQUE" in uow.rejected[0][1]
+        assert db.get_stats()["total_files"] == 20
+        assert db.get_file_by_path(copy["path"]) is None
+
+        # without a rejected list the batch is all-or-nothing, as before
+        with pytest.raises(sqlite3.IntegrityError):
+            res = db.upsert_many([_row(30), _row(31, path="/media/x.mp4", id=_row(30)["id"])])
+            if not isinstance(res, int):
+                res.result(timeout=10)
+        assert db.get_file_by_path(_row(30)["path"]) is None
+    finally:
+        db.close()
+
+
+def test_unit_of_work_keeps_rows_when_a_flush_fails(db, monkeypatch):
+    real = db.upsert_many
+    calls = []
+
+    def flaky(rows, rejected=None, **kw):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("disk I/O error")
+        return real(rows, rejected, **kw)
+
+    monkeypatch.setattr(db, "upsert_many", flaky)
+    with db.unit_of_work(batch_rows=5, batch_secs=60) as uow:
+        for i in range(4):
+            uow.upsert(_row(i))
+        with pytest.raises(sqlite3.OperationalError):
+            uow.upsert(_row(4))                    # 5th row triggers the failing flush
+        assert uow.pending == 5 and uow.written == 0
+    assert calls == [5, 5] and uow.written == 5
+    assert db.get_stats()["total_files"] == 5
+
+
+@pytest.mark.parametrize("writer_thread", [False, True])
+def test_unit_of_work_records_copies_with_their_rows(tmp_path, writer_thread, monkeypatch):
+    db = MediaDB(tmp_path / "copies.sqlite3", writer_thread=writer_thread)
+    try:
+        with db.unit_of_work(batch_rows=2, batch_secs=60) as uow:
+            uow.remember_copy("s1", tmp_path / "a.jpg")
+            uow.upsert(_row(1))
+            assert uow.already_copied("s1") and not db.already_copied("s1")
+            uow.remember_copy("s2", tmp_path / "b.jpg")
+            uow.upsert(_row(2))                        # batch full → both commit
+            uow.wait()
+            assert db.already_copied("s1") and db.already_copied("s2")
+
+        def failing(rows, rejected=None, **kw):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        with monkeypatch.context() as m, pytest.raises(sqlite3.OperationalError):
+            m.setattr(db, "upsert_many", failing)
+            with db.unit_of_work(batch_rows=1, batch_secs=60) as uow:
+                uow.remember_copy("s3", tmp_path / "c.jpg")
+                uow.upsert(_row(3))
+        assert not db.already_copied("s3") and db.get_file_by_path(_row(3)["path"]) is None
+    finally:
+        db.close()
+
+
+def test_partial_rows_bind(db):
+    row = {k: v for k, v in _row(3).items() if k != "preview_path"}
+    db.upsert_file(row)
+    assert db.get_file_by_path(row["path"])["preview_path"] is None
+
+
+def test_writer_thread_group_commits(tmp_path):
+    db = MediaDB(tmp_path / "wq.sqlite3", writer_thread=True)
+    try:
+        futs = [db.upsert_file(_row(i)) for i in range(50)]
+        futs[-1].result(timeout=10)
+        assert db.get_file_by_path(_row(49)["path"]) is not None
+
+        bad = db.upsert_file({"path": "/no/id"})        # required columns missing
+        with pytest.raises(Exception):
+            bad.result(timeout=10)
+
+        with db.unit_of_work(batch_rows=7) as uow:
+            for i in range(50, 80):
+                uow.upsert(_row(i))
+        assert db.get_stats()["total_files"] == 80
+
+        st = db.writer_stats()
+        assert st["mode"] == "writer-thread"
+        assert st["ops"] >= 51 and st["commits"] < st["ops"]
+        assert st["errors"] == 1
+    finally:
+        db.close()
+
+
+def test_keyset_pagination_recent(db):
+    db.upsert_many(_row(i, created_at="2024-01-01T00:00:00") for i in range(23))
+    seen, cursor = [], None
+    while True:
+        page = db.page_recent(limit=5, cursor=cursor)
+        seen += [r["id"] for r in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 23           # ties broken by id
+
+
+def test_keyset_pagination_batch(db):
+    db.upsert_many(_row(i, batch="b") for i in range(12))
+    with db.writer() as cx:
+        cx.execute("UPDATE files SET sort_order = 1 WHERE id = ?", (_row(0)["id"],))
+    first = db.page_by_batch("b", limit=10)
+    rest = db.page_by_batch("b", limit=10, cursor=first["next_cursor"])
+    ids = [r["id"] for r in first["items"] + rest["items"]]
+    assert len(ids) == 12 and ids[-1] == _row(0)["id"]
+    assert rest["next_cursor"] is None
+
+
+def test_bad_cursor_rejected(db):
+    with pytest.raises(ValueError):
+        db.list_recent(cursor="not-a-cursor")
+
+
+def test_stats_follow_triggers_and_rebuild(db):
+    db.upsert_many([_row(1), _row(2), _row(3, mime=None, batch=None)])
+    db.upsert_many([_row(2, id="x", sha1="x", size_bytes=1000, batch="moved")])
+    with db.writer() as cx:
+        cx.execute("DELETE FROM files WHERE path = ?", (_row(1)["path"],))
+    st = db.get_stats()
+    assert st["total_files"] == 2
+    assert st["total_size_bytes"] == 1000 + _row(3)["size_bytes"]
+    assert {r["batch"]: r["count"] for r in st["by_batch"]} == {"moved": 1}
+    assert None in {r["mime"] for r in st["by_mime"]}
+
+    with db.writer() as cx:                             # simulate drift
+        cx.execute("UPDATE stats_totals SET files = 99")
+    assert db.rebuild_stats()["after"]["files"] == 2
+    assert db.get_stats() == st
+
+
+def test_migrations_upgrade_legacy_db(tmp_path):
+    path = tmp_path / "old.sqlite3"
+    cx = sqlite3.connect(path)
+    cx.executescript("""
+        CREATE TABLE files (id TEXT PRIMARY KEY, path TEXT UNIQUE NOT NULL,
+            size_bytes INTEGER NOT NULL, mtime TEXT NOT NULL, mime TEXT,
+            width_px INTEGER, height_px INTEGER, duration_s REAL, batch TEXT,
+            sha1 TEXT, created_at TEXT NOT NULL);
+        INSERT INTO files VALUES ('a', '/m/a.mp4', 10, '2024', 'video/mp4',
+            NULL, NULL, NULL, 'b', 'a', '2024');
+    """)
+    cx.close()
+
+    db = MediaDB(path)
+    try:
+        assert db.schema_version() == SCHEMA_VERSION
+        rec = db.get_file_by_path("/m/a.mp4")
+        assert rec["tags"] == "[]" and rec["updated_at"] == "2024"
+        assert db.get_stats()["total_files"] == 1
+        assert db.search_files("a")                     # FTS built on upgrade
+        with db.writer() as cx:                         # replay is a no-op
+            assert migrate(cx) == []
+    finally:
+        db.close()
+
+
+def test_hot_queries_use_indexes(db):
+    plans = {
+        "recent": "SELECT * FROM files ORDER BY created_at DESC, id DESC LIMIT 5",
+        "batch" : "SELECT * FROM files WHERE batch = 'b' "
+                  "ORDER BY sort_order, created_at DESC, id DESC",
+        "prefix": "SELECT * FROM files WHERE path >= '/m/' AND path < '/m0'",
+    }
+    for name, sql in plans.items():
+        plan = " ".join(r[3] for r in db.query("EXPLAIN QUERY PLAN " + sql))
+        assert "USING" in plan and "TEMP B-TREE" not in plan, (name, plan)
+
+
+def test_cleanup_missing_files_chunks_and_resumes(db, tmp_path):
+    lib = tmp_path / "lib"
+    for d in ("a", "b"):
+        (lib / d).mkdir(parents=True)
+    rows = []
+    for i in range(10):
+        p = lib / ("a" if i < 6 else "b") / f"f{i}.mp4"
+        if i % 2 == 0:
+            p.touch()
+        rows.append(_row(i, path=str(p)))
+    rows.append(_row(99, path=str(tmp_path / "gone" / "x.mp4")))
+    db.upsert_many(rows)
+
+    seen = []
+    assert db.cleanup_missing_files(chunk_rows=4, progress=seen.append) == 6
+    assert [p["scanned"] for p in seen] == [4, 8, 11]
+    assert seen[-1]["dirs"] == 3                        # one scandir per directory
+    assert db.get_stats()["total_files"] == 5
+
+    (lib / "b" / "f6.mp4").unlink()
+    assert db.cleanup_missing_files(resume_after=str(lib / "a" / "z")) == 1
+    assert db.get_file_by_path(str(lib / "a" / "f0.mp4")) is not None
+
+
+def test_search_trigram_substring_and_mime(db):
+    db.upsert_many([
+        _row(1, path="/m/2024_holiday_beach.mp4"),
+        _row(2, path="/m/beachside.jpg", mime="image/jpeg"),
+        _row(3, path="/m/office.mp4"),
+    ])
+    hits = {r["path"] for r in db.search_files("liday_bea")}
+    assert hits == {"/m/2024_holiday_beach.mp4"}
+    assert {r["path"] for r in db.search_files("beach", mime="image/jpeg")} == {"/m/beachside.jpg"}
+    assert db.search_files('bad"-(syntax') == []       # user input is quoted
+
+    # renames and deletes must not leave stale tokens in either index
+    with db.writer() as cx:
+        cx.execute("UPDATE files SET path = '/m/work.mp4' WHERE path = '/m/office.mp4'")
+        cx.execute("DELETE FROM files WHERE path = '/m/beachside.jpg'")
+    assert db.search_files("office") == []
+    assert [r["path"] for r in db.search_files("beach")] == ["/m/2024_holiday_beach.mp4"]
+    assert [r["path"] for r in db.search_files("wo")] == ["/m/work.mp4"]
+    assert db._repair_fts() == 0
+
+
+def test_read_helpers_use_read_only_pool(db):
+    db._get_pool().writer().execute("PRAGMA journal_mode=WAL")
+    db.upsert_file(_row(1))
+    with db.reader() as ro:
+        with pytest.raises(sqlite3.OperationalError):
+            ro.execute("DELETE FROM files")
+        assert ro is not db._get_pool().reader()
+
+    # a reader mid-query does not block the writer, and sees new commits after
+    with db.reader() as ro:
+        cur = ro.execute("SELECT id FROM files")
+        db.upsert_file(_row(2))
+        assert len(cur.fetchall()) == 1
+    assert db.get_stats()["total_files"] == 2
+
+
+def test_sql_profiler_histograms_and_plans(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQL_PROFILER, "enabled", True)
+    monkeypatch.setattr(SQL_PROFILER, "slow_ms", 0.0)   # every query is "slow"
+    SQL_PROFILER.reset()
+    db = MediaDB(tmp_path / "prof.sqlite3")
+    try:
+        db.upsert_many([_row(i) for i in range(5)])
+        for i in range(5):
+            db.get_file_by_path(_row(i)["path"])
+        db.query("SELECT * FROM files WHERE duration_s > 1")
+        stmts = {s["sql"]: s for s in SQL_PROFILER.report(top=100)["statements"]}
+    finally:
+        db.close()
+        SQL_PROFILER.reset()
+
+    by_path = stmts["SELECT * FROM files WHERE path = ?"]
+    assert by_path["count"] == 5 and sum(by_path["histogram"].values()) == 5
+    assert not by_path["full_scan"] and by_path["plan"]
+    assert stmts["SELECT * FROM files WHERE duration_s > ?"]["full_scan"]
+
+
+def test_db_profile_cli_reads_the_servers_profiler():
+    import json
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from video.cli import dispatch
+
+    seen = []
+
+    class _API(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append(self.path)
+            body = json.dumps({"enabled": True, "statements": [{"sql": "SELECT 1"}]})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *a):
+            pass
+
+    srv = HTTPServer(("127.0.0.1", 0), _API)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{srv.server_port}"
+        out = dispatch(None, {"action": "db-profile", "top": 3, "reset": True, "url": url})
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    assert out["statements"] == [{"sql": "SELECT 1"}]
+    assert seen == ["/db/profile?top=3&reset=true"]
+
+    dead = dispatch(None, {"action": "db-profile", "url": "http://127.0.0.1:9"})
+    assert "error" in dead
+
+
+def test_folders_track_upserts_and_deletes(db):
+    db.upsert_many([
+        _row(1, path="/lib/a/x.mp4"),
+        _row(2, path="/lib/a/y.mp4"),
+        _row(3, path="/lib/a/deep/z.mp4"),
+        _row(4, path="/lib/b/w.mp4"),
+    ])
+    assert [r["path"] for r in db.list_folders("/lib")] == ["/lib/a", "/lib/b"]
+    assert [r["path"] for r in db.list_folder_files("/lib/a/")] == ["/lib/a/x.mp4", "/lib/a/y.mp4"]
+    files, subs = db.folder_snapshot("/lib/a")          # one query: files + sub-folders
+    assert sorted(files) == ["x.mp4", "y.mp4"] and files["x.mp4"][1] == 101
+    assert subs == {"deep": "/lib/a/deep"}
+
+    with db.writer() as cx:                             # empty folders prune upward
+        cx.execute("DELETE FROM files WHERE path LIKE '/lib/a/%'")
+    assert [r["path"] for r in db.list_folders()] == ["/", "/lib", "/lib/b"]
+
+    db.clean_all()
+    assert db.list_folders() == []
+
+
+def test_media_tech_cache_and_filters(db, tmp_path, monkeypatch):
+    from video import probe
+
+    def _ff(codec, w, h):
+        return {"format": {"format_name": "mov,mp4", "duration": "2.5", "bit_rate": "80000000"},
+                "streams": [{"codec_type": "video", "codec_name": codec, "width": w,
+                             "height": h, "avg_frame_rate": "30000/1001",
+                             "side_data_list": [{"rotation": -90}]},
+                            {"codec_type": "audio", "codec_name": "aac", "channels": 2,
+                             "sample_rate": "48000"}]}
+
+    calls = []
+    monkeypatch.setattr(probe, "probe_media",
+                        lambda p, timeout=10: calls.append(p) or _ff("hevc", 3840, 2160))
+    clip = tmp_path / "clip.mov"
+    clip.write_bytes(b"x")
+    db.upsert_many([_row(1), _row(2)])
+
+    assert probe.probe_cached(clip, _row(1)["id"], db=db)["streams"][0]["codec_name"] == "hevc"
+    db.flush_writes()
+    moved = tmp_path / "renamed.mov"
+    clip.rename(moved)
+    assert probe.probe_cached(moved, _row(1)["id"], db=db) is not None
+    assert len(calls) == 1                              # same content → no re-probe
+
+    db.put_media_tech(_row(2)["id"], _ff("h264", 1920, 1080), probe.summarize(_ff("h264", 1920, 1080)))
+    db.flush_writes()
+    hits = db.query_tech(vcodec="hevc", min_height=2160)
+    assert [h["path"] for h in hits] == [_row(1)["path"]]
+    assert (hits[0]["fps"], hits[0]["rotation"], hits[0]["channels"]) == (29.97, 270, 2)
+    assert len(db.query_tech(acodec="aac")) == 2
@@ -0,0 +1,64 @@
+# tests/test_dedupe.py
+"""
+Staged duplicate detection (size → quick digest → full SHA-1).
+Run with `pytest -q tests/test_dedupe.py`
+"""
+import os
+
+from video import fingerprint as fp_mod
+from video.db import MediaDB
+from video.dedupe import Deduper
+from video.fingerprint import QUICK_BLOCK
+
+
+def test_stages_only_read_what_can_collide(tmp_path, monkeypatch):
+    fp_mod.clear_cache()
+    big = 2 * QUICK_BLOCK + 4096
+    head, tail = b"H" * QUICK_BLOCK, b"T" * QUICK_BLOCK
+
+    lib = tmp_path / "lib"
+    (lib / "a").mkdir(parents=True)
+    (lib / "b").mkdir()
+    # same size, same head + tail, different middle → quick collides, sha1 doesn't
+    (lib / "a" / "take1.mov").write_bytes(head + b"1" * 4096 + tail)
+    (lib / "b" / "take2.mov").write_bytes(head + b"2" * 4096 + tail)
+    (lib / "b" / "take1-copy.mov").write_bytes(head + b"1" * 4096 + tail)
+    # small identical photos: the quick digest covers every byte
+    (lib / "a" / "p.jpg").write_bytes(b"jpeg" * 100)
+    (lib / "b" / "p.jpg").write_bytes(b"jpeg" * 100)
+    os.link(lib / "a" / "p.jpg", lib / "a" / "p-link.jpg")     # same inode: not a copy
+    (lib / "a" / "unique.mp4").write_bytes(b"u" * 12345)
+    (lib / "a" / "notes.txt").write_bytes(b"jpeg" * 100)        # not media
+
+    reads = []
+    real = fp_mod._read_full
+    monkeypatch.setattr(fp_mod, "_read_full",
+                        lambda path, algos, block: reads.append(path.name) or
+                        real(path, algos, block))
+
+    db = MediaDB(tmp_path / "dupes.sqlite3")
+    try:
+        report = Deduper([lib], db=db).run()
+        reads_first = list(reads)
+        reads.clear()
+        # the background job gives the same answer (digests now come from the cache)
+        fp_mod.clear_cache()
+        again = Deduper([lib], db=db).start().result(timeout=10)
+    finally:
+        db.close()
+    assert again.reclaimable_bytes == report.reclaimable_bytes
+    assert reads == []
+
+    assert report.files == 6
+    assert report.size_buckets == 2
+    assert report.quick_hashed == 5                      # unique.mp4 never read
+    assert report.full_hashed == 3
+    assert sorted(reads_first) == ["take1-copy.mov", "take1.mov", "take2.mov"]
+
+    assert [(g.algo, len(g.paths)) for g in report.groups] == [("sha1", 2), ("quick", 2)]
+    movs = report.groups[0]
+    assert [os.path.basename(p) for p in movs.paths] == ["take1.mov", "take1-copy.mov"]
+    assert report.reclaimable_bytes == big + 400
+
+    out = report.to_dict(limit=1)
+    assert out["duplicate_files"] == 2 and len(out["groups"]) == 1
@@ -0,0 +1,65 @@
+# tests/test_fingerprint.py
+"""
+Single-pass fingerprints + inode-keyed cache.
+Run with `pytest -q tests/test_fingerprint.py`
+"""
+import hashlib
+import os
+
+from video import fingerprint as fp
+from video.db import MediaDB
+
+
+def _legacy_quick(path, block):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        head = f.read(block)
+        h.update(head)
+        if len(head) == block:
+            f.seek(-block, os.SEEK_END)
+            h.update(f.read(block))
+    return h.hexdigest()
+
+
+def test_digests_match_hashlib_in_one_pass(tmp_path, monkeypatch):
+    monkeypatch.setattr(fp, "READ_CHUNK", 64)          # many chunks per file
+    fp.clear_cache()
+    for size in (10, 16, 17, 40, 1000):
+        f = tmp_path / f"f{size}.bin"
+        data = os.urandom(size)
+        f.write_bytes(data)
+        got = fp.fingerprint(f, ("sha256", "quick", "sha1"), db=None, quick_block=16)
+        assert got == {"sha256": hashlib.sha256(data).hexdigest(),
+                       "sha1": hashlib.sha1(data).hexdigest(),
+                       "quick": _legacy_quick(f, 16)}
+        fp.clear_cache()
+        assert fp.digest(f, "quick", quick_block=16) == _legacy_quick(f, 16)
+
+
+def test_cache_is_keyed_by_inode_and_persisted(tmp_path, monkeypatch):
+    reads = []
+    real = fp._read_full
+    monkeypatch.setattr(fp, "_read_full",
+                        lambda *a, **kw: reads.append(a[0]) or real(*a, **kw))
+    fp.clear_cache()
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(b"a" * 5000)
+
+    db = MediaDB(tmp_path / "fp.sqlite3")
+    try:
+        sha1 = fp.digest(f, "sha1", db=db)              # full pass: sha1+sha256+quick
+        sha256 = fp.digest(f, "sha256", db=db)          # served from memory
+        db.flush_writes()
+        fp.clear_cache()
+        assert fp.fingerprint(f, ("quick", "sha1"), db=db)["sha1"] == sha1   # from DB
+        assert len(reads) == 1
+        assert sha256 == hashlib.sha256(b"a" * 5000).hexdigest()
+
+        f.write_bytes(b"b" * 6000)                      # new size/mtime → new key
+        assert fp.digest(f, "sha1", db=db) == hashlib.sha1(b"b" * 6000).hexdigest()
+        db.flush_writes()
+        rows = db.query("SELECT DISTINCT size FROM fingerprints")
+        assert [r["size"] for r in rows] == [6000]      # stale version dropped
+    finally:
+        db.close()
+        fp.clear_cache()
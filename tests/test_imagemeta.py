@@ -0,0 +1,171 @@
+# tests/test_imagemeta.py
+"""
+Header-only image metadata (JPEG/PNG/GIF/BMP/WebP/TIFF/HEIC + EXIF).
+Run with `pytest -q tests/test_imagemeta.py`
+"""
+import struct
+
+from video.imagemeta import IMAGE_HEAD, read_image_meta
+from video.probe import _header_probe, summarize
+
+
+def _exif(orientation=6, gps=True, dims=None) -> bytes:
+    """Little-endian TIFF blob: IFD0 (+ dims) → ExifIFD, GPS IFD."""
+    data = bytearray(b"II*\0" + struct.pack("<I", 8))
+
+    def ifd(entries, base):
+        out = struct.pack("<H", len(entries))
+        tail_off = base + 2 + 12 * len(entries) + 4
+        tail = b""
+        for tag, typ, count, value in sorted(entries):
+            if isinstance(value, bytes) and len(value) > 4:
+                out += struct.pack("<HHII", tag, typ, count, tail_off + len(tail))
+                tail += value + b"\0" * (len(value) & 1)
+            elif isinstance(value, bytes):
+                out += struct.pack("<HHI", tag, typ, count) + value.ljust(4, b"\0")
+            else:
+                fmt = "<HHIH2x" if typ == 3 else "<HHII"
+                out += struct.pack(fmt, tag, typ, count, value)
+        return out + b"\0" * 4 + tail
+
+    def rational(*vals):
+        return b"".join(struct.pack("<II", int(v * 100), 100) for v in vals)
+
+    exif_ifd = [(0x9003, 2, 20, b"2024:05:01 12:34:56\0")]
+    gps_ifd = [(1, 2, 2, b"N\0"), (2, 5, 3, rational(52, 22, 12)),
+               (3, 2, 2, b"W\0"), (4, 5, 3, rational(4, 54, 0)),
+               (5, 1, 1, b"\0"), (6, 5, 1, rational(12.5))]
+    ifd0 = [(0x10F, 2, 6, b"Canon\0"), (0x110, 2, 9, b"EOS R5 C\0"),
+            (0x112, 3, 1, orientation), (0x8769, 4, 1, 0)]
+    if gps:
+        ifd0.append((0x8825, 4, 1, 0))
+    if dims:
+        ifd0 += [(0x100, 4, 1, dims[0]), (0x101, 4, 1, dims[1])]
+    # lay out: IFD0 at 8, then ExifIFD, then GPS IFD – patch the pointers
+    size0 = len(ifd(ifd0, 8))
+    exif_off = 8 + size0
+    size_e = len(ifd(exif_ifd, exif_off))
+    gps_off = exif_off + size_e
+    ifd0 = [(t, ty, c, exif_off if t == 0x8769 else gps_off if t == 0x8825 else v)
+            for t, ty, c, v in ifd0]
+    data += ifd(ifd0, 8) + ifd(exif_ifd, exif_off)
+    if gps:
+        data += ifd(gps_ifd, gps_off)
+    return bytes(data)
+
+
+def _jpeg(w=4000, h=3000) -> bytes:
+    app1 = b"Exif\0\0" + _exif()
+    sof = struct.pack(">BHHB", 8, h, w, 3) + b"\x01\x22\x00" * 3
+    return (b"\xff\xd8" + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 +
+            b"\xff\xc2" + struct.pack(">H", len(sof) + 2) + sof + b"\xff\xda" + b"\0" * 64)
+
+
+def _png_chunk(kind, body):
+    return struct.pack(">I4s", len(body), kind) + body + b"\0" * 4
+
+
+def _box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _full(kind: bytes, body: bytes, version: int = 0, flags: int = 0) -> bytes:
+    return _box(kind, bytes([version]) + flags.to_bytes(3, "big") + body)
+
+
+def _heic() -> bytes:
+    exif = struct.pack(">I", 0) + _exif(orientation=1, gps=False)
+    ftyp = _box(b"ftyp", b"heic" + b"\0" * 4 + b"mif1heic")
+    pitm = _full(b"pitm", struct.pack(">H", 1))
+    infe1 = _full(b"infe", struct.pack(">HH", 1, 0) + b"hvc1" + b"\0", version=2)
+    infe2 = _full(b"infe", struct.pack(">HH", 2, 0) + b"Exif" + b"\0", version=2)
+    iinf = _full(b"iinf", struct.pack(">H", 2) + infe1 + infe2)
+    ispe = _full(b"ispe", struct.pack(">II", 4032, 3024))
+    irot = _box(b"irot", b"\x03")                          # 270° anticlockwise
+    ipco = _box(b"ipco", ispe + irot)
+    ipma = _full(b"ipma", struct.pack(">IHB", 1, 1, 2) + b"\x81\x02")
+    iprp = _box(b"iprp", ipco + ipma)
+
+    def build(exif_off):
+        iloc = _full(b"iloc", bytes([0x44, 0x00]) + struct.pack(">H", 1) +
+                     struct.pack(">HHHII", 2, 0, 1, exif_off, len(exif)))
+        meta = _full(b"meta", _full(b"hdlr", b"\0" * 4 + b"pict" + b"\0" * 13) +
+                     pitm + iinf + iloc + iprp)
+        return ftyp + meta
+
+    head = build(0)
+    mdat = _box(b"mdat", exif)
+    return build(len(head) + 8) + mdat
+
+
+def test_jpeg_png_gif_bmp_webp_headers(tmp_path):
+    jpg = tmp_path / "a.jpg"
+    jpg.write_bytes(_jpeg())
+    info = read_image_meta(jpg)
+    assert info["format"] == "jpeg"
+    assert (info["width"], info["height"]) == (4000, 3000)     # SOF2 (progressive)
+    assert info["orientation"] == 6
+    assert info["camera_make"] == "Canon" and info["camera_model"] == "EOS R5 C"
+    assert info["datetime_original"] == "2024-05-01T12:34:56"
+    assert abs(info["gps_lat"] - (52 + 22 / 60 + 12 / 3600)) < 1e-6
+    assert abs(info["gps_lon"] + (4 + 54 / 60)) < 1e-6             # W → negative
+    assert info["gps_alt"] == 12.5
+
+    png = tmp_path / "b.png"
+    png.write_bytes(b"\x89PNG\r\n\x1a\n" +
+                    _png_chunk(b"IHDR", struct.pack(">IIBBBBB", 640, 480, 8, 6, 0, 0, 0)) +
+                    _png_chunk(b"eXIf", _exif(orientation=8, gps=False)) +
+                    _png_chunk(b"IDAT", b"\0" * 8))
+    info = read_image_meta(png)
+    assert (info["width"], info["height"], info["orientation"]) == (640, 480, 8)
+    assert "gps_lat" not in info
+
+    gif = tmp_path / "c.gif"
+    gif.write_bytes(b"GIF89a" + struct.pack("<HH", 320, 200) + b"\0" * 16)
+    assert read_image_meta(gif) == {"format": "gif", "width": 320, "height": 200}
+
+    bmp = tmp_path / "d.bmp"
+    bmp.write_bytes(b"BM" + b"\0" * 12 + struct.pack("<Iii", 40, 800, -600) + b"\0" * 32)
+    assert read_image_meta(bmp)["height"] == 600                   # top-down BMP
+
+    vp8x = b"\x08\0\0\0" + (1919).to_bytes(3, "little") + (1079).to_bytes(3, "little")
+    exif = _exif(orientation=3, gps=False)
+    chunks = (struct.pack("<4sI", b"VP8X", 10) + vp8x +
+              struct.pack("<4sI", b"EXIF", len(exif)) + exif + b"\0" * (len(exif) & 1))
+    webp = tmp_path / "e.webp"
+    webp.write_bytes(b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WEBP" + chunks)
+    info = read_image_meta(webp)
+    assert (info["width"], info["height"], info["orientation"]) == (1920, 1080, 3)
+
+    junk = tmp_path / "f.jpg"
+    junk.write_bytes(b"not an image at all")
+    assert read_image_meta(junk) is None
+
+
+def test_tiff_heic_and_probe_shape(tmp_path):
+    tif = tmp_path / "raw.dng"
+    tif.write_bytes(_exif(dims=(6000, 4000)) + b"\0" * 32)
+    info = read_image_meta(tif)
+    assert info["format"] == "tiff"
+    assert (info["width"], info["height"]) == (6000, 4000)
+    assert info["camera_model"] == "EOS R5 C"
+
+    heic = tmp_path / "IMG_0001.HEIC"
+    heic.write_bytes(_heic())
+    info = read_image_meta(heic)
+    assert info["format"] == "heic"
+    assert (info["width"], info["height"]) == (4032, 3024)
+    assert info["orientation"] == 6                    # irot wins over EXIF
+    assert info["camera_make"] == "Canon"
+
+    # a photo never needs ffprobe: the header probe fills media_tech
+    probe = _header_probe(heic)
+    assert probe["source"] == "header"
+    tech = summarize(probe)
+    assert (tech["width"], tech["height"], tech["rotation"]) == (4032, 3024, 90)
+    assert tech["vcodec"] == "heic"
+
+    # the parser only looks at the head of the file
+    big = tmp_path / "big.jpg"
+    big.write_bytes(_jpeg() + b"\0" * (2 * IMAGE_HEAD))
+    assert read_image_meta(big)["width"] == 4000
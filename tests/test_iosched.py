@@ -0,0 +1,65 @@
+# tests/test_iosched.py
+"""
+Per-device I/O budgets + the concurrent directory walk.
+Run with `pytest -q tests/test_iosched.py`
+"""
+import os
+import threading
+import time
+
+from video import config, iosched
+from video.scanner import walk_dirs
+
+
+def test_limits_overrides_and_read_slots(tmp_path, monkeypatch):
+    monkeypatch.setenv("VIDEO_IO_LIMITS", f"{tmp_path}=32/, /no/such/root=/1, junk=x/y")
+    limits = config.get_io_limits()
+    assert limits[tmp_path] == (32, None)
+    assert limits[config.Path("/no/such/root")] == (None, 1)
+    assert config.Path("junk") not in limits
+
+    sched = iosched.IOScheduler({tmp_path: (32, 2)})
+    lim = sched.limits_for(tmp_path)
+    assert lim.kind in iosched.DEFAULTS
+    assert (lim.list, lim.read) == (32, 2)
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(b"x")
+    assert sched.limits_for(f) is lim                  # same st_dev, same budget
+
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def _reader():
+        with sched.reading(f):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=_reader) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+    dev = os.stat(f).st_dev
+    assert sched.stats()[dev]["active"] == 0
+
+
+def test_concurrent_walk_matches_sequential(tmp_path):
+    for i in range(6):
+        for j in range(3):
+            d = tmp_path / f"d{i}" / f"s{j}"
+            d.mkdir(parents=True)
+            (d / "clip.mp4").write_bytes(b"x")
+    (tmp_path / "$RECYCLE.BIN").mkdir()
+
+    def _walk(workers):
+        return {(d.as_posix(), tuple(sorted(e.name for e in files)), tuple(sorted(subs)))
+                for d, files, subs in walk_dirs(tmp_path, workers=workers)}
+
+    seq = _walk(1)
+    assert len(seq) == 1 + 6 + 18
+    assert _walk(8) == seq
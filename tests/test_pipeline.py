@@ -0,0 +1,316 @@
+# tests/test_pipeline.py
+"""
+Stage pipeline + streaming bulk_scan.
+Run with `pytest -q tests/test_pipeline.py`
+"""
+import os
+import threading
+import time
+
+import pytest
+
+from video.db import MediaDB
+from video.pipeline import Pipeline, Stage
+
+
+@pytest.fixture
+def scanner_mod(tmp_path, monkeypatch):
+    """``video.scanner`` with ffprobe and preview generation stubbed out."""
+    from video import scanner as scanner_mod
+    monkeypatch.setattr(scanner_mod, "probe_cached", lambda *a, **kw: {})
+    monkeypatch.setattr(scanner_mod, "generate_preview", lambda src, dst: False)
+    monkeypatch.setattr(scanner_mod, "generate_preview_set", lambda *a, **kw: None)
+    monkeypatch.setattr(scanner_mod.config, "get_preview_root", lambda: tmp_path / "prev")
+    return scanner_mod
+
+
+def test_pipeline_counts_drops_and_errors():
+    out = []
+
+    def _check(i):
+        if i == 3:
+            raise ValueError("boom")
+        return None if i % 2 else i                 # drop odd numbers
+
+    stats = Pipeline(range(10), [
+        Stage("check", _check, workers=3),
+        Stage("sink", lambda i: out.append(i) or i),
+    ]).run()
+
+    assert sorted(out) == [0, 2, 4, 6, 8]
+    st = stats["stages"]["check"]
+    assert stats["emitted"] == 10
+    assert (st["in"], st["out"], st["dropped"], st["errors"]) == (10, 5, 4, 1)
+
+
+def test_pipeline_reports_a_failed_source():
+    def _source():
+        yield from range(3)
+        raise OSError("walk failed")
+
+    out = []
+    pipe = Pipeline(_source(), [Stage("sink", lambda i: out.append(i) or i)])
+    stats = pipe.run()
+    assert sorted(out) == [0, 1, 2]                 # what was emitted still drains
+    assert stats["source_error"] == "OSError('walk failed')"
+    assert Pipeline(range(2), [Stage("s", lambda i: i)]).run()["source_error"] is None
+
+
+def test_pipeline_streams_with_bounded_memory():
+    produced, consumed = [0], [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def _source():
+        for i in range(500):
+            with lock:
+                produced[0] += 1
+                peak[0] = max(peak[0], produced[0] - consumed[0])
+            yield i
+
+    def _slow(i):
+        time.sleep(0.0005)
+        with lock:
+            consumed[0] += 1
+        return i
+
+    Pipeline(_source(), [Stage("a", lambda i: i, workers=2, maxsize=4),
+                         Stage("b", _slow, workers=1, maxsize=4)]).run()
+    assert consumed[0] == 500
+    assert peak[0] <= 4 + 4 + 2 + 1 + 2             # queues + in-flight workers
+
+
+def test_bulk_scan_streams_into_db(scanner_mod, tmp_path):
+    lib = tmp_path / "lib"
+    (lib / "a").mkdir(parents=True)
+    for i in range(6):
+        (lib / "a" / f"clip{i}.mp4").write_bytes(b"x" * (i + 1))
+    (lib / "a" / "notes.txt").write_text("not media")
+
+    db = MediaDB(tmp_path / "scan.sqlite3")
+    try:
+        sc = scanner_mod.Scanner(db, lib)
+        res = sc.bulk_scan(workers=2, stage_workers={"preview": 1})
+        assert (res["processed"], res["total"], res["skipped"]) == (6, 6, 0)
+        assert res["stages"]["preview"]["workers"] == 1
+        assert db.get_stats()["total_files"] == 6
+
+        again = sc.bulk_scan(workers=2)                 # unchanged → skipped
+        assert (again["processed"], again["skipped"]) == (0, 6)
+        assert again["stages"]["hash"]["in"] == 0       # never reached hashing
+    finally:
+        db.close()
+
+
+def test_scanner_cache_stays_bounded(scanner_mod, tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner_mod, "CACHE_SIZE", 8)
+    lib = tmp_path / "lib"
+    for d in range(10):
+        (lib / f"d{d}").mkdir(parents=True)
+        for i in range(30):
+            (lib / f"d{d}" / f"clip{i}.mp4").write_bytes(b"%d-%d" % (d, i))
+
+    db = MediaDB(tmp_path / "bounded.sqlite3")
+    try:
+        sc = scanner_mod.Scanner(db, lib)
+        assert sc.bulk_scan(workers=2)["processed"] == 300
+        assert len(sc.cache) == 0                       # rows live in the DB only
+
+        for i in range(30):                             # watch-style single files
+            p = lib / "d0" / f"clip{i}.mp4"
+            p.write_bytes(b"changed-%d" % i)
+            assert sc.process_file(p)
+        assert len(sc.cache) == 8
+    finally:
+        db.close()
+
+
+def test_rescan_diffs_directories_and_reports_removed(scanner_mod, tmp_path):
+    lib = tmp_path / "lib"
+    for d in ("a", "a/sub"):
+        (lib / d).mkdir(parents=True)
+    for name in ("a/one.mp4", "a/two.mp4", "a/sub/three.mp4"):
+        (lib / name).write_bytes(name.encode())
+
+    db = MediaDB(tmp_path / "diff.sqlite3")
+    try:
+        sc = scanner_mod.Scanner(db, lib)
+        sc.bulk_scan(workers=1)
+
+        (lib / "a" / "two.mp4").unlink()
+        (lib / "a" / "sub" / "three.mp4").unlink()
+        (lib / "a" / "sub").rmdir()
+        (lib / "a" / "one.mp4").write_bytes(b"changed")
+        (lib / "a" / "new.mp4").write_bytes(b"y")
+
+        removed = []
+        res = sc.bulk_scan(workers=1, on_removed=removed.extend)
+        assert res["processed"] == 2 and res["removed"] == 2
+        assert sorted(removed) == [(lib / "a" / "sub" / "three.mp4").as_posix(),
+                                   (lib / "a" / "two.mp4").as_posix()]
+    finally:
+        db.close()
+
+
+def test_rescan_skips_unchanged_dirs_via_journal(scanner_mod, tmp_path):
+    lib = tmp_path / "lib"
+    for d in ("a", "a/deep", "b"):
+        (lib / d).mkdir(parents=True)
+    for name in ("a/one.mp4", "a/deep/two.mp4", "b/three.mp4"):
+        (lib / name).write_bytes(name.encode())
+    old = 1_000_000_000                             # well outside MTIME_SLACK
+    for d in ("", "a", "a/deep", "b"):
+        os.utime(lib / d, (old, old))
+
+    db = MediaDB(tmp_path / "journal.sqlite3")
+    try:
+        sc = scanner_mod.Scanner(db, lib)
+        assert sc.bulk_scan(workers=1)["processed"] == 3
+
+        idle = sc.bulk_scan(workers=1)
+        assert idle["dirs_skipped"] == 4 and idle["skipped"] == 0
+
+        (lib / "a" / "deep" / "four.mp4").write_bytes(b"four")   # only a/deep moves
+        res = sc.bulk_scan(workers=1)
+        assert (res["processed"], res["dirs_skipped"]) == (1, 3)
+
+        full = sc.bulk_scan(workers=1, full=True)
+        assert (full["dirs_skipped"], full["skipped"]) == (0, 4)
+    finally:
+        db.close()
+
+
+def test_bulk_scan_reports_progress(scanner_mod, tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner_mod, "PROGRESS_INTERVAL", 0.01)
+    monkeypatch.setattr(scanner_mod, "probe_cached",
+                        lambda *a, **kw: time.sleep(0.02) or {})
+
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    for i in range(6):
+        (lib / f"clip{i}.mp4").write_bytes(b"x" * (i + 1))
+    (lib / "notes.txt").write_bytes(b"not media")
+
+    snaps = []
+    db = MediaDB(tmp_path / "progress.sqlite3")
+    try:
+        res = scanner_mod.Scanner(db, lib).bulk_scan(workers=1, on_progress=snaps.append)
+    finally:
+        db.close()
+
+    assert res["processed"] == 6
+    assert len(snaps) >= 2 and snaps[0]["state"] == "running"
+    last = snaps[-1]
+    assert last["state"] == "done"
+    assert (last["discovered"], last["probed"], last["written"]) == (6, 6, 6)
+    assert last["bytes_hashed"] == sum(range(1, 7))
+    assert set(last["queues"]) == {"hash", "probe", "preview", "write"}
+    assert all(q["queued"] == 0 for q in last["queues"].values())
+
+
+def test_duplicate_content_only_skips_the_copy(scanner_mod, tmp_path):
+    lib = tmp_path / "lib"
+    (lib / "a").mkdir(parents=True)
+    for i in range(20):
+        (lib / "a" / f"clip{i:02d}.mp4").write_bytes(b"clip %d" % i)
+    (lib / "a" / "zz-copy.mp4").write_bytes(b"clip 7")     # byte-identical to clip07
+
+    db = MediaDB(tmp_path / "dupes.sqlite3")
+    try:
+        sc = scanner_mod.Scanner(db, lib)
+        res = sc.bulk_scan(workers=2)
+        assert (res["processed"], res["rejected"]) == (20, 1)
+        assert db.get_stats()["total_files"] == 20
+        kept = [db.get_file_by_path((lib / "a" / n).as_posix()) is not None
+                for n in ("clip07.mp4", "zz-copy.mp4")]
+        assert sorted(kept) == [False, True]            # first one written wins
+    finally:
+        db.close()
+
+
+def test_bulk_scan_commits_cache_rows_with_the_batch(scanner_mod, tmp_path, monkeypatch):
+    import contextlib
+    from video import fingerprint as fp_mod
+    from video import probe as probe_mod
+
+    monkeypatch.setattr(scanner_mod, "probe_cached", probe_mod.probe_cached)
+    monkeypatch.setattr(probe_mod, "_header_probe", lambda path: {
+        "source": "header", "format": {"format_name": "mov", "duration": "2.0"},
+        "streams": [{"codec_type": "video", "codec_name": "h264",
+                     "width": 640, "height": 360}]})
+    fp_mod.clear_cache()
+
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    for i in range(21):
+        (lib / f"clip{i}.mp4").write_bytes(b"clip %d" % i)
+
+    db = MediaDB(tmp_path / "txn.sqlite3")
+    real, txns = db.writer, []
+
+    @contextlib.contextmanager
+    def counting():
+        txns.append(1)
+        with real() as cx:
+            yield cx
+
+    monkeypatch.setattr(db, "writer", counting)
+    try:
+        assert scanner_mod.Scanner(db, lib).bulk_scan(workers=2)["processed"] == 21
+        assert db.query("SELECT COUNT(*) AS n FROM fingerprints")[0]["n"] == 21
+        assert db.query("SELECT COUNT(*) AS n FROM media_tech")[0]["n"] == 21
+        assert db.query_tech(vcodec="h264", limit=50)[0]["duration_s"] == 2.0
+    finally:
+        db.close()
+    assert len(txns) <= 3                       # file rows + caches, scan journal
+
+
+def test_failed_walk_marks_the_scan_incomplete(scanner_mod, tmp_path, monkeypatch):
+    lib = tmp_path / "lib"
+    for d in ("a", "b"):
+        (lib / d).mkdir(parents=True)
+        (lib / d / "clip.mp4").write_bytes(d.encode())
+
+    real = scanner_mod._list_dir
+
+    def _list_dir(current, journal):
+        if current.name == "b":
+            raise PermissionError("stale NFS handle")
+        return real(current, journal)
+
+    monkeypatch.setattr(scanner_mod, "_list_dir", _list_dir)
+    snaps = []
+    db = MediaDB(tmp_path / "walk.sqlite3")
+    try:
+        res = scanner_mod.Scanner(db, lib).bulk_scan(workers=1, on_progress=snaps.append)
+        assert res["complete"] is False and "stale NFS handle" in res["source_error"]
+        assert snaps[-1]["state"] == "error"
+        assert db.query("SELECT COUNT(*) AS n FROM scan_dirs")[0]["n"] == 0   # journal untouched
+    finally:
+        db.close()
+
+
+def test_directory_vanishing_mid_walk_is_gone_not_an_error(scanner_mod, tmp_path, monkeypatch):
+    lib = tmp_path / "lib"
+    for d in ("a", "b"):
+        (lib / d).mkdir(parents=True)
+        (lib / d / "clip.mp4").write_bytes(d.encode())
+
+    real = os.scandir
+
+    def _scandir(path):                         # stat'ed fine, removed before listing
+        if os.path.basename(path) == "b":
+            raise FileNotFoundError(2, "No such file or directory", str(path))
+        return real(path)
+
+    monkeypatch.setattr(scanner_mod.os, "scandir", _scandir)
+    assert sorted(p.name for p in scanner_mod.safe_iter_files(lib)) == ["clip.mp4"]
+
+    db = MediaDB(tmp_path / "vanish.sqlite3")
+    try:
+        res = scanner_mod.Scanner(db, lib).bulk_scan(workers=1)
+        assert res["complete"] is True and res["processed"] == 1
+        dirs = {r["path"] for r in db.query("SELECT path FROM scan_dirs")}
+        assert dirs == {lib.as_posix(), (lib / "a").as_posix()}
+    finally:
+        db.close()
@@ -0,0 +1,99 @@
+# tests/test_preview.py
+"""
+Single-decode preview set: one ffmpeg run → sprite sheet, posters, VTT.
+Run with `pytest -q tests/test_preview.py`
+"""
+from pathlib import Path
+
+from video import preview
+from video.runner import ProcResult
+
+
+def test_one_ffmpeg_run_writes_sprite_posters_and_vtt(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_run(cmd, **kw):
+        calls.append(cmd)
+        for arg in cmd:                      # every output named on the command line
+            if arg.endswith(".jpg"):
+                Path(arg).write_bytes(b"\xff\xd8")
+        return ProcResult(cmd, 0, b"", "", 0.1)
+
+    monkeypatch.setattr(preview.shutil, "which", lambda tool: "/usr/bin/" + tool)
+    monkeypatch.setattr(preview.runner, "run_sync", fake_run)
+
+    pset = preview.generate_preview_set(Path("/media/clip.mp4"), tmp_path, "abc",
+                                        duration=40.0)
+    assert pset is not None and len(calls) == 1
+    cmd = calls[0]
+    assert cmd.count("-i") == 1 and cmd.count("-map") == 1 + len(preview.POSTER_SIZES)
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert graph.startswith("[0:v:0]split=2[s][p]")
+    assert "tile=5x4" in graph and f"split={len(preview.POSTER_SIZES)}" in graph
+    assert "fps=1/2.000000" in graph                     # 40 s / 20 frames
+
+    assert sorted(pset.posters) == [128, 256, 512]
+    assert pset.poster(256).name == "abc_256.jpg"
+    assert pset.sprite.name == "abc_sprite.jpg"
+
+    lines = pset.vtt.read_text().splitlines()
+    assert lines[0] == "WEBVTT"
+    cues = [l for l in lines if "#xywh=" in l]
+    assert len(cues) == 20
+    assert cues[0] == "abc_sprite.jpg#xywh=0,0,160,90"
+    assert cues[6] == "abc_sprite.jpg#xywh=160,90,160,90"        # row 1, col 1
+    assert lines[2] == "00:00:00.000 --> 00:00:02.000"
+    assert lines[-2] == "00:00:38.000 --> 00:00:40.000"
+
+
+def test_failed_run_and_missing_ffmpeg_return_none(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview.shutil, "which", lambda tool: None)
+    assert preview.generate_preview_set(Path("x.mp4"), tmp_path, "abc") is None
+
+    monkeypatch.setattr(preview.shutil, "which", lambda tool: "/usr/bin/" + tool)
+    monkeypatch.setattr(preview.runner, "run_sync",
+                        lambda cmd, **kw: ProcResult(cmd, 1, b"", "moov atom not found", 0.1))
+    assert preview.generate_preview_set(Path("x.mp4"), tmp_path, "abc") is None
+    assert not (tmp_path / "abc_sprite.vtt").exists()
+
+
+def _fake_ffmpeg(calls, stderr=""):
+    def fake_run(cmd, **kw):
+        calls.append(cmd)
+        for arg in cmd:
+            if arg.endswith(".jpg"):
+                Path(arg).write_bytes(b"\xff\xd8")
+        return ProcResult(cmd, 0, b"", stderr, 0.1)
+    return fake_run
+
+
+def test_unknown_duration_is_probed_first(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(preview.shutil, "which", lambda tool: "/usr/bin/" + tool)
+    monkeypatch.setattr(preview.runner, "run_sync", _fake_ffmpeg(calls))
+    monkeypatch.setattr(preview, "probe_cached",
+                        lambda src, fast=True: {"format": {"duration": "15.0"}})
+
+    pset = preview.generate_preview_set(Path("/media/short.mp4"), tmp_path, "abc")
+    assert "fps=1/0.750000" in calls[0][calls[0].index("-filter_complex") + 1]
+    lines = pset.vtt.read_text().splitlines()
+    assert len([l for l in lines if "#xywh=" in l]) == 20
+    assert lines[-2] == "00:00:14.250 --> 00:00:15.000"
+
+
+def test_unprobeable_clip_indexes_only_the_frames_ffmpeg_produced(tmp_path, monkeypatch):
+    calls = []
+    stderr = "".join(
+        f"[Parsed_showinfo_2 @ 0x55d0c1a2] n:   {i} pts:  {i * 10} pts_time:{i * 10} "
+        f"duration:1 fmt:yuv420p\n[Parsed_showinfo_2 @ 0x55d0c1a2]   color_range:tv\n"
+        for i in range(2))
+    monkeypatch.setattr(preview.shutil, "which", lambda tool: "/usr/bin/" + tool)
+    monkeypatch.setattr(preview.runner, "run_sync", _fake_ffmpeg(calls, stderr))
+    monkeypatch.setattr(preview, "probe_cached", lambda src, fast=True: None)
+
+    pset = preview.generate_preview_set(Path("/media/raw.h264"), tmp_path, "abc")
+    graph = calls[0][calls[0].index("-filter_complex") + 1]
+    assert "fps=1/10.000000,showinfo," in graph and "info" in calls[0]
+    cues = [l for l in pset.vtt.read_text().splitlines() if "-->" in l]
+    assert cues == ["00:00:00.000 --> 00:00:10.000", "00:00:10.000 --> 00:00:20.000"]
+    assert pset.frames == 2
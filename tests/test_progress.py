@@ -0,0 +1,72 @@
+# tests/test_progress.py
+"""
+Job progress fan-out (SSE / WebSocket feed).
+Run with `pytest -q tests/test_progress.py`
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from video.progress import ProgressHub
+
+
+def test_hub_replays_latest_and_ends_stream_on_done():
+    hub = ProgressHub()
+    hub.publish("job-1", {"state": "running", "written": 1})
+
+    async def _read():
+        frames = []
+        agen = hub.sse("job-1")
+        frames.append(await agen.__anext__())            # replay of the latest snapshot
+
+        def _producer():
+            for n in (2, 3):
+                hub.publish("job-1", {"state": "running", "written": n})
+            hub.publish("job-2", {"state": "running"})     # other job: filtered out
+            hub.publish("job-1", {"state": "done", "written": 3})
+
+        threading.Thread(target=_producer).start()
+        async for frame in agen:
+            frames.append(frame)
+        return frames
+
+    frames = asyncio.run(asyncio.wait_for(_read(), 5))
+    payloads = [json.loads(f.split("data: ", 1)[1]) for f in frames]
+    assert all(f.startswith("event: progress\n") for f in frames)
+    assert [p["written"] for p in payloads] == [1, 2, 3, 3]
+    assert payloads[-1]["state"] == "done" and {p["job_id"] for p in payloads} == {"job-1"}
+    assert hub.latest("job-2")["state"] == "running"
+    assert hub._subs == []                                # unsubscribed on exit
+
+
+def test_bus_forwarder_publishes_on_its_own_loop():
+    pytest.importorskip("aio_pika")                       # video.core.event imports it
+    hub = ProgressHub()
+
+    class Bus:
+        def __init__(self):
+            self.events, self.loops = [], set()
+
+        async def publish(self, evt):
+            self.loops.add(asyncio.get_running_loop())
+            self.events.append(evt.payload)
+
+    bus = Bus()
+
+    async def _run():
+        task = asyncio.create_task(hub.forward_to_bus(bus))
+        await asyncio.sleep(0)                            # subscribed
+        t = threading.Thread(target=lambda: [hub.publish("j", {"state": "running", "n": n})
+                                             for n in range(3)])
+        t.start()
+        t.join()
+        while len(bus.events) < 3:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        return asyncio.get_running_loop()
+
+    loop_used = asyncio.run(asyncio.wait_for(_run(), 5))
+    assert [e["n"] for e in bus.events] == [0, 1, 2]
+    assert bus.loops == {loop_used}                       # never a per-event loop
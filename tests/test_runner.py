@@ -0,0 +1,82 @@
+# tests/test_runner.py
+"""
+Shared subprocess runner: limits, timeouts, cancellation, stderr.
+Run with `pytest -q tests/test_runner.py`
+"""
+import asyncio
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from video import runner
+
+
+def _alive(pid: int) -> bool:
+    status = Path(f"/proc/{pid}/status")
+    try:
+        return "\tZ" not in status.read_text().split("State:")[1].splitlines()[0]
+    except (OSError, IndexError):
+        return False
+
+
+def test_per_tool_limit_caps_concurrency(monkeypatch):
+    monkeypatch.setitem(runner.TOOL_LIMITS, "capped", 2)
+    peak = [0]
+    stop = threading.Event()
+
+    def _watch():
+        while not stop.is_set():
+            peak[0] = max(peak[0], runner.stats()["running"].get("capped", 0))
+            time.sleep(0.005)
+
+    w = threading.Thread(target=_watch)
+    w.start()
+    t0 = time.monotonic()
+    threads = [threading.Thread(target=runner.run_sync, args=(["sleep", "0.2"],),
+                                kwargs={"tool": "capped"}) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    w.join()
+    cap = min(2, runner.MAX_PROCS)                      # global limit may be lower
+    assert peak[0] == cap
+    assert time.monotonic() - t0 >= 0.2 * (6 // cap) - 0.05
+
+
+def test_timeout_kills_process_group(tmp_path):
+    pidfile = tmp_path / "pid"
+    res = runner.run_sync(["sh", "-c", f"sleep 30 & echo $! > {pidfile}; wait"],
+                          timeout=0.3)
+    assert res.timed_out and not res.ok and res.elapsed_s < 5
+    time.sleep(0.1)
+    assert not _alive(int(pidfile.read_text()))        # grandchild went too
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        runner.run_sync(["sleep", "5"], timeout=0.1, check=True)
+
+
+def test_cancelled_caller_kills_child(tmp_path):
+    pidfile = tmp_path / "pid"
+
+    async def _main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                runner.run(["sh", "-c", f"echo $$ > {pidfile}; exec sleep 30"]), 0.3)
+
+    asyncio.run(_main())
+    time.sleep(0.2)
+    assert not _alive(int(pidfile.read_text()))
+    assert not runner.stats()["running"].get("sh")
+
+
+def test_nonzero_exit_keeps_stderr():
+    res = runner.run_sync(["sh", "-c", "echo out; echo oops >&2; exit 3"])
+    assert (res.returncode, res.stdout, res.stderr.strip()) == (3, b"out\n", "oops")
+    with pytest.raises(runner.ProcError) as exc:
+        runner.run_sync(["sh", "-c", "echo oops >&2; exit 3"], check=True)
+    assert exc.value.returncode == 3 and "oops" in str(exc.value)
@@ -0,0 +1,77 @@
+# tests/test_snapshot.py
+"""
+SnapshotService – paged online backups with rotation.
+Run with `pytest -q tests/test_snapshot.py`
+"""
+import sqlite3
+
+import pytest
+
+from video.storage.snapshot import SnapshotService
+
+
+@pytest.fixture
+def live(tmp_path):
+    path = tmp_path / "live.sqlite3"
+    cx = sqlite3.connect(path, isolation_level=None)
+    cx.execute("PRAGMA journal_mode=WAL")
+    cx.execute("CREATE TABLE t (x BLOB)")
+    cx.executemany("INSERT INTO t VALUES (randomblob(4000))", [()] * 50)
+    yield path, cx
+    cx.close()
+
+
+def _count(path):
+    cx = sqlite3.connect(path)
+    try:
+        return cx.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    finally:
+        cx.close()
+
+
+def test_snapshot_skips_when_unchanged_and_rotates(live, tmp_path):
+    path, cx = live
+    dest = tmp_path / "bk" / "live.sqlite3"
+    svc = SnapshotService(path, dest, keep=2, pages=4, step_sleep_ms=0)
+    try:
+        assert svc.snapshot() == dest and _count(dest) == 50
+        assert svc.snapshot() is None                   # data_version unchanged
+
+        cx.execute("INSERT INTO t VALUES (x'00')")
+        assert svc.snapshot() == dest
+        assert _count(dest) == 51 and _count(dest.with_name("live.sqlite3.1")) == 50
+
+        cx.execute("INSERT INTO t VALUES (x'00')")
+        svc.snapshot()
+        assert sorted(p.name for p in dest.parent.iterdir()) == \
+            ["live.sqlite3", "live.sqlite3.1"]          # keep=2 generations
+    finally:
+        svc.stop()
+
+
+def test_snapshot_refuses_live_path(live):
+    path, _ = live
+    with pytest.raises(ValueError):
+        SnapshotService(path, path)
+
+
+def test_snapshot_truncates_wal_via_checkpoint_hook(live, tmp_path):
+    path, cx = live
+    calls = []
+
+    def _truncate():
+        calls.append(cx.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone())
+
+    svc = SnapshotService(path, tmp_path / "bk.sqlite3", pages=4, step_sleep_ms=0,
+                          checkpoint=_truncate)
+    try:
+        assert path.with_name("live.sqlite3-wal").stat().st_size > 0
+        svc.snapshot()
+        assert calls == [(0, 0, 0)]
+        assert path.with_name("live.sqlite3-wal").stat().st_size == 0
+        assert svc.snapshot() is None and len(calls) == 1   # the trim is not a change
+
+        cx.execute("INSERT INTO t VALUES (x'00')")
+        assert svc.snapshot() is not None and len(calls) == 2
+    finally:
+        svc.stop()
@@ -0,0 +1,189 @@
+# tests/test_watch.py
+"""
+inotify watch mode.
+Run with `pytest -q tests/test_watch.py`
+"""
+import threading
+import time
+
+import pytest
+
+from video import scanner as scanner_mod
+from video import watch as watch_mod
+from video.db import MediaDB
+
+
+def _wait(cond, timeout=10.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner_mod, "probe_cached", lambda *a, **kw: {})
+    monkeypatch.setattr(scanner_mod, "generate_preview", lambda src, dst: False)
+    monkeypatch.setattr(scanner_mod.config, "get_preview_root", lambda: tmp_path / "prev")
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    db = MediaDB(tmp_path / "watch.sqlite3")
+    yield lib, db
+    db.close()
+
+
+def test_watch_indexes_settled_files_and_drops_removed(env, monkeypatch):
+    lib, db = env
+    monkeypatch.setattr(watch_mod, "is_network_fs", lambda p: False)
+    try:
+        watch_mod.Inotify().close()
+    except (OSError, AttributeError):
+        pytest.skip("inotify unavailable")
+
+    w = watch_mod.Watcher(scanner_mod.Scanner(db, lib), roots=[lib], debounce=0.2)
+    t = w.start()
+    try:
+        assert _wait(lambda: w.stats["watches"] == 1)
+        with open(lib / "clip.mp4", "wb") as f:          # burst of writes
+            for i in range(5):
+                f.write(bytes([i]) * 1024)
+                f.flush()
+                time.sleep(0.02)
+        (lib / "sub").mkdir()
+        (lib / "sub" / "deep.mp4").write_bytes(b"deep")
+
+        assert _wait(lambda: db.get_stats()["total_files"] == 2)
+        assert w.stats["indexed"] == 2                   # coalesced: once each
+
+        (lib / "clip.mp4").unlink()
+        assert _wait(lambda: db.get_file_by_path((lib / "clip.mp4").as_posix()) is None)
+    finally:
+        w.stop()
+        t.join(timeout=5)
+
+
+def test_network_roots_fall_back_to_diff_scans(env, monkeypatch):
+    lib, db = env
+    monkeypatch.setattr(watch_mod, "is_network_fs", lambda p: True)
+    (lib / "a.mp4").write_bytes(b"a")
+
+    w = watch_mod.Watcher(scanner_mod.Scanner(db, lib), roots=[lib], poll_interval=0.2)
+    t = w.start()
+    try:
+        assert _wait(lambda: db.get_stats()["total_files"] == 1)   # initial scan
+        (lib / "b.mp4").write_bytes(b"b")
+        assert _wait(lambda: db.get_stats()["total_files"] == 2)
+        assert w.stats["rescans"] >= 2 and w.stats["watches"] == 0
+    finally:
+        w.stop()
+        t.join(timeout=5)
+
+
+def test_duplicates_and_failed_writes_keep_the_watcher_alive(env, monkeypatch):
+    lib, db = env
+    monkeypatch.setattr(watch_mod, "is_network_fs", lambda p: False)
+    try:
+        watch_mod.Inotify().close()
+    except (OSError, AttributeError):
+        pytest.skip("inotify unavailable")
+
+    real, calls = db.upsert_many, []
+
+    def flaky(rows, rejected=None, **kw):
+        calls.append(len(rows))
+        if len(calls) == 3:                              # third write fails once
+            raise RuntimeError("disk full")
+        return real(rows, rejected, **kw)
+
+    monkeypatch.setattr(db, "upsert_many", flaky)
+    w = watch_mod.Watcher(scanner_mod.Scanner(db, lib), roots=[lib], debounce=0.1)
+    t = w.start()
+    try:
+        assert _wait(lambda: w.stats["watches"] == 1)
+        (lib / "a.mp4").write_bytes(b"same bytes")
+        assert _wait(lambda: db.get_stats()["total_files"] == 1)
+        (lib / "copy.mp4").write_bytes(b"same bytes")    # same content, new path
+        assert _wait(lambda: w.stats["rejected"] == 1)
+        (lib / "b.mp4").write_bytes(b"other")            # first attempt fails
+        assert _wait(lambda: db.get_stats()["total_files"] == 2)
+        assert t.is_alive()
+        assert w.stats["errors"] == 1 and w.stats["indexed"] == 2
+        assert db.get_file_by_path((lib / "copy.mp4").as_posix()) is None
+    finally:
+        w.stop()
+        t.join(timeout=5)
+
+
+def _inotify_watcher(env, monkeypatch, **kw):
+    lib, db = env
+    monkeypatch.setattr(watch_mod, "is_network_fs", lambda p: False)
+    try:
+        watch_mod.Inotify().close()
+    except (OSError, AttributeError):
+        pytest.skip("inotify unavailable")
+    return watch_mod.Watcher(scanner_mod.Scanner(db, lib), roots=[lib], **kw)
+
+
+def test_directory_gone_before_its_event_is_handled(env, monkeypatch):
+    lib, db = env
+    w = _inotify_watcher(env, monkeypatch, initial_scan=False)
+    w._setup()
+    try:
+        wd = w._dirs[lib]
+        (lib / "gone_dir").mkdir()
+        (lib / "gone_dir").rmdir()
+        w._handle(wd, watch_mod.IN_CREATE | watch_mod.IN_ISDIR, "gone_dir")
+        assert list(w._dirs) == [lib] and not w._pending
+    finally:
+        w._ino.close()
+
+
+def test_failed_event_rescans_its_root_and_keeps_running(env, monkeypatch):
+    lib, db = env
+    w = _inotify_watcher(env, monkeypatch, debounce=0.1, initial_scan=False)
+    real, scans = w._handle, []
+
+    def _handle(wd, mask, name):
+        if name == "bad.mp4":
+            raise RuntimeError("boom")
+        real(wd, mask, name)
+
+    monkeypatch.setattr(w, "_handle", _handle)
+    monkeypatch.setattr(w.scanner, "bulk_scan",
+                        lambda root, **kw: scans.append((root, kw["full"])) or {})
+    t = w.start()
+    try:
+        assert _wait(lambda: w.stats["watches"] == 1)
+        (lib / "bad.mp4").write_bytes(b"bad")
+        assert _wait(lambda: (lib, True) in scans)
+        (lib / "good.mp4").write_bytes(b"good")
+        assert _wait(lambda: db.get_stats()["total_files"] == 1)
+        assert t.is_alive() and w.stats["errors"] >= 1
+    finally:
+        w.stop()
+        t.join(timeout=5)
+
+
+def test_overflow_rescan_ignores_the_directory_journal(env, monkeypatch):
+    import os
+    lib, db = env
+    clip = lib / "clip.mp4"
+    clip.write_bytes(b"old")
+    scanner_mod.Scanner(db, lib).bulk_scan(lib)
+    os.utime(lib, (1_000_000_000, 1_000_000_000))
+    scanner_mod.Scanner(db, lib).bulk_scan(lib)          # journal now trusts lib
+
+    w = _inotify_watcher(env, monkeypatch, initial_scan=False)
+    w._setup()
+    try:
+        with open(clip, "r+b") as f:                     # in place: dir mtime unchanged
+            f.write(b"new bytes")
+        os.utime(lib, (1_000_000_000, 1_000_000_000))
+        w._handle(-1, watch_mod.IN_Q_OVERFLOW, "")
+        w._diff_scan(w._rescan.pop())
+        assert w.stats["indexed"] == 1 and not w._full
+        assert db.get_file_by_path(clip.as_posix())["size_bytes"] == len(b"new bytes")
+    finally:
+        w._ino.close()
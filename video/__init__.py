@@ -16,7 +16,7 @@ from __future__ import annotations
 import importlib
 import logging
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List
 
 log = logging.getLogger(__name__)
 
@@ -58,8 +58,12 @@ class MediaIndexer:
                   self.scanner.root_path)
 
     # ── Scanner helpers ────────────────────────────────────────────────────
-    def scan(self, root_path: Path | None = None, workers: int = 4) -> Dict[str, int]:
-        return self.scanner.bulk_scan(root_path, workers)
+    def scan(self, root_path: Path | None = None, workers: int = 4,
+             stage_workers: Dict[str, int] | None = None,
+             full: bool = False,
+             on_progress: Callable[[Dict[str, Any]], None] | None = None) -> Dict[str, Any]:
+        return self.scanner.bulk_scan(root_path, workers, stage_workers, full=full,
+                                      on_progress=on_progress)
 
     def get_recent(self, limit: int = 20) -> List[Dict[str, Any]]:
         return self.db.list_recent(limit)
@@ -1,5 +1,5 @@
 # /video/api.py
-import pkgutil, importlib, uuid, logging, json
+import pkgutil, importlib, uuid, logging, json, asyncio
 
 from pathlib    import Path
 from fastapi    import (
@@ -10,7 +10,7 @@ from fastapi    import (
     HTTPException,
     Request,
 )
-from fastapi.responses          import FileResponse, HTMLResponse
+from fastapi.responses          import FileResponse, HTMLResponse, StreamingResponse
 from fastapi.middleware.cors    import CORSMiddleware
 from pydantic                   import BaseModel, Field
 from typing                     import Optional, List, Dict, Any, Annotated
@@ -29,6 +29,7 @@ from video.bootstrap        import STORAGE
 from video                  import modules
 
 from video.ws               import router as ws_router
+from video                  import progress
 
 origins = [
     "http://localhost:3000",      # your Next dev server
@@ -60,6 +61,8 @@ async def _emit_service_up() -> None:
     bus = get_bus()
     if bus:
         await bus.publish(Event(topic=Topic.VIDEO_API_SERVICE_UP))
+        # scan progress reaches the bus from this loop, never from scan threads
+        app.state.progress_forwarder = asyncio.create_task(progress.forward_to_bus(bus))
 
 # ---------------------------------------------------------------------------
 # BaseModels
@@ -84,6 +87,7 @@ class FolderCreateRequest(BaseModel):
 class ScanRequest(BaseModel):
     directory: str
     recursive: bool = True
+    background: bool = False        # return a job id; follow /jobs/{id}/events
 
 class TranscodeRequest(BaseModel):
     src: str
@@ -147,6 +151,22 @@ app.include_router(router)
 async def favicon():
     return FileResponse("video/web/static/favicon/favicon.ico")
 
+@app.get("/previews/{name}", include_in_schema=False)
+async def preview_file(name: str):
+    """
+    Files under the preview root: ``{id}_{w}.jpg`` posters, the
+    ``{id}_sprite.jpg`` scrub sheet and its ``{id}_sprite.vtt`` index.
+    Names carry the content id, so clients may cache them for good.
+    """
+    from video.config import get_preview_root
+    root = get_preview_root().resolve()
+    path = (root / name).resolve()
+    if path.parent != root or not path.is_file():
+        raise HTTPException(404, "preview not found")
+    media = "text/vtt" if path.suffix == ".vtt" else None
+    return FileResponse(path, media_type=media,
+                        headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
 @app.get("/", include_in_schema=False)
 async def home(request: Request):
     """
@@ -171,15 +191,46 @@ def cli_proxy(req: CLIRequest):
 async def stats():
     return _cli_json({"action": "stats"})
 
+# SQL profile (VIDEO_DB_TRACE=1)
+@app.get("/db/profile")
+async def db_profile(top: int = 25, reset: bool = False):
+    """Slowest statement templates: histograms, p50/p95, EXPLAIN QUERY PLAN."""
+    return _cli_json({"action": "db-profile", "top": top, "reset": reset})
+
 # Recent
 @app.get("/recent")
-async def recent(limit: int = 10):
-    return _cli_json({"action": "recent", "limit": limit})
+async def recent(limit: int = 10, cursor: Optional[str] = None, page: bool = False):
+    """
+    Newest files.  Pass `page=true` (or a `cursor`) to get
+    `{items, next_cursor}` and walk the feed by keyset instead of offset.
+    """
+    return _cli_json({"action": "recent", "limit": limit,
+                      "cursor": cursor, "page": page})
 
 # Scan directory
 @app.post("/scan")
-async def scan(req: ScanRequest):
-    return _cli_json({"action": "scan", "root": req.directory, "workers": 4})
+async def scan(req: ScanRequest, bg: BackgroundTasks):
+    cmd = {"action": "scan", "root": req.directory, "workers": 4}
+    if not req.background:
+        return _cli_json(cmd)
+
+    job_id = str(uuid.uuid4())
+    _jobs[job_id] = {"status": "running", "result": None}
+
+    def _worker():
+        try:
+            _jobs[job_id] = {"status": "completed",
+                             "result": _cli_json({**cmd, "job_id": job_id})}
+            if (progress.latest(job_id) or {}).get("state") not in progress.FINAL:
+                progress.publish(job_id, {"state": "done"})   # e.g. missing root
+        except Exception as e:
+            log.exception("Scan job %s failed", job_id)
+            _jobs[job_id] = {"status": "error", "result": {"error": str(e)}}
+            progress.publish(job_id, {"state": "error", "error": str(e)})
+
+    bg.add_task(_worker)
+    return {"job_id": job_id, "status": "started",
+            "events": f"/jobs/{job_id}/events"}
 
 # Search
 @app.post("/search")
@@ -194,10 +245,15 @@ async def list_batches():
     return _cli_json({"action": "batches", "cmd": "list"})
     
 @app.get("/batches/{batch_name}")
-async def get_batch(batch_name: str):
+async def get_batch(batch_name: str,
+                    limit: Optional[int] = None,
+                    cursor: Optional[str] = None):
+    """Whole batch, or one `{items, next_cursor}` page when limit/cursor given."""
     return _cli_json({"action": "batches",
                       "cmd": "show",
-                      "batch_name": batch_name})
+                      "batch_name": batch_name,
+                      "limit": limit,
+                      "cursor": cursor})
 
 # --- single endpoint --------------------------------------------------------
 @app.post("/batches", response_model=dict)
@@ -248,7 +304,17 @@ async def get_job(job_id: str):
     job = _jobs.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="job not found")
-    return job
+    snap = progress.latest(job_id)
+    return {**job, "progress": snap} if snap else job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent `progress` events for a background job until it ends."""
+    if job_id not in _jobs and progress.latest(job_id) is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return StreamingResponse(progress.sse(job_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache",
+                                      "X-Accel-Buffering": "no"})
 
 @app.delete("/batches/{batch_name}")
 async def delete_batch(batch_name: str):
@@ -11,7 +11,7 @@ Sequence
 3.  Fix volume permissions in containers
 4.  Import every `video.modules.*` plug-in (registers routers / CLI verbs)
 5.  Apply legacy monkey-patches (`video.core.auto`)
-6.  Start WAL-checkpoint → snapshot thread
+6.  Start online DB snapshot thread (SQLite backup API)
 7.  Install graceful-shutdown hooks
 """
 from __future__ import annotations
@@ -21,7 +21,6 @@ import importlib.util as _iu
 import logging
 import os
 import shutil
-import sqlite3
 import subprocess
 import threading
 import time
@@ -169,11 +168,14 @@ _load_plugins()
 # ─────────── 3. legacy monkey-patches (needs DB) ────────────────────
 import video.core.auto  # noqa: F401  (patches on import)
 
-# ─────────── 4. WAL checkpoint → snapshot background thread ────────
+# ─────────── 4. online DB snapshot background thread ───────────────
 def _start_db_backup() -> None:
     if os.getenv("VIDEO_DB_BACKUP_DISABLE", "0") == "1":
         return
 
+    import video.lifecycle
+    from video.storage.snapshot import SnapshotService
+
     interval  = int(os.getenv("DB_SNAPSHOT_SECS", "300"))
     db_path   = Path(os.getenv("VIDEO_DB_PATH", str(DB.db_path)))
     backup_env = os.getenv("VIDEO_DB_BACKUP", "/data/db/media_index.sqlite3")
@@ -184,26 +186,39 @@ def _start_db_backup() -> None:
         backup_to = backup_to / db_path.name
     elif backup_env.endswith(os.sep):
         backup_to = backup_to / db_path.name
+    # The default target is the live DB path itself – never overwrite that
+    if backup_to.resolve() == db_path.resolve():
+        backup_to = db_path.parent / "snapshots" / db_path.name
+
+    # the snapshot doubles as the WAL trim point (MediaDB no longer truncates per call)
+    svc = SnapshotService(db_path, backup_to,
+                          checkpoint=lambda: DB.checkpoint("TRUNCATE"))
+    svc.start(interval)
+    video.lifecycle.on_shutdown(svc.stop)
+
+
+_start_db_backup()
+
+
+def _start_db_optimize() -> None:
+    """Periodic ``PRAGMA optimize`` so planner stats track table growth."""
+    interval = int(os.getenv("VIDEO_DB_OPTIMIZE_SECS", "3600"))
+    if interval <= 0:
+        return
 
     def _loop() -> None:
         while True:
+            time.sleep(interval)
             try:
-                # Force WAL checkpoint
-                with sqlite3.connect(db_path) as cx:
-                    cx.execute("PRAGMA wal_checkpoint(TRUNCATE)")
-                # Copy database to a temporary file, then atomically replace backup
-                tmp = backup_to.with_suffix(".tmp")
-                shutil.copy2(db_path, tmp)
-                tmp.replace(backup_to)
-                log.debug("DB snapshot → %s", backup_to)
+                DB.optimize()
+                log.debug("DB optimize done")
             except Exception as exc:
-                log.warning("DB snapshot failed: %r", exc)
-            time.sleep(interval)
+                log.warning("DB optimize failed: %r", exc)
 
-    threading.Thread(target=_loop, daemon=True, name="db-backup").start()
+    threading.Thread(target=_loop, daemon=True, name="db-optimize").start()
 
 
-_start_db_backup()
+_start_db_optimize()
 
 
 # ─────────── 5. graceful shutdown hooks ─────────────────────────────
@@ -36,6 +36,14 @@ from .bootstrap import start_server
 log = logging.getLogger("video.cli")
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
+def _stage_workers(text: str) -> Dict[str, int]:
+    """argparse type for ``hash=8,probe=2`` → ``{"hash": 8, "probe": 2}``"""
+    try:
+        return {k.strip(): int(v) for k, v in
+                (part.split("=", 1) for part in text.split(",") if part.strip())}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected STAGE=N[,STAGE=N…], got {text!r}")
+
 # ───────── parser builder ─────────────────────────────────────
 def build_parser() -> argparse.ArgumentParser:
     """
@@ -73,7 +81,22 @@ def build_parser() -> argparse.ArgumentParser:
         help="directory to index (defaults to MEDIA_ROOT)",
     )
     scan.add_argument("--workers", type=int, default=4)    
+    scan.add_argument("--stage-workers", type=_stage_workers, metavar="STAGE=N,…",
+                      help="per-stage thread counts, e.g. hash=8,probe=2,preview=1")
+    scan.add_argument("--full", action="store_true",
+                      help="list every directory, ignoring the scan_dirs journal")
     
+    # ───────── watch ────────────────────────────────────
+    watch = sub.add_parser("watch", help="index changes continuously (inotify)")
+    watch.add_argument("roots", nargs="*", type=Path,
+                       help="directories to watch (defaults to all configured roots)")
+    watch.add_argument("--debounce", type=float, default=None,
+                       help="seconds a file must stay unchanged before indexing")
+    watch.add_argument("--poll", type=float, default=None,
+                       help="diff-scan interval for network mounts, in seconds")
+    watch.add_argument("--no-initial-scan", dest="initial_scan", action="store_false",
+                       help="don't diff-scan the roots once at start-up")
+
     # ───────── sync ─────────────────────────────────────
     sync   = sub.add_parser("sync_album", help="sync an iOS Photos album")
     sync.add_argument("--root", type=Path, required=True)
@@ -81,10 +104,51 @@ def build_parser() -> argparse.ArgumentParser:
     sync.add_argument("--category", default="edit", choices=["edit", "digital"])
     sync.add_argument("--copy", action="store_true", default=True)
     # ───────── stats ─────────────────────────────────────
-    sub.add_parser("stats",  help="database statistics")
+    st = sub.add_parser("stats",  help="database statistics")
+    st.add_argument("--rebuild", action="store_true",
+                    help="recompute the stats counters from the files table")
+    # ───────── tech ─────────────────────────────────────
+    tech = sub.add_parser("tech", help="filter files on codec / resolution / fps")
+    tech.add_argument("--vcodec", help="video codec, e.g. hevc, h264, prores")
+    tech.add_argument("--acodec", help="audio codec, e.g. aac, pcm_s24le")
+    tech.add_argument("--min-width", type=int)
+    tech.add_argument("--min-height", type=int, help="e.g. 2160 for 4K")
+    tech.add_argument("--min-fps", type=float)
+    tech.add_argument("-n", "--limit", type=int, default=100)
+    # ───────── dupes ────────────────────────────────────
+    dupes = sub.add_parser("dupes", help="report duplicate files and reclaimable bytes")
+    dupes.add_argument("roots", nargs="*", type=Path,
+                       help="directories to check (defaults to all configured roots)")
+    dupes.add_argument("--min-size", type=int, default=1,
+                       help="ignore files smaller than this many bytes")
+    dupes.add_argument("--all-files", dest="media_only", action="store_false",
+                       help="check every file, not just media extensions")
+    dupes.add_argument("--workers", type=int, default=None,
+                       help="full-hash threads (default $VIDEO_DEDUPE_WORKERS or 2)")
+    dupes.add_argument("-n", "--limit", type=int, default=50,
+                       help="largest groups to list")
+    # ───────── db-profile ─────────────────────────────────
+    prof = sub.add_parser("db-profile",
+                          help="per-statement SQL latency of the running API server "
+                               "(server needs VIDEO_DB_TRACE=1)",
+                          description="Reports the statements run by the API server at "
+                                      "--url (its scans, watch and request handlers), "
+                                      "read from its /db/profile endpoint.  With --local, "
+                                      "reports only this CLI process's own statements.")
+    prof.add_argument("-n", "--top", type=int, default=25)
+    prof.add_argument("--reset", action="store_true",
+                      help="clear the collected histograms after reporting")
+    prof.add_argument("--url", default=os.getenv("VIDEO_API_URL", "http://localhost:8080"),
+                      help="API whose /db/profile is read (else $VIDEO_API_URL "
+                           "or http://localhost:8080)")
+    prof.add_argument("--local", action="store_true",
+                      help="report this CLI process's own statements instead")
     # ───────── recent ─────────────────────────────────────
     recent = sub.add_parser("recent", help="recently indexed files")
     recent.add_argument("-n", "--limit", type=int, default=10)
+    recent.add_argument("--cursor", help="next_cursor from a previous page")
+    recent.add_argument("--page", action="store_true",
+                        help="print {items, next_cursor} instead of a bare list")
     # ───────── dump ─────────────────────────────────────
     dump = sub.add_parser("dump", help="dump DB rows")
     dump.add_argument("--format", choices=["json", "csv"], default="json")
@@ -120,6 +184,8 @@ def build_parser() -> argparse.ArgumentParser:
 
     show = batches_sp.add_parser("show", help="show media files in a batch")
     show.add_argument("batch_name", help="name of the batch to display")
+    show.add_argument("-n", "--limit", type=int, help="page size (keyset paging)")
+    show.add_argument("--cursor", help="next_cursor from a previous page")
 
     # sync + index a Photos album → new batch
     sync_add = batches_sp.add_parser("sync", help="sync album → new batch")
@@ -191,7 +257,27 @@ def dispatch(idx: MediaIndexer, step: Dict[str, Any]) -> Any:
         root_arg = step.get("root")
         root = Path(root_arg) if root_arg else None
         workers = step.get("workers", 4)
-        return ScanResult(**idx.scan(root, workers))
+        on_progress = None
+        if step.get("job_id"):                 # API background job → live progress
+            from video import progress
+            job_id = step["job_id"]
+            on_progress = lambda snap: progress.publish(job_id, snap)
+        return ScanResult(**idx.scan(root, workers, step.get("stage_workers"),
+                                     full=bool(step.get("full")),
+                                     on_progress=on_progress))
+
+    # ─── watch ────────────────────────────────────
+    if action == "watch":
+        from video import lifecycle
+        from video.watch import Watcher, WATCH_DEBOUNCE, WATCH_POLL_SECS
+        debounce, poll = step.get("debounce"), step.get("poll")
+        w = Watcher(idx.scanner,
+                    roots=[Path(r) for r in step.get("roots") or []] or None,
+                    debounce=WATCH_DEBOUNCE if debounce is None else debounce,
+                    poll_interval=WATCH_POLL_SECS if poll is None else poll,
+                    initial_scan=step.get("initial_scan", True))
+        lifecycle.on_shutdown(w.stop)          # ^C / SIGTERM end the loop
+        return w.run()
 
     # ─── sync ─────────────────────────────────────
     if action == "sync_album":
@@ -204,11 +290,46 @@ def dispatch(idx: MediaIndexer, step: Dict[str, Any]) -> Any:
 
     # ─── stats ─────────────────────────────────────
     if action == "stats":
+        if step.get("rebuild"):
+            return idx.db.rebuild_stats()
         return idx.get_stats()
 
+    # ─── tech ─────────────────────────────────────
+    if action == "tech":
+        return idx.db.query_tech(vcodec=step.get("vcodec"), acodec=step.get("acodec"),
+                                 min_width=step.get("min_width"),
+                                 min_height=step.get("min_height"),
+                                 min_fps=step.get("min_fps"),
+                                 limit=step.get("limit") or 100)
+
+    # ─── dupes ────────────────────────────────────
+    if action == "dupes":
+        from video.dedupe import Deduper, DEDUPE_WORKERS
+        roots = [Path(r) for r in step.get("roots") or []] or config.get_all_roots()
+        report = Deduper(roots, db=idx.db,
+                         min_size=step.get("min_size") or 1,
+                         media_only=step.get("media_only", True),
+                         workers=step.get("workers") or DEDUPE_WORKERS).run()
+        return report.to_dict(limit=step.get("limit") or 50)
+
+    # ─── db-profile ─────────────────────────────────
+    if action in ("db-profile", "db_profile"):
+        if step.get("url") and not step.get("local"):
+            return _remote_db_profile(step["url"], step.get("top") or 25,
+                                      bool(step.get("reset")))
+        from video.db import SQL_PROFILER        # in-process (the API's own call)
+        report = SQL_PROFILER.report(step.get("top") or 25)
+        if step.get("reset"):
+            SQL_PROFILER.reset()
+        return report
+
     # ─── recent ─────────────────────────────────────
     if action == "recent":
-        p = RecentParams(limit=step.get("limit", 10))
+        p = RecentParams(limit=step.get("limit", 10),
+                         cursor=step.get("cursor"),
+                         page=step.get("page", False))
+        if p.cursor or p.page:
+            return idx.db.page_recent(p.limit, p.cursor)
         rows = idx.get_recent(p.limit)
         return [dict(row) for row in rows]  # Convert each row to a dict
 
@@ -265,6 +386,9 @@ def dispatch(idx: MediaIndexer, step: Dict[str, Any]) -> Any:
             batch_name = step.get("batch_name")
             if not batch_name:
                 return {"error": "batch_name is required"}
+            limit, cursor = step.get("limit"), step.get("cursor")
+            if limit or cursor:
+                return idx.db.page_by_batch(batch_name, limit or 50, cursor)
             files = idx.db.list_by_batch(batch_name)
             return [dict(file) for file in files]
         
@@ -311,6 +435,22 @@ def dispatch(idx: MediaIndexer, step: Dict[str, Any]) -> Any:
         
     return {"error": f"unknown action {action}"}
 
+def _remote_db_profile(base_url: str, top: int, reset: bool) -> Dict[str, Any]:
+    """
+    The profiler only sees statements of its own process, so the CLI verb
+    asks the running server for its ``/db/profile`` instead.
+    """
+    from urllib.error import URLError
+    from urllib.parse import urlencode
+    from urllib.request import urlopen
+    url = (f"{base_url.rstrip('/')}/db/profile?"
+           + urlencode({"top": top, "reset": str(reset).lower()}))
+    try:
+        with urlopen(url, timeout=10) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except (URLError, OSError, ValueError) as exc:
+        return {"error": f"could not read {url}: {exc}"}
+
 # ─── top-level ─────────────────────────────────────
 def run_cli(argv: List[str] | None = None) -> None:
     ns = build_parser().parse_args(argv)
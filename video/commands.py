@@ -13,18 +13,24 @@ from typing import Optional, List, Dict, Any, Union
 from .cli import register
 
 import json
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 
 # ─── Parameter dataclasses ─────────────────────────
 @dataclass
 class ScanParams:
     root: Optional[Path]
     workers: int = 4
+    stage_workers: Optional[Dict[str, int]] = None
+    full: bool = False
+    job_id: Optional[str] = None          # publish progress under this id
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             "root": str(self.root) if self.root else None,
-            "workers": self.workers
+            "workers": self.workers,
+            "stage_workers": self.stage_workers,
+            "full": self.full,
+            "job_id": self.job_id,
         }
 
 @dataclass
@@ -55,10 +61,12 @@ class BackupParams:
 
 @dataclass
 class RecentParams:
-    limit: int = 10
+    limit:  int = 10
+    cursor: Optional[str] = None
+    page:   bool = False          # return {"items", "next_cursor"} instead of a list
     
     def to_dict(self) -> Dict[str, Any]:
-        return {"limit": self.limit}
+        return {"limit": self.limit, "cursor": self.cursor, "page": self.page}
 
 @dataclass
 class DumpParams:
@@ -89,6 +97,14 @@ class ScanResult:
     processed: int
     errors:    int
     total:     int
+    skipped:   int = 0
+    removed:   int = 0
+    dirs_skipped: int = 0
+    rejected:  int = 0
+    complete:  bool = True
+    source_error: Optional[str] = None
+    io:        Dict[str, Any] = field(default_factory=dict)
+    stages:    Dict[str, Any] = field(default_factory=dict)
     
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
@@ -146,7 +162,9 @@ def create_params_from_dict(action: str, data: Dict[str, Any]) -> CommandParams:
     """Factory function to create appropriate params from dict."""
     if action == "scan":
         root = Path(data["root"]) if data.get("root") else None
-        return ScanParams(root=root, workers=data.get("workers", 4))
+        return ScanParams(root=root, workers=data.get("workers", 4),
+                          stage_workers=data.get("stage_workers"),
+                          full=bool(data.get("full")), job_id=data.get("job_id"))
     
     elif action == "sync_album":
         return SyncAlbumParams(
@@ -163,7 +181,9 @@ def create_params_from_dict(action: str, data: Dict[str, Any]) -> CommandParams:
         )
     
     elif action == "recent":
-        return RecentParams(limit=data.get("limit", 10))
+        return RecentParams(limit=data.get("limit", 10),
+                            cursor=data.get("cursor"),
+                            page=data.get("page", False))
     
     elif action == "dump":
         return DumpParams(fmt=data.get("format", "json"))
@@ -212,6 +212,27 @@ def get_all_roots() -> list[Path]:
             seen.add(p); final.append(p)
     return final
 
+def get_io_limits() -> dict[Path, tuple[int | None, int | None]]:
+    """
+    Per-root I/O budgets (see ``video.iosched``) from ``[io] limits`` and
+    ``$VIDEO_IO_LIMITS`` (which wins): ``/mnt/nas=32/4, /srv/archive=/1``
+    → ``{root: (list, read)}``; a blank side keeps the detected default.
+    """
+    out: dict[Path, tuple[int | None, int | None]] = {}
+    for text in (get("io", "limits", ""), os.getenv("VIDEO_IO_LIMITS", "")):
+        for part in filter(None, (p.strip() for p in (text or "").split(","))):
+            root, _, spec = part.rpartition("=")
+            n_list, _, n_read = spec.partition("/")
+            try:
+                lim = (int(n_list) if n_list.strip() else None,
+                       int(n_read) if n_read.strip() else None)
+            except ValueError:
+                log.warning("ignoring bad I/O limit %r", part)
+                continue
+            if root.strip():
+                out[Path(root.strip()).expanduser()] = lim
+    return out
+
 def get_preview_root():
     _env = os.getenv("VIDEO_PREVIEW_ROOT")
     _cfg = get_path("paths", "preview_root")
@@ -0,0 +1,312 @@
+# video/container.py
+"""
+Header-only container parsing – pure stdlib, no subprocess.
+
+    info = parse_header(Path("clip.mov"))     # ffprobe-shaped dict or None
+
+ISO-BMFF (MP4 / MOV / M4V / 3GP) is read box by box: top-level headers are
+skipped with seeks (``mdat`` is never read) and only ``mvhd``, ``tkhd``,
+``mdhd``, ``hdlr`` and the first ``stsd`` entry of each track are loaded,
+wherever ``moov`` sits in the file.  Matroska / WebM is read as EBML up to
+the first ``Cluster`` (``HEAD_BYTES``).
+
+The result mimics ``ffprobe -show_format -show_streams`` closely enough for
+``probe.summarize`` and the scanner (``format.duration``, per-stream
+``codec_type`` / ``codec_name`` / ``width`` / ``height`` …) and carries
+``"source": "header"``.  Anything unusual – fragmented MP4 without a
+duration, live WebM, truncated files – returns ``None`` so the caller
+falls back to ffprobe.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import struct
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+log = logging.getLogger("video.container")
+
+HEAD_BYTES = 512 * 1024            # EBML: give up if no Cluster by then
+LEAF_MAX   = 64 * 1024             # largest leaf box we are willing to read
+
+BMFF_EXTS = {".mp4", ".mov", ".m4v", ".m4a", ".3gp", ".3g2", ".mj2"}
+EBML_EXTS = {".mkv", ".webm", ".mka"}
+
+_EPOCH_1904 = datetime(1904, 1, 1, tzinfo=timezone.utc)
+_EPOCH_2001 = datetime(2001, 1, 1, tzinfo=timezone.utc)
+
+# sample-entry fourcc / Matroska CodecID → ffprobe codec_name
+_FOURCC = {
+    "avc1": "h264", "avc3": "h264", "hvc1": "hevc", "hev1": "hevc",
+    "av01": "av1", "vp08": "vp8", "vp09": "vp9", "mp4v": "mpeg4",
+    "apch": "prores", "apcn": "prores", "apcs": "prores", "apco": "prores",
+    "ap4h": "prores", "ap4x": "prores", "jpeg": "mjpeg", "mjpa": "mjpeg",
+    "mp4a": "aac", "ac-3": "ac3", "ec-3": "eac3", "Opus": "opus",
+    "fLaC": "flac", "alac": "alac", "lpcm": "pcm", "sowt": "pcm_s16le",
+    "twos": "pcm_s16be", "in24": "pcm_s24be", "ipcm": "pcm",
+}
+_MKV_CODEC = {
+    "V_MPEG4/ISO/AVC": "h264", "V_MPEGH/ISO/HEVC": "hevc", "V_AV1": "av1",
+    "V_VP8": "vp8", "V_VP9": "vp9", "V_PRORES": "prores", "V_MJPEG": "mjpeg",
+    "A_AAC": "aac", "A_OPUS": "opus", "A_VORBIS": "vorbis", "A_FLAC": "flac",
+    "A_AC3": "ac3", "A_EAC3": "eac3", "A_MPEG/L3": "mp3", "A_PCM/INT/LIT": "pcm_s16le",
+}
+
+
+class _Bad(Exception):
+    """Structure we can't (or won't) handle – fall back to ffprobe."""
+
+
+def parse_header(path: Path) -> Optional[Dict[str, Any]]:
+    """ffprobe-shaped metadata from the container header, or ``None``."""
+    path = Path(path)
+    ext = path.suffix.lower()
+    try:
+        with open(path, "rb") as f:
+            if ext in BMFF_EXTS:
+                return _parse_bmff(f)
+            if ext in EBML_EXTS:
+                return _parse_ebml(f)
+    except (_Bad, OSError, struct.error, ValueError, IndexError) as exc:
+        log.debug("header parse failed for %s: %s", path, exc)
+    return None
+
+
+def _result(fmt_name: str, duration: float, streams: List[Dict[str, Any]],
+            created: Optional[datetime]) -> Dict[str, Any]:
+    if not duration or duration <= 0 or not streams:
+        raise _Bad("no duration / streams")
+    fmt: Dict[str, Any] = {"format_name": fmt_name, "duration": f"{duration:.6f}",
+                           "nb_streams": len(streams)}
+    if created is not None:
+        fmt["tags"] = {"creation_time": created.strftime("%Y-%m-%dT%H:%M:%S.000000Z")}
+    for i, st in enumerate(streams):
+        st["index"] = i
+    return {"format": fmt, "streams": streams, "source": "header"}
+
+
+# ─── ISO-BMFF ──────────────────────────────────────────────────────────────
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts"}
+
+
+def _boxes(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield ``(type, payload_start, payload_end)`` for boxes in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        hdr = f.read(8)
+        if len(hdr) < 8:
+            return
+        size, kind = struct.unpack(">I4s", hdr)
+        head = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            head = 16
+        elif size == 0:
+            size = end - pos                    # box runs to the end
+        if size < head:
+            raise _Bad(f"bad box size at {pos}")
+        yield kind, pos + head, min(pos + size, end)
+        pos += size
+
+
+def _read_leaf(f: BinaryIO, start: int, end: int) -> bytes:
+    f.seek(start)
+    return f.read(min(end - start, LEAF_MAX))
+
+
+def _mvhd(b: bytes) -> Tuple[float, Optional[datetime]]:
+    if b[0] == 1:
+        created, _, scale, dur = struct.unpack_from(">QQIQ", b, 4)
+    else:
+        created, _, scale, dur = struct.unpack_from(">IIII", b, 4)
+    if not scale:
+        raise _Bad("mvhd timescale 0")
+    when = _EPOCH_1904 + timedelta(seconds=created) if created else None
+    return dur / scale, when
+
+
+def _tkhd(b: bytes) -> Tuple[float, float, int]:
+    off = 4 + (32 if b[0] == 1 else 20) + 8 + 8        # times/ids, reserved, layer…
+    a, bb, _, c, d, _ = struct.unpack_from(">iiiiii", b, off)
+    w, h = struct.unpack_from(">II", b, off + 36)
+    rot = round(math.degrees(math.atan2(bb / 65536, a / 65536))) % 360
+    return w / 65536, h / 65536, rot
+
+
+def _parse_bmff(f: BinaryIO) -> Dict[str, Any]:
+    f.seek(0, 2)
+    size = f.tell()
+    top = list(_boxes(f, 0, size))
+    kinds = [k for k, _, _ in top]
+    if not kinds or kinds[0] not in (b"ftyp", b"wide", b"free", b"moov", b"skip", b"mdat"):
+        raise _Bad("not ISO-BMFF")
+    if b"moof" in kinds:
+        raise _Bad("fragmented")
+    moov = next(((s, e) for k, s, e in top if k == b"moov"), None)
+    if moov is None:
+        raise _Bad("no moov")
+    fmt_name = "mov,mp4,m4a,3gp,3g2,mj2"        # what ffprobe reports for the family
+
+    duration, created, streams = 0.0, None, []
+    for k, s, e in _boxes(f, *moov):
+        if k == b"mvhd":
+            duration, created = _mvhd(_read_leaf(f, s, e))
+        elif k == b"trak":
+            st = _trak(f, s, e)
+            if st:
+                streams.append(st)
+    return _result(fmt_name, duration, streams, created)
+
+
+def _trak(f: BinaryIO, start: int, end: int) -> Optional[Dict[str, Any]]:
+    info: Dict[str, Any] = {}
+
+    def _walk(s: int, e: int) -> None:
+        for k, ps, pe in _boxes(f, s, e):
+            if k in _CONTAINERS:
+                _walk(ps, pe)
+            elif k == b"tkhd":
+                info["tkhd"] = _tkhd(_read_leaf(f, ps, pe))
+            elif k == b"mdhd":
+                b = _read_leaf(f, ps, pe)
+                scale, dur = (struct.unpack_from(">IQ", b, 20) if b[0] == 1
+                              else struct.unpack_from(">II", b, 12))
+                info["duration"] = dur / scale if scale else None
+            elif k == b"hdlr":
+                # mdia's hdlr comes first; QuickTime's minf/hdlr names the data ref
+                info.setdefault("handler", _read_leaf(f, ps, pe)[8:12])
+            elif k == b"stsd":
+                info["stsd"] = _read_leaf(f, ps, pe)
+
+    _walk(start, end)
+    handler = info.get("handler")
+    kind = {b"vide": "video", b"soun": "audio"}.get(handler)
+    stsd = info.get("stsd")
+    if kind is None or not stsd or len(stsd) < 16:
+        return None
+    fourcc = stsd[12:16].decode("latin-1")
+    entry = stsd[16:]                            # after size/type of first entry
+    st: Dict[str, Any] = {"codec_type": kind,
+                          "codec_name": _FOURCC.get(fourcc, fourcc.strip().lower()),
+                          "codec_tag_string": fourcc}
+    if info.get("duration"):
+        st["duration"] = f"{info['duration']:.6f}"
+    if kind == "video":
+        w, h = struct.unpack_from(">HH", entry, 24)
+        tw, th, rot = info.get("tkhd", (0, 0, 0))
+        st["width"], st["height"] = (w or int(tw)), (h or int(th))
+        if rot:
+            st["side_data_list"] = [{"rotation": -rot if rot <= 180 else 360 - rot}]
+    elif struct.unpack_from(">H", entry, 8)[0] < 2:   # QuickTime v2 sound: other layout
+        channels, _, _, _, rate = struct.unpack_from(">HHHHI", entry, 16)
+        st["channels"] = channels
+        st["sample_rate"] = str(rate >> 16)
+    return st
+
+
+# ─── EBML (Matroska / WebM) ────────────────────────────────────────────────
+_EBML, _SEGMENT, _CLUSTER = 0x1A45DFA3, 0x18538067, 0x1F43B675
+_INFO, _TRACKS, _TRACK_ENTRY = 0x1549A966, 0x1654AE6B, 0xAE
+_TIMESCALE, _DURATION, _DATE = 0x2AD7B1, 0x4489, 0x4461
+_TRACK_TYPE, _CODEC_ID, _VIDEO, _AUDIO = 0x83, 0x86, 0xE0, 0xE1
+_PIXEL_W, _PIXEL_H, _CHANNELS, _FREQ = 0xB0, 0xBA, 0x9F, 0xB5
+
+
+def _vint(buf: bytes, pos: int, keep_marker: bool) -> Tuple[int, int]:
+    first = buf[pos]
+    if not first:
+        raise _Bad("bad vint")
+    n = 8 - first.bit_length() + 1
+    if pos + n > len(buf):
+        raise _Bad("truncated vint")
+    val = first if keep_marker else first & (0xFF >> n)
+    for b in buf[pos + 1:pos + n]:
+        val = (val << 8) | b
+    if not keep_marker and val == (1 << (7 * n)) - 1:
+        val = -1                                 # unknown size
+    return val, pos + n
+
+
+def _elements(buf: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    """Yield ``(id, data_start, data_end)``; unknown sizes run to *end*."""
+    pos = start
+    while pos < end:
+        eid, pos = _vint(buf, pos, True)
+        size, pos = _vint(buf, pos, False)
+        stop = end if size < 0 else min(pos + size, end)
+        yield eid, pos, stop
+        if eid == _CLUSTER:
+            return
+        pos = stop
+
+
+def _uint(b: bytes) -> int:
+    return int.from_bytes(b, "big")
+
+
+def _parse_ebml(f: BinaryIO) -> Dict[str, Any]:
+    buf = f.read(HEAD_BYTES)
+    it = _elements(buf, 0, len(buf))
+    head = next(it, None)
+    if head is None or head[0] != _EBML:
+        raise _Bad("not EBML")
+    seg = next(it, None)
+    if seg is None or seg[0] != _SEGMENT:
+        raise _Bad("no Segment")
+    _, s, e = seg
+
+    scale, duration, created, streams = 1_000_000, 0.0, None, []
+    saw_cluster = False
+    for cid, cs, ce in _elements(buf, s, e):
+        if cid == _INFO:
+            for iid, i_s, i_e in _elements(buf, cs, ce):
+                if iid == _TIMESCALE:
+                    scale = _uint(buf[i_s:i_e])
+                elif iid == _DURATION:
+                    fmt = ">f" if i_e - i_s == 4 else ">d"
+                    duration = struct.unpack(fmt, buf[i_s:i_e])[0]
+                elif iid == _DATE:
+                    ns = int.from_bytes(buf[i_s:i_e], "big", signed=True)
+                    created = _EPOCH_2001 + timedelta(microseconds=ns // 1000)
+        elif cid == _TRACKS:
+            for tid, ts, te in _elements(buf, cs, ce):
+                if tid == _TRACK_ENTRY:
+                    st = _mkv_track(buf, ts, te)
+                    if st:
+                        streams.append(st)
+        elif cid == _CLUSTER:
+            saw_cluster = True
+            break
+    if not saw_cluster and len(buf) == HEAD_BYTES:
+        raise _Bad("header larger than HEAD_BYTES")
+    return _result("matroska,webm", duration * scale / 1e9, streams, created)
+
+
+def _mkv_track(buf: bytes, start: int, end: int) -> Optional[Dict[str, Any]]:
+    kind, codec, sub = None, None, {}
+    for eid, s, e in _elements(buf, start, end):
+        if eid == _TRACK_TYPE:
+            kind = {1: "video", 2: "audio"}.get(_uint(buf[s:e]))
+        elif eid == _CODEC_ID:
+            codec = buf[s:e].rstrip(b"\0").decode("ascii", "replace")
+        elif eid in (_VIDEO, _AUDIO):
+            for sid, ss, se in _elements(buf, s, e):
+                sub[sid] = buf[ss:se]
+    if kind is None or codec is None:
+        return None
+    st: Dict[str, Any] = {"codec_type": kind,
+                          "codec_name": _MKV_CODEC.get(codec, codec.split("/")[0][2:].lower())}
+    if kind == "video":
+        st["width"] = _uint(sub.get(_PIXEL_W, b"")) or None
+        st["height"] = _uint(sub.get(_PIXEL_H, b"")) or None
+    else:
+        if _CHANNELS in sub:
+            st["channels"] = _uint(sub[_CHANNELS])
+        if _FREQ in sub:
+            raw = sub[_FREQ]
+            rate = struct.unpack(">f" if len(raw) == 4 else ">d", raw)[0]
+            st["sample_rate"] = str(int(rate))
+    return st
@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Optional, Dict, Any
 
 from .base import Artifact, ArtifactState, ArtifactEventType
+from ...fingerprint import digest
 from pydantic.dataclasses import dataclass
 
 @dataclass
@@ -63,11 +64,7 @@ class AudioArtifact(Artifact):
         return True
 
     def _hash_file(self, path: str) -> str:
-        sha256 = hashlib.sha256()
-        with open(path, "rb") as fh:
-            for chunk in iter(lambda: fh.read(8192), b""):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+        return digest(path, "sha256")
 
     def _hash_bytes(self, data: bytes) -> str:
         return hashlib.sha256(data).hexdigest()
@@ -30,6 +30,9 @@ class ImageMeta(MetaBase):
     camera_make       : str      | None = None
     camera_model      : str      | None = None
     orientation       : int      | None = None
+    gps_lat           : float    | None = None
+    gps_lon           : float    | None = None
+    gps_alt           : float    | None = None
     keywords          : List[str]      = Field(default_factory=list)
 
 class ProcessingMeta(MetaBase):
@@ -29,6 +29,7 @@ from pydantic.dataclasses import dataclass  # Pydantic-aware dataclass
 
 from .base import Artifact, ArtifactState, ArtifactEventType
 from .metadata import VideoMetaContainer, TechMeta
+from ...fingerprint import digest
 
 # --------------------------------------------------------------------------- #
 # artefact                                                                    #
@@ -138,11 +139,7 @@ class VideoArtifact(Artifact):
     # -----------------------------------------------------------------------
     @staticmethod
     def _hash_file(path: str) -> str:
-        sha = hashlib.sha256()
-        with open(path, "rb") as fh:
-            for chunk in iter(lambda: fh.read(8192), b""):
-                sha.update(chunk)
-        return sha.hexdigest()
+        return digest(path, "sha256")
 
     @staticmethod
     def _hash_bytes(data: bytes) -> str:
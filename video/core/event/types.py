@@ -19,6 +19,7 @@ class Topic(str, enum.Enum):
     # video-api ­­­> UI / workers
     DAM_INGESTED            = "dam.ingested"
     DAM_FAILED              = "dam.failed"
+    SCAN_PROGRESS           = "scan.progress"
 
     # service readiness events
     CAPTURE_SERVICE_UP      = "capture.service_up"
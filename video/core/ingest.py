@@ -16,27 +16,25 @@ files into the sharded MEDIA_ROOT tree (ab/cdef…/abcdef….ext).
 
 from __future__ import annotations
 
-import hashlib
 import logging
+import mimetypes
 import shutil
+from datetime import datetime
 from pathlib import Path
-from typing import Iterable, Final, Sequence
+from typing import Any, Dict, Iterable, Final, Sequence
 
 from video.config import MEDIA_ROOT
-from video.probe  import probe_media          # ffprobe helper
+from video.probe  import probe_cached         # ffprobe helper (media_tech cache)
+from video.fingerprint import digest as _digest
 
 _LOG: Final = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------#
 # ────────── internal helpers ───────────────────────────────────────────────#
 
-def _sha1(path: Path, *, buf_size: int = 1 << 20) -> str:
-    """Return the hexadecimal SHA-1 of *path* (streamed, constant-memory)."""
-    h = hashlib.sha1()
-    with path.open("rb") as fh:
-        while chunk := fh.read(buf_size):
-            h.update(chunk)
-    return h.hexdigest()
+def _sha1(path: Path) -> str:
+    """Return the hexadecimal SHA-1 of *path* (one cached ``fingerprint`` pass)."""
+    return _digest(path, "sha1")
 
 
 def _target_for_digest(digest: str, suffix: str) -> Path:
@@ -49,6 +47,30 @@ def _target_for_digest(digest: str, suffix: str) -> Path:
     return MEDIA_ROOT / shard / rest / f"{digest}{suffix.lower()}"
 
 
+def _row_for(dest: Path, digest: str, meta: Dict[str, Any] | None,
+             batch_name: str | None) -> Dict[str, Any]:
+    """Build a ``files`` row for *dest* from its digest + ffprobe JSON."""
+    meta   = meta or {}
+    stream = next((s for s in meta.get("streams", [])
+                   if s.get("codec_type") == "video"), {})
+    dur    = meta.get("format", {}).get("duration")
+    st     = dest.stat()
+    return {
+        "id"          : digest,
+        "path"        : dest.as_posix(),
+        "size_bytes"  : st.st_size,
+        "mtime"       : datetime.fromtimestamp(st.st_mtime).isoformat(),
+        "mime"        : mimetypes.guess_type(dest.name)[0],
+        "width_px"    : stream.get("width"),
+        "height_px"   : stream.get("height"),
+        "duration_s"  : float(dur) if dur else None,
+        "batch"       : batch_name,
+        "sha1"        : digest,
+        "created_at"  : datetime.now().isoformat(),
+        "preview_path": None,
+    }
+
+
 def _db():
     """Return the lazily-initialised global MediaDB instance."""
     from video import DB                         # late import avoids cycles
@@ -66,8 +88,20 @@ def ingest_files(
     """
     Move each *path* to the canonical store and register it in the DB.
 
+    DB rows are written through one ``unit_of_work`` so a large ingest
+    commits in batches rather than once per file.
+
     Returns the number of successfully processed files.
     """
+    with _db().unit_of_work() as uow:
+        processed = _ingest_into(uow, paths, batch_name)
+
+    _LOG.info("Ingest complete – %d item(s) processed", processed)
+    return processed
+
+
+def _ingest_into(uow, paths: Iterable[str | Path], batch_name: str | None) -> int:
+    """Move/probe each path and queue its row on *uow*; returns the count."""
     processed = 0
 
     for raw in paths:
@@ -90,20 +124,15 @@ def ingest_files(
                 shutil.move(str(p), dest)
                 _LOG.info("→ %s  %s", digest[:8], dest)
 
-            # ── Probe & DB upsert ──────────────────────────────────────
-            meta = probe_media(dest)
-            _db().add_video(
-                path=dest,
-                sha1=digest,
-                meta={**meta, "batch": batch_name},
-            )
+            # ── Probe & queue DB upsert ────────────────────────────────
+            meta = probe_cached(dest, digest, db=_db())
+            uow.upsert(_row_for(dest, digest, meta, batch_name))
 
             processed += 1
 
         except Exception as exc:                  # noqa: BLE001
             _LOG.exception("Ingest failed for %s: %s", p, exc)
 
-    _LOG.info("Ingest complete – %d item(s) processed", processed)
     return processed
 
 
@@ -8,11 +8,20 @@ from __future__ import annotations
 import time
 import tempfile
 import atexit
+import base64
+import bisect
+import json
+import logging
+import queue
+import re
+import threading
+import weakref
 import sqlite3, os
+from concurrent.futures import Future
 from pathlib    import Path
 from contextlib import contextmanager
 from datetime   import datetime
-from typing     import Optional, List, Dict, Any
+from typing     import Optional, List, Dict, Any, Iterable, Callable, Tuple
 
 import fcntl  # Linux-only; use portalocker for cross-platform if you need Mac/Windows
 
@@ -22,13 +31,1188 @@ from .config import DB_PATH                     # resolved by video.config
 DB_FILE        = Path(os.getenv("VIDEO_DB_PATH", str(DB_PATH))).expanduser()
 _BOOTSTRAPPED  = False                # guarded WAL initialisation flag
 
+# ─── connection tuning ───────────────────────────────────────────────────────
+# Per-connection PRAGMAs, picked with $VIDEO_DB_PROFILE.  cache_size is in KiB
+# when negative (SQLite convention); mmap_size is bytes of the DB file that may
+# be memory-mapped instead of read() through the page cache.
+PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    "low-memory": {"cache_size": -2000,  "mmap_size": 0,           "temp_store": "DEFAULT"},
+    "default":    {"cache_size": -8000,  "mmap_size": 64 * 2**20,  "temp_store": "MEMORY"},
+    "throughput": {"cache_size": -64000, "mmap_size": 512 * 2**20, "temp_store": "MEMORY"},
+}
+DB_PROFILE      = os.getenv("VIDEO_DB_PROFILE", "default")
+READONLY_POOL   = os.getenv("VIDEO_DB_READONLY_POOL", "1") != "0"
+STMT_CACHE_SIZE = int(os.getenv("VIDEO_DB_STMT_CACHE", "256"))   # per connection
+
+
+# ─── statement profiling (opt-in) ────────────────────────────────────────────
+# VIDEO_DB_TRACE=1 opens pooled connections with a Connection subclass that
+# times every execute()/executemany() (plus the first fetch, so blocking sorts
+# and scans are included) and folds them into per-template histograms.
+# Statements slower than VIDEO_DB_SLOW_MS are logged with EXPLAIN QUERY PLAN.
+# Read the numbers with `video db-profile` or GET /db/profile.
+
+_HIST_BOUNDS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+_PLAN_VERBS     = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+_RE_STRING      = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER      = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_IN_LIST     = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_SPACE       = re.compile(r"\s+")
+
+
+def _sql_template(sql: str) -> str:
+    """Collapse literals / IN-lists / whitespace so equivalent statements group."""
+    t = _RE_STRING.sub("?", sql)
+    t = _RE_NUMBER.sub("?", t)
+    t = _RE_IN_LIST.sub("(…)", t)
+    return _RE_SPACE.sub(" ", t).strip()
+
+
+class SQLProfiler:
+    """Thread-safe per-template latency histograms + slow-query plans."""
+
+    def __init__(self, enabled: bool = False, slow_ms: float = 100.0) -> None:
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self._lock   = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._templates: Dict[str, str] = {}          # raw sql → template
+        self._log = logging.getLogger("video.db.profile")
+
+    def record(self, cx: sqlite3.Connection, sql: str, params: Any,
+               seconds: float, many: bool = False) -> None:
+        ms = seconds * 1000
+        tpl = self._templates.get(sql)
+        if tpl is None:
+            tpl = _sql_template(sql)
+            if len(self._templates) < 4096:
+                self._templates[sql] = tpl
+        with self._lock:
+            st = self._stats.get(tpl)
+            if st is None:
+                st = self._stats[tpl] = {
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "hist": [0] * (len(_HIST_BOUNDS_MS) + 1), "plan": None,
+                    "slow": 0,
+                }
+            st["count"]    += 1
+            st["total_ms"] += ms
+            st["max_ms"]    = max(st["max_ms"], ms)
+            st["hist"][bisect.bisect_left(_HIST_BOUNDS_MS, ms)] += 1
+            slow = ms >= self.slow_ms
+            if slow:
+                st["slow"] += 1
+            want_plan = slow and st["plan"] is None and not many
+        if not slow:
+            return
+        if want_plan and sql.lstrip()[:7].upper().startswith(_PLAN_VERBS):
+            try:
+                rows = sqlite3.Connection.execute(cx, "EXPLAIN QUERY PLAN " + sql, params)
+                plan = [r[3] for r in rows.fetchall()]
+            except sqlite3.Error as exc:
+                plan = [f"<plan unavailable: {exc}>"]
+            with self._lock:
+                st["plan"] = plan
+        self._log.warning("slow query %.1f ms: %s | plan: %s",
+                          ms, tpl, " / ".join(st["plan"] or ["-"]))
+
+    @staticmethod
+    def _quantile(hist: List[int], q: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding quantile *q*; None if unbounded."""
+        need, seen = q * sum(hist), 0
+        for i, n in enumerate(hist):
+            seen += n
+            if seen >= need:
+                return _HIST_BOUNDS_MS[i] if i < len(_HIST_BOUNDS_MS) else None
+        return None
+
+    def report(self, top: int = 25) -> Dict[str, Any]:
+        with self._lock:
+            items = [(t, dict(st, hist=list(st["hist"]))) for t, st in self._stats.items()]
+        items.sort(key=lambda kv: kv[1]["total_ms"], reverse=True)
+        labels = [f"<={b}ms" for b in _HIST_BOUNDS_MS] + [f">{_HIST_BOUNDS_MS[-1]}ms"]
+        out = []
+        for tpl, st in items[:top]:
+            plan = st["plan"] or []
+            out.append({
+                "sql"      : tpl,
+                "count"    : st["count"],
+                "total_ms" : round(st["total_ms"], 3),
+                "mean_ms"  : round(st["total_ms"] / st["count"], 3),
+                "max_ms"   : round(st["max_ms"], 3),
+                "p50_ms"   : self._quantile(st["hist"], 0.50),
+                "p95_ms"   : self._quantile(st["hist"], 0.95),
+                "slow"     : st["slow"],
+                "histogram": {l: n for l, n in zip(labels, st["hist"]) if n},
+                "plan"     : st["plan"],
+                # "SCAN files" without "USING … INDEX" = full table scan
+                "full_scan": any(l.startswith("SCAN ") and "USING" not in l for l in plan),
+                "temp_sort": any("TEMP B-TREE" in l for l in plan),
+            })
+        return {"enabled": self.enabled, "slow_ms": self.slow_ms,
+                "templates": len(items), "statements": out}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+SQL_PROFILER = SQLProfiler(
+    enabled=os.getenv("VIDEO_DB_TRACE", "0") == "1",
+    slow_ms=float(os.getenv("VIDEO_DB_SLOW_MS", "100")),
+)
+
+
+class _ProfiledCursor(sqlite3.Cursor):
+    """Times execute + first fetch; the sample is recorded once per statement."""
+
+    _pending: Optional[tuple] = None                  # (sql, params, seconds)
+
+    def _settle(self, extra: float = 0.0) -> None:
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            sql, params, dt = pending
+            SQL_PROFILER.record(self.connection, sql, params, dt + extra)
+
+    def execute(self, sql, params=()):
+        self._settle()
+        t0 = time.perf_counter()
+        super().execute(sql, params)
+        dt = time.perf_counter() - t0
+        if self.description is None:                  # nothing to fetch
+            SQL_PROFILER.record(self.connection, sql, params, dt)
+        else:
+            self._pending = (sql, params, dt)
+        return self
+
+    def executemany(self, sql, seq):
+        self._settle()
+        t0 = time.perf_counter()
+        super().executemany(sql, seq)
+        SQL_PROFILER.record(self.connection, sql, (), time.perf_counter() - t0, many=True)
+        return self
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._settle(time.perf_counter() - t0)
+        return row
+
+    def fetchmany(self, *args, **kw):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(*args, **kw)
+        self._settle(time.perf_counter() - t0)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._settle(time.perf_counter() - t0)
+        return rows
+
+    def close(self):
+        self._settle()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._settle()
+        except Exception:
+            pass
+
+
+class _ProfiledConnection(sqlite3.Connection):
+    def execute(self, sql, params=()):
+        return self.cursor(_ProfiledCursor).execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor(_ProfiledCursor).executemany(sql, seq)
+
+
+class _ConnectionPool:
+    """
+    Long-lived SQLite connections for one database file.
+
+    * one reader connection per thread (thread-local, opened lazily)
+    * one shared writer connection, serialised by ``write_lock``
+
+    With ``read_only=True`` connections are opened ``mode=ro`` with
+    ``query_only`` set and ``writer()`` is unavailable; MediaDB keeps one
+    such pool next to the read-write one for its read helpers.
+
+    Connections are opened once and keep their PRAGMAs and prepared-statement
+    cache for the life of the process, so helpers no longer pay for
+    connect + PRAGMA round-trips on every call.
+    """
+
+    def __init__(self, db_path: Path, profile: str = DB_PROFILE,
+                 read_only: bool = False) -> None:
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"unknown DB profile {profile!r} "
+                             f"(choose from {', '.join(PRAGMA_PROFILES)})")
+        self.db_path    = db_path
+        self.profile    = profile
+        self.read_only  = read_only
+        self.pid        = os.getpid()            # pools never cross a fork()
+        self.write_lock = threading.RLock()
+        self._local     = threading.local()
+        self._writer: Optional[sqlite3.Connection] = None
+        # thread-ident → (weakref(thread), connection); lets us close readers
+        # whose worker thread has exited (e.g. a finished ThreadPoolExecutor)
+        self._readers: Dict[int, tuple] = {}
+        self._readers_lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        target, uri = self.db_path, False
+        if self.read_only:
+            target, uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro", True
+        cx = sqlite3.connect(
+            target,
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STMT_CACHE_SIZE,
+            uri=uri,
+            factory=_ProfiledConnection if SQL_PROFILER.enabled else sqlite3.Connection,
+        )
+        cx.row_factory = sqlite3.Row
+        if self.read_only:
+            cx.execute("PRAGMA query_only=ON;")
+        cx.execute("PRAGMA foreign_keys=ON;")
+        cx.execute("PRAGMA recursive_triggers=ON;")     # folder pruning cascades
+        cx.execute("PRAGMA busy_timeout=5000;")
+        for key, val in PRAGMA_PROFILES[self.profile].items():
+            cx.execute(f"PRAGMA {key}={val};")
+        return cx
+
+    def reader(self) -> sqlite3.Connection:
+        cx = getattr(self._local, "cx", None)
+        if cx is None:
+            cx = self._local.cx = self._open()
+            with self._readers_lock:
+                self._prune_dead_readers()
+                self._readers[threading.get_ident()] = (
+                    weakref.ref(threading.current_thread()), cx)
+        return cx
+
+    def _prune_dead_readers(self) -> None:
+        for ident, (t_ref, cx) in list(self._readers.items()):
+            t = t_ref()
+            if t is None or not t.is_alive():
+                del self._readers[ident]
+                try:
+                    cx.close()
+                except sqlite3.Error:
+                    pass
+
+    def writer(self) -> sqlite3.Connection:
+        if self.read_only:
+            raise sqlite3.OperationalError("read-only pool has no writer")
+        with self.write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            return self._writer
+
+    def close(self) -> None:
+        with self._readers_lock:
+            conns = [cx for _, cx in self._readers.values()]
+            self._readers.clear()
+        with self.write_lock:
+            if self._writer is not None:
+                conns.append(self._writer)
+            self._writer = None
+        for cx in conns:
+            try:
+                cx.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_POOL_LOCK = threading.Lock()
+
+# ─── batched writes ──────────────────────────────────────────────────────────
+UOW_BATCH_ROWS = int(os.getenv("VIDEO_DB_BATCH_ROWS", "500"))
+UOW_BATCH_SECS = float(os.getenv("VIDEO_DB_BATCH_SECS", "2.0"))
+
+_UPSERT_SQL = """
+INSERT INTO files (
+  id, path, size_bytes, mtime, mime, width_px, height_px,
+  duration_s, batch, sha1, created_at, version, parent_id, preview_path,
+  updated_at, folder_id
+) VALUES (
+  :id, :path, :size_bytes, :mtime, :mime, :width_px, :height_px,
+  :duration_s, :batch, :sha1, :created_at, 1, NULL, :preview_path,
+  strftime('%Y-%m-%dT%H:%M:%S', 'now'),
+  (SELECT id FROM folders WHERE path = :folder)
+)
+ON CONFLICT(path) DO UPDATE SET
+  size_bytes   = excluded.size_bytes,
+  mtime        = excluded.mtime,
+  sha1         = excluded.sha1,
+  batch        = excluded.batch,
+  preview_path = excluded.preview_path,
+  updated_at   = excluded.updated_at,
+  folder_id    = excluded.folder_id,
+  version      = files.version + (excluded.sha1 <> files.sha1),
+  parent_id    = CASE WHEN (excluded.sha1 <> files.sha1) THEN files.id ELSE files.parent_id END
+"""
+
+def encode_cursor(*key: Any) -> str:
+    """Opaque, URL-safe pagination cursor for a keyset tuple."""
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` on junk input."""
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(cursor + pad))
+    except Exception as exc:
+        raise ValueError(f"invalid cursor {cursor!r}") from exc
+    if not isinstance(key, list):
+        raise ValueError(f"invalid cursor {cursor!r}")
+    return key
+
+
+_OPTIONAL_COLUMNS = ("mime", "width_px", "height_px", "duration_s",
+                     "batch", "preview_path")
+
+
+def _with_defaults(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fill optional upsert columns with NULL so partial rows still bind, and
+    derive ``folder`` (the parent directory, resolved to ``folder_id``).
+    """
+    missing = [k for k in _OPTIONAL_COLUMNS if k not in row]
+    return {**dict.fromkeys(missing), **row,
+            "folder": os.path.dirname(row.get("path") or "")}
+
+
+# Folder rows are inserted root-first so :parent always resolves.
+_FOLDER_SQL = """
+INSERT INTO folders (path, name, parent_id)
+VALUES (:path, :name, (SELECT id FROM folders WHERE path = :parent))
+ON CONFLICT(path) DO NOTHING
+"""
+
+
+def _folder_rows(dirs: Iterable[str]) -> List[Dict[str, Any]]:
+    """``folders`` rows for *dirs* and all their ancestors, parents first."""
+    seen: set = set()
+    for d in dirs:
+        while d and d not in seen:
+            seen.add(d)
+            parent = os.path.dirname(d)
+            d = parent if parent != d else ""
+    rows = []
+    for d in sorted(seen, key=len):
+        parent = os.path.dirname(d)
+        rows.append({"path": d, "name": os.path.basename(d) or d,
+                     "parent": parent if parent != d else None})
+    return rows
+
+
+def _norm_folder(path: str) -> str:
+    return path.rstrip("/") or "/"
+
+
+def _upsert_rows(cx: sqlite3.Connection, batch: List[Dict[str, Any]],
+                 rejected: Optional[List[Tuple[Dict[str, Any], str]]] = None) -> int:
+    """
+    Create missing folders, then upsert *batch*, on the writer connection.
+
+    Without *rejected* a constraint violation aborts the whole batch.  With
+    it, a failing batch is retried row by row, each under its own SAVEPOINT:
+    rows that still fail (e.g. a byte-identical copy whose ``id`` is already
+    indexed at another path) are appended as ``(row, error)`` and skipped,
+    the rest are kept.  Returns the number of rows written.
+    """
+    cx.executemany(_FOLDER_SQL, _folder_rows({r["folder"] for r in batch}))
+    if rejected is None:
+        cx.executemany(_UPSERT_SQL, batch)
+        return len(batch)
+    cx.execute("SAVEPOINT upsert_batch")
+    try:
+        cx.executemany(_UPSERT_SQL, batch)
+        return len(batch)
+    except sqlite3.IntegrityError:
+        cx.execute("ROLLBACK TO upsert_batch")
+        written = 0
+        for row in batch:
+            cx.execute("SAVEPOINT upsert_row")
+            try:
+                cx.execute(_UPSERT_SQL, row)
+                written += 1
+            except sqlite3.IntegrityError as exc:
+                cx.execute("ROLLBACK TO upsert_row")
+                rejected.append((row, str(exc)))
+                logging.getLogger("video.db").warning(
+                    "skipped %s: %s", row.get("path"), exc)
+            finally:
+                cx.execute("RELEASE upsert_row")
+        return written
+    finally:
+        cx.execute("RELEASE upsert_batch")
+
+
+def _fingerprint_rows(cx: sqlite3.Connection,
+                      items: Dict[Tuple[int, int, int, int], Dict[str, str]]) -> None:
+    """Store ``{key: {algo: digest}}``, dropping rows of older versions of each inode."""
+    cx.executemany("""
+        DELETE FROM fingerprints
+         WHERE dev = ? AND ino = ? AND (size <> ? OR mtime_ns <> ?)
+    """, list(items))
+    cx.executemany("""
+        INSERT OR REPLACE INTO fingerprints (dev, ino, size, mtime_ns, algo, digest)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(*key, a, d) for key, digests in items.items() for a, d in digests.items()])
+
+
+def _media_tech_rows(cx: sqlite3.Connection,
+                     items: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+    """Store ``{fingerprint: (probe, columns)}`` in ``media_tech``."""
+    cols = ", ".join(_TECH_COLUMNS)
+    cx.executemany(f"""
+        INSERT OR REPLACE INTO media_tech
+            (fingerprint, {cols}, probe_json, probed_at)
+        VALUES (?, {", ".join("?" * len(_TECH_COLUMNS))}, ?,
+                strftime('%Y-%m-%dT%H:%M:%S', 'now'))
+    """, [(fp, *(columns.get(c) for c in _TECH_COLUMNS),
+           json.dumps(probe, separators=(",", ":")))
+          for fp, (probe, columns) in items.items()])
+
+
+def _copy_rows(cx: sqlite3.Connection, items: Dict[str, str]) -> None:
+    """Store ``{sha1: dest}`` in ``copies`` (see ``MediaDB.remember_copy``)."""
+    ts = datetime.now().timestamp()
+    cx.executemany("INSERT OR REPLACE INTO copies(sha1, dest, ts) VALUES (?, ?, ?)",
+                   [(sha1, dest, ts) for sha1, dest in items.items()])
+
+
+class UnitOfWork:
+    """
+    Write buffer returned by ``MediaDB.unit_of_work()``.
+
+    ``upsert()`` only appends; the buffered rows go to ``MediaDB.upsert_many``
+    once ``batch_rows`` are pending or the oldest is ``batch_secs`` old.
+    Flushes are serialised, so rows reach SQLite in the order they were
+    queued even when several threads share one unit of work.
+
+    Rows leave the buffer only once their transaction committed: a flush
+    that raises keeps them pending for the next one.  Rows SQLite refuses
+    (see ``_upsert_rows``) land in ``rejected`` instead of sinking their
+    batch; ``written`` counts committed rows only.
+
+    ``put_fingerprints`` and ``put_media_tech`` buffer cache rows the same
+    way, so hashing or probing a file inside a unit of work
+    (``fingerprint(..., db=uow)``, ``probe_cached(..., db=uow)``) costs no
+    transaction of its own: they commit with the next batch of file rows.
+    ``remember_copy`` does the same for the sync ``copies`` table, so a copy
+    is never recorded without the files row that indexes it.
+    """
+
+    def __init__(self, db: "MediaDB", batch_rows: int, batch_secs: float) -> None:
+        self._db         = db
+        self.batch_rows  = max(1, batch_rows)
+        self.batch_secs  = batch_secs
+        self.written     = 0
+        self.rejected: List[Tuple[Dict[str, Any], str]] = []
+        self._inflight: Dict[Future, tuple] = {}       # writer-thread mode only
+        self._rows: List[Dict[str, Any]] = []
+        self._fps: Dict[Tuple[int, int, int, int], Dict[str, str]] = {}
+        self._tech: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self._copies: Dict[str, str] = {}
+        self._oldest: Optional[float] = None
+        self._lock       = threading.Lock()     # guards _rows / _oldest / counters
+        self._flush_lock = threading.Lock()     # keeps batches in order
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._rows.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = (len(self._rows) >= self.batch_rows or
+                   time.monotonic() - self._oldest >= self.batch_secs)
+        if due:
+            self.flush()
+
+    def put_fingerprints(self, key: Tuple[int, int, int, int],
+                         digests: Dict[str, str]) -> None:
+        """Buffer ``MediaDB.put_fingerprints`` until the next flush."""
+        with self._lock:
+            self._fps[key] = {**self._fps.get(key, {}), **digests}
+
+    def get_fingerprints(self, key: Tuple[int, int, int, int]) -> Dict[str, str]:
+        with self._lock:
+            pending = self._fps.get(key, {})
+        return {**self._db.get_fingerprints(key), **pending}
+
+    def put_media_tech(self, fingerprint: str, probe: Dict[str, Any],
+                       columns: Dict[str, Any]) -> None:
+        """Buffer ``MediaDB.put_media_tech`` until the next flush."""
+        with self._lock:
+            self._tech[fingerprint] = (probe, columns)
+
+    def get_media_tech(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            hit = self._tech.get(fingerprint)
+        return hit[0] if hit is not None else self._db.get_media_tech(fingerprint)
+
+    def remember_copy(self, sha1: str, dest: Path) -> None:
+        """Buffer ``MediaDB.remember_copy`` until the next flush."""
+        with self._lock:
+            self._copies[sha1] = str(dest)
+
+    def already_copied(self, sha1: str) -> bool:
+        with self._lock:
+            if sha1 in self._copies:
+                return True
+        return self._db.already_copied(sha1)
+
+    def _take(self, rows: list, fps: dict, tech: dict, copies: dict) -> None:
+        """Drop what a flush handed over (later updates of a key stay)."""
+        with self._lock:
+            del self._rows[:len(rows)]
+            self._oldest = time.monotonic() if self._rows else None
+            for pending, done in ((self._fps, fps), (self._tech, tech),
+                                  (self._copies, copies)):
+                for key, value in done.items():
+                    if pending.get(key) is value:
+                        del pending[key]
+
+    def _settle(self, fut: Future, timeout: Optional[float] = None) -> None:
+        """Count a finished batch, or put it back in front and raise."""
+        try:
+            n = fut.result(timeout)
+        except Exception:
+            with self._lock:
+                rows, fps, tech, copies = self._inflight.pop(fut, ([], {}, {}, {}))
+                self._rows[:0] = rows
+                self._fps = {**fps, **self._fps}
+                self._tech = {**tech, **self._tech}
+                self._copies = {**copies, **self._copies}
+                if rows and self._oldest is None:
+                    self._oldest = time.monotonic()
+            raise
+        with self._lock:
+            self._inflight.pop(fut, None)
+            self.written += n
+
+    def flush(self) -> int:
+        """
+        Write every pending row now; returns how many were handed to the DB
+        (committed already, or queued on the writer thread).
+        """
+        with self._flush_lock:
+            for fut in [f for f in list(self._inflight) if f.done()]:
+                try:
+                    self._settle(fut)
+                except Exception as exc:           # retried with this flush
+                    logging.getLogger("video.db").warning(
+                        "batch write failed, retrying: %s", exc)
+            with self._lock:
+                rows, fps, tech = list(self._rows), dict(self._fps), dict(self._tech)
+                copies = dict(self._copies)
+            if not (rows or fps or tech or copies):
+                return 0
+            res = self._db.upsert_many(rows, rejected=self.rejected,
+                                       fingerprints=fps, media_tech=tech, copies=copies)
+            self._take(rows, fps, tech, copies)
+            with self._lock:
+                if isinstance(res, Future):
+                    self._inflight[res] = (rows, fps, tech, copies)
+                else:
+                    self.written += res
+            return len(rows)
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until every flushed batch is committed (writer-thread mode).
+        A batch that failed goes back to the front of the buffer and its
+        error is raised.
+        """
+        for fut in list(self._inflight):
+            self._settle(fut, timeout)
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+# ─── materialised counters for get_stats() ───────────────────────────────────
+# Kept current by triggers on `files`, so /stats never aggregates the table.
+# NULL mime is stored as '' (a NULL primary key would not be unique).
+_STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stats_totals (
+    id    INTEGER PRIMARY KEY CHECK (id = 1),
+    files INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS stats_mime (
+    mime  TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    size  INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS stats_batch (
+    batch TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    size  INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS files_stats_ai AFTER INSERT ON files BEGIN
+    UPDATE stats_totals SET files = files + 1, bytes = bytes + new.size_bytes WHERE id = 1;
+    INSERT INTO stats_mime(mime, count, size) VALUES (COALESCE(new.mime, ''), 1, new.size_bytes)
+        ON CONFLICT(mime) DO UPDATE SET count = count + 1, size = size + excluded.size;
+    INSERT INTO stats_batch(batch, count, size)
+        SELECT new.batch, 1, new.size_bytes WHERE new.batch IS NOT NULL
+        ON CONFLICT(batch) DO UPDATE SET count = count + 1, size = size + excluded.size;
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_stats_ad AFTER DELETE ON files BEGIN
+    UPDATE stats_totals SET files = files - 1, bytes = bytes - old.size_bytes WHERE id = 1;
+    UPDATE stats_mime  SET count = count - 1, size = size - old.size_bytes
+     WHERE mime = COALESCE(old.mime, '');
+    UPDATE stats_batch SET count = count - 1, size = size - old.size_bytes
+     WHERE batch = old.batch;
+    DELETE FROM stats_mime  WHERE count <= 0;
+    DELETE FROM stats_batch WHERE count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_stats_au AFTER UPDATE OF size_bytes, mime, batch ON files BEGIN
+    UPDATE stats_totals SET bytes = bytes - old.size_bytes + new.size_bytes WHERE id = 1;
+    UPDATE stats_mime  SET count = count - 1, size = size - old.size_bytes
+     WHERE mime = COALESCE(old.mime, '');
+    UPDATE stats_batch SET count = count - 1, size = size - old.size_bytes
+     WHERE batch = old.batch;
+    INSERT INTO stats_mime(mime, count, size) VALUES (COALESCE(new.mime, ''), 1, new.size_bytes)
+        ON CONFLICT(mime) DO UPDATE SET count = count + 1, size = size + excluded.size;
+    INSERT INTO stats_batch(batch, count, size)
+        SELECT new.batch, 1, new.size_bytes WHERE new.batch IS NOT NULL
+        ON CONFLICT(batch) DO UPDATE SET count = count + 1, size = size + excluded.size;
+    DELETE FROM stats_mime  WHERE count <= 0;
+    DELETE FROM stats_batch WHERE count <= 0;
+END;
+"""
+
+# Recompute every counter from `files` (first install + drift repair).
+_STATS_REBUILD = """
+DELETE FROM stats_totals;
+DELETE FROM stats_mime;
+DELETE FROM stats_batch;
+INSERT INTO stats_totals(id, files, bytes)
+    SELECT 1, COUNT(*), COALESCE(SUM(size_bytes), 0) FROM files;
+INSERT INTO stats_mime(mime, count, size)
+    SELECT COALESCE(mime, ''), COUNT(*), COALESCE(SUM(size_bytes), 0)
+      FROM files GROUP BY COALESCE(mime, '');
+INSERT INTO stats_batch(batch, count, size)
+    SELECT batch, COUNT(*), COALESCE(SUM(size_bytes), 0)
+      FROM files WHERE batch IS NOT NULL GROUP BY batch;
+"""
+
+# ─── schema migrations ───────────────────────────────────────────────────────
+# Ordered (version, name, step) list.  Each step runs inside the writer
+# transaction and must be idempotent, so a crash mid-upgrade (or a DB that
+# predates user_version bookkeeping) simply replays it.  user_version is
+# bumped after every step; append new steps, never edit shipped ones.
+
+ANALYSIS_LIMIT = int(os.getenv("VIDEO_DB_ANALYSIS_LIMIT", "400"))
+
+
+def _exec_script(cx: sqlite3.Connection, script: str) -> None:
+    """
+    Run a multi-statement script on *cx* without ``executescript`` (which
+    would COMMIT the surrounding transaction).  Trigger bodies are kept
+    whole by accumulating lines until ``sqlite3.complete_statement``.
+    """
+    buf = ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip(" \t\n;"):
+                cx.execute(buf)
+            buf = ""
+    if buf.strip():
+        cx.execute(buf)
+
+
+def _add_columns(cx: sqlite3.Connection, table: str, cols: Dict[str, str]) -> None:
+    have = {r[1] for r in cx.execute(f"PRAGMA table_info({table})")}
+    for name, decl in cols.items():
+        if name not in have:
+            cx.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def _m001_base(cx: sqlite3.Connection) -> None:
+    _exec_script(cx, """
+      CREATE TABLE IF NOT EXISTS files (
+          id           TEXT PRIMARY KEY,
+          path         TEXT UNIQUE NOT NULL,
+          size_bytes   INTEGER NOT NULL,
+          mtime        TEXT NOT NULL,
+          mime         TEXT,
+          width_px     INTEGER,
+          height_px    INTEGER,
+          duration_s   REAL,
+          batch        TEXT,
+          sha1         TEXT,
+          created_at   TEXT NOT NULL
+      );
+      CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime);
+      CREATE INDEX IF NOT EXISTS idx_files_batch ON files(batch);
+      CREATE INDEX IF NOT EXISTS idx_files_sha1  ON files(sha1);
+      CREATE TABLE IF NOT EXISTS copies (
+          sha1 TEXT PRIMARY KEY,
+          dest TEXT,
+          ts   REAL
+      );
+      CREATE VIRTUAL TABLE IF NOT EXISTS files_fts
+      USING fts5(
+        path, mime, batch,
+        content='files', content_rowid='rowid'
+      );
+      CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+        INSERT INTO files_fts(rowid,path,mime,batch)
+        VALUES (new.rowid,new.path,new.mime,new.batch);
+      END;
+      CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+        DELETE FROM files_fts WHERE rowid=old.rowid;
+      END;
+      CREATE TRIGGER IF NOT EXISTS files_au AFTER UPDATE ON files BEGIN
+        UPDATE files_fts
+           SET path=new.path, mime=new.mime, batch=new.batch
+         WHERE rowid=old.rowid;
+      END;
+    """)
+    # external-content index: (re)build from any rows that predate it
+    cx.execute("INSERT INTO files_fts(files_fts) VALUES('rebuild')")
+    # columns that older databases were created without
+    _add_columns(cx, "files", {
+        "version"     : "INTEGER DEFAULT 1",
+        "parent_id"   : "TEXT",
+        "preview_path": "TEXT",
+        "sort_order"  : "INTEGER DEFAULT 0",
+    })
+
+
+def _m002_stats(cx: sqlite3.Connection) -> None:
+    _exec_script(cx, _STATS_SCHEMA + _STATS_REBUILD)
+
+
+def _m003_asset_columns(cx: sqlite3.Connection) -> None:
+    # read by AutoStorage.list_assets ("tags" is a JSON list)
+    _add_columns(cx, "files", {
+        "tags"      : "TEXT NOT NULL DEFAULT '[]'",
+        "updated_at": "TEXT",
+    })
+    cx.execute("UPDATE files SET updated_at = mtime WHERE updated_at IS NULL")
+
+
+def _m004_hot_indexes(cx: sqlite3.Connection) -> None:
+    # Path-prefix lookups use range scans on the UNIQUE(path) index
+    # (see path_prefix_range), so no extra index is needed for them.
+    _exec_script(cx, """
+      -- recent feed / keyset pagination (list_recent, page_recent)
+      CREATE INDEX IF NOT EXISTS idx_files_created
+          ON files(created_at DESC, id DESC);
+      -- batch listing in user sort order (list_by_batch, page_by_batch)
+      CREATE INDEX IF NOT EXISTS idx_files_batch_order
+          ON files(batch, sort_order, created_at DESC, id DESC);
+      -- version chains (parent_id lookups)
+      CREATE INDEX IF NOT EXISTS idx_files_parent
+          ON files(parent_id) WHERE parent_id IS NOT NULL;
+      -- idx_files_batch is a strict prefix of idx_files_batch_order
+      DROP INDEX IF EXISTS idx_files_batch;
+    """)
+
+
+def _m005_fts_trigram(cx: sqlite3.Connection) -> None:
+    # files_tri: trigram index for substring search (search_files).
+    # The v1 triggers used plain DELETE/UPDATE on an external-content table,
+    # which leaves stale tokens behind; FTS5 wants explicit 'delete' rows
+    # carrying the old values.  Both indexes are rebuilt from scratch.
+    _exec_script(cx, """
+      CREATE VIRTUAL TABLE IF NOT EXISTS files_tri
+      USING fts5(
+        path, batch,
+        content='files', content_rowid='rowid',
+        tokenize='trigram'
+      );
+      DROP TRIGGER IF EXISTS files_ai;
+      DROP TRIGGER IF EXISTS files_ad;
+      DROP TRIGGER IF EXISTS files_au;
+      CREATE TRIGGER files_ai AFTER INSERT ON files BEGIN
+        INSERT INTO files_fts(rowid,path,mime,batch)
+        VALUES (new.rowid,new.path,new.mime,new.batch);
+        INSERT INTO files_tri(rowid,path,batch)
+        VALUES (new.rowid,new.path,new.batch);
+      END;
+      CREATE TRIGGER files_ad AFTER DELETE ON files BEGIN
+        INSERT INTO files_fts(files_fts,rowid,path,mime,batch)
+        VALUES ('delete',old.rowid,old.path,old.mime,old.batch);
+        INSERT INTO files_tri(files_tri,rowid,path,batch)
+        VALUES ('delete',old.rowid,old.path,old.batch);
+      END;
+      CREATE TRIGGER files_au AFTER UPDATE OF path, mime, batch ON files BEGIN
+        INSERT INTO files_fts(files_fts,rowid,path,mime,batch)
+        VALUES ('delete',old.rowid,old.path,old.mime,old.batch);
+        INSERT INTO files_fts(rowid,path,mime,batch)
+        VALUES (new.rowid,new.path,new.mime,new.batch);
+        INSERT INTO files_tri(files_tri,rowid,path,batch)
+        VALUES ('delete',old.rowid,old.path,old.batch);
+        INSERT INTO files_tri(rowid,path,batch)
+        VALUES (new.rowid,new.path,new.batch);
+      END;
+      INSERT INTO files_fts(files_fts) VALUES('rebuild');
+      INSERT INTO files_tri(files_tri) VALUES('rebuild');
+    """)
+
+
+def _m006_folders(cx: sqlite3.Connection) -> None:
+    # Normalised directory tree for the Explorer: every parent directory of
+    # a file (and their ancestors) is one row; files point at their folder.
+    # Empty folders are pruned bottom-up by the delete triggers, which rely
+    # on PRAGMA recursive_triggers (set on every pooled connection).
+    _exec_script(cx, """
+      CREATE TABLE IF NOT EXISTS folders (
+          id        INTEGER PRIMARY KEY,
+          parent_id INTEGER REFERENCES folders(id),
+          path      TEXT UNIQUE NOT NULL,
+          name      TEXT NOT NULL
+      );
+      CREATE INDEX IF NOT EXISTS idx_folders_parent ON folders(parent_id);
+    """)
+    _add_columns(cx, "files", {"folder_id": "INTEGER"})
+    _exec_script(cx, """
+      CREATE INDEX IF NOT EXISTS idx_files_folder ON files(folder_id);
+      CREATE TRIGGER IF NOT EXISTS files_folder_ad AFTER DELETE ON files
+      WHEN old.folder_id IS NOT NULL BEGIN
+        DELETE FROM folders
+         WHERE id = old.folder_id
+           AND NOT EXISTS (SELECT 1 FROM files   WHERE folder_id = old.folder_id)
+           AND NOT EXISTS (SELECT 1 FROM folders WHERE parent_id = old.folder_id);
+      END;
+      CREATE TRIGGER IF NOT EXISTS folders_prune_ad AFTER DELETE ON folders
+      WHEN old.parent_id IS NOT NULL BEGIN
+        DELETE FROM folders
+         WHERE id = old.parent_id
+           AND NOT EXISTS (SELECT 1 FROM files   WHERE folder_id = old.parent_id)
+           AND NOT EXISTS (SELECT 1 FROM folders WHERE parent_id = old.parent_id);
+      END;
+    """)
+    # backfill from existing rows
+    paths = [r[0] for r in cx.execute("SELECT path FROM files WHERE folder_id IS NULL")]
+    cx.executemany(_FOLDER_SQL, _folder_rows({os.path.dirname(p) for p in paths}))
+    cx.executemany(
+        "UPDATE files SET folder_id = (SELECT id FROM folders WHERE path = ?) WHERE path = ?",
+        ((os.path.dirname(p), p) for p in paths))
+
+
+def _m007_scan_dirs(cx: sqlite3.Connection) -> None:
+    # Directory journal for incremental scans (see scanner.ScanJournal)
+    _exec_script(cx, """
+      CREATE TABLE IF NOT EXISTS scan_dirs (
+          path         TEXT PRIMARY KEY,
+          mtime_ns     INTEGER NOT NULL,
+          entry_count  INTEGER NOT NULL,
+          last_scanned REAL    NOT NULL
+      ) WITHOUT ROWID;
+    """)
+
+
+def _m008_fingerprints(cx: sqlite3.Connection) -> None:
+    # Digest cache for video.fingerprint, keyed by inode identity
+    _exec_script(cx, """
+      CREATE TABLE IF NOT EXISTS fingerprints (
+          dev      INTEGER NOT NULL,
+          ino      INTEGER NOT NULL,
+          size     INTEGER NOT NULL,
+          mtime_ns INTEGER NOT NULL,
+          algo     TEXT    NOT NULL,
+          digest   TEXT    NOT NULL,
+          PRIMARY KEY (dev, ino, size, mtime_ns, algo)
+      ) WITHOUT ROWID;
+    """)
+
+
+_TECH_COLUMNS = ("container", "duration_s", "bitrate", "width", "height",
+                 "vcodec", "vprofile", "pix_fmt", "fps", "rotation",
+                 "acodec", "channels", "sample_rate", "streams")
+
+
+def _m009_media_tech(cx: sqlite3.Connection) -> None:
+    # Full ffprobe output per content fingerprint (files.id) + flat columns
+    _exec_script(cx, """
+      CREATE TABLE IF NOT EXISTS media_tech (
+          fingerprint TEXT PRIMARY KEY,
+          container   TEXT,
+          duration_s  REAL,
+          bitrate     INTEGER,
+          width       INTEGER,
+          height      INTEGER,
+          vcodec      TEXT,
+          vprofile    TEXT,
+          pix_fmt     TEXT,
+          fps         REAL,
+          rotation    INTEGER,
+          acodec      TEXT,
+          channels    INTEGER,
+          sample_rate INTEGER,
+          streams     INTEGER,
+          probe_json  TEXT NOT NULL,
+          probed_at   TEXT NOT NULL
+      );
+      CREATE INDEX IF NOT EXISTS idx_media_tech_video ON media_tech(vcodec, height, width);
+      CREATE INDEX IF NOT EXISTS idx_media_tech_audio ON media_tech(acodec);
+    """)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "base",          _m001_base),
+    (2, "stats",         _m002_stats),
+    (3, "asset-columns", _m003_asset_columns),
+    (4, "hot-indexes",   _m004_hot_indexes),
+    (5, "fts-trigram",   _m005_fts_trigram),
+    (6, "folders",       _m006_folders),
+    (7, "scan-dirs",     _m007_scan_dirs),
+    (8, "fingerprints",  _m008_fingerprints),
+    (9, "media-tech",    _m009_media_tech),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(cx: sqlite3.Connection) -> List[Tuple[int, str]]:
+    """
+    Apply every pending step on *cx* (caller owns the transaction).
+    Returns ``[(version, name), …]`` for the steps that ran.
+    """
+    current = cx.execute("PRAGMA user_version").fetchone()[0]
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"database schema v{current} is newer than this build (v{SCHEMA_VERSION})")
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version <= current:
+            continue
+        step(cx)
+        cx.execute(f"PRAGMA user_version={version}")
+        applied.append((version, name))
+    return applied
+
+
+def path_prefix_range(folder: str) -> Tuple[str, str]:
+    """
+    ``(lo, hi)`` bounds such that ``lo <= path < hi`` selects everything
+    below *folder* – an index range scan, unlike ``LIKE 'folder/%'``.
+    """
+    lo = folder.rstrip("/") + "/"
+    return lo, lo[:-1] + chr(ord("/") + 1)
+
+
+# ─── full-text search ────────────────────────────────────────────────────────
+_FTS_TABLES  = ("files_fts", "files_tri")
+TRIGRAM_MIN  = 3                    # the trigram tokenizer can't match less
+
+
+def _fts_query(terms: List[str], prefix: bool = False) -> str:
+    """AND of quoted FTS5 phrases, so user input is never parsed as syntax."""
+    star = "*" if prefix else ""
+    return " ".join('"' + t.replace('"', '""') + '"' + star for t in terms)
+
+
+# ─── missing-file cleanup ────────────────────────────────────────────────────
+CLEANUP_CHUNK_ROWS   = int(os.getenv("VIDEO_DB_CLEANUP_CHUNK", "2000"))
+CLEANUP_DELETE_BATCH = 500          # ids per DELETE … IN (…) statement
+
+_UNREADABLE: frozenset = frozenset()
+
+
+def _list_dir(path: str) -> set | frozenset:
+    """
+    Entry names in *path*; an empty set if the directory is gone, or the
+    ``_UNREADABLE`` sentinel if it exists but can't be listed.
+    """
+    try:
+        with os.scandir(path) as it:
+            return {e.name for e in it}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+    except OSError:
+        return _UNREADABLE
+
+
+# ─── optional single-writer thread ───────────────────────────────────────────
+WRITER_THREAD   = os.getenv("VIDEO_DB_WRITER_THREAD", "0") == "1"
+WRITER_QUEUE    = int(os.getenv("VIDEO_DB_WRITER_QUEUE", "1000"))
+WRITER_BATCH    = int(os.getenv("VIDEO_DB_WRITER_BATCH", "500"))
+WRITER_DELAY_MS = float(os.getenv("VIDEO_DB_WRITER_DELAY_MS", "50"))
+
+_STOP = object()
+
+
+class _WriterThread:
+    """
+    One daemon thread that applies every queued mutation for a MediaDB.
+
+    Callers ``submit()`` an SQL statement (or an ``executemany`` batch, or a
+    callable taking the writer connection) and get a ``Future`` back.  The thread drains up to ``max_batch`` operations –
+    waiting at most ``max_delay_ms`` for stragglers – and commits them as one
+    transaction (group commit).  Each operation runs under its own SAVEPOINT,
+    so a bad row fails only its own future.  Futures resolve after COMMIT,
+    which is what gives callers read-your-writes when they wait on them.
+
+    The queue is bounded: when the writer falls behind, ``submit()`` blocks
+    the producer instead of letting memory grow.
+    """
+
+    def __init__(self, db: "MediaDB",
+                 max_queue: int = WRITER_QUEUE,
+                 max_batch: int = WRITER_BATCH,
+                 max_delay_ms: float = WRITER_DELAY_MS) -> None:
+        self._db        = db
+        self._q: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.max_batch  = max(1, max_batch)
+        self.max_delay  = max_delay_ms / 1000.0
+        self.pid        = os.getpid()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "commits": 0, "ops": 0, "errors": 0,
+            "commit_s_total": 0.0, "commit_s_max": 0.0, "commit_s_last": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="mediadb-writer")
+        self._thread.start()
+
+    # -- producer side -------------------------------------------------------
+    def submit(self, sql: str | Callable[[sqlite3.Connection], Any],
+               params: Any = (), many: bool = False) -> Future:
+        fut: Future = Future()
+        self._q.put((sql, params, many, fut))
+        return fut
+
+    def barrier(self) -> Future:
+        """A no-op whose future resolves once everything before it committed."""
+        return self.submit("", None)
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        self._q.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            st = dict(self._stats)
+        commits = st["commits"] or 1
+        return {
+            "mode"          : "writer-thread",
+            "queue_depth"   : self._q.qsize(),
+            "queue_max"     : self._q.maxsize,
+            "commits"       : int(st["commits"]),
+            "ops"           : int(st["ops"]),
+            "errors"        : int(st["errors"]),
+            "avg_batch"     : round(st["ops"] / commits, 1),
+            "avg_commit_ms" : round(st["commit_s_total"] / commits * 1000, 2),
+            "max_commit_ms" : round(st["commit_s_max"] * 1000, 2),
+            "last_commit_ms": round(st["commit_s_last"] * 1000, 2),
+        }
+
+    # -- consumer side -------------------------------------------------------
+    def _next_batch(self) -> tuple[list, bool]:
+        first = self._q.get()
+        if first is _STOP:
+            return [], True
+        batch, stop = [first], False
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self) -> None:
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._apply(batch)
+            if stop:
+                # drain anything queued after stop() was requested
+                rest = []
+                while True:
+                    try:
+                        item = self._q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        rest.append(item)
+                if rest:
+                    self._apply(rest)
+                return
+
+    def _apply(self, batch: list) -> None:
+        results: list = []
+        t0 = time.perf_counter()
+        try:
+            with self._db.writer() as cx:
+                for sql, params, many, fut in batch:
+                    if not sql:                       # barrier
+                        results.append((fut, None, None))
+                        continue
+                    cx.execute("SAVEPOINT op")
+                    try:
+                        if callable(sql):
+                            res = sql(cx)
+                        elif many:
+                            res = cx.executemany(sql, params).rowcount
+                        else:
+                            res = cx.execute(sql, params).rowcount
+                        cx.execute("RELEASE op")
+                        results.append((fut, res, None))
+                    except Exception as exc:          # noqa: BLE001
+                        cx.execute("ROLLBACK TO op")
+                        cx.execute("RELEASE op")
+                        results.append((fut, None, exc))
+        except Exception as exc:                      # commit itself failed
+            for _, _, _, fut in batch:
+                fut.set_exception(exc)
+            with self._stats_lock:
+                self._stats["errors"] += len(batch)
+            return
+        dt = time.perf_counter() - t0
+
+        errors = 0
+        for fut, res, exc in results:
+            if exc is not None:
+                errors += 1
+                fut.set_exception(exc)
+            else:
+                fut.set_result(res)
+        with self._stats_lock:
+            st = self._stats
+            st["commits"]        += 1
+            st["ops"]            += len(batch)
+            st["errors"]         += errors
+            st["commit_s_total"] += dt
+            st["commit_s_last"]   = dt
+            st["commit_s_max"]    = max(st["commit_s_max"], dt)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 class MediaDB:
     """Thin wrapper around SQLite + a few convenience helpers."""
 
-    def __init__(self, db_path: Optional[Path] = None) -> None:
+    def __init__(self, db_path: Optional[Path] = None,
+                 writer_thread: Optional[bool] = None) -> None:
         print(f"MediaDB.__init__: {self=} db_path={db_path} resolved={db_path or DB_FILE}")
         self.db_path = Path(db_path) if db_path else DB_FILE
+        self._pool: Optional[_ConnectionPool] = None
+        self._ro_pool: Optional[_ConnectionPool] = None
+        self._ro_disabled = False
+        self._wq: Optional[_WriterThread] = None
+        self._use_writer_thread = WRITER_THREAD if writer_thread is None else writer_thread
 
         # --- Always ensure lockfile is created in a writable location
         default_lockfile = self.db_path.with_suffix('.init.lock')
@@ -89,7 +1273,9 @@ class MediaDB:
                     self._lockfile_path.unlink()
                 except Exception:
                     pass
-                                    
+
+        atexit.register(self.close)
+
     def _bootstrap_wal(self) -> None:
         """
         Try to enable WAL once.  If the underlying filesystem
@@ -126,190 +1312,660 @@ class MediaDB:
             log.info("journal_mode=DELETE in effect – continuing without WAL")
 
     def _init_db(self) -> None:
-        with self.conn() as cx:
-            cx.execute("""
-              CREATE TABLE IF NOT EXISTS files (
-                  id           TEXT PRIMARY KEY,
-                  path         TEXT UNIQUE NOT NULL,
-                  size_bytes   INTEGER NOT NULL,
-                  mtime        TEXT NOT NULL,
-                  mime         TEXT,
-                  width_px     INTEGER,
-                  height_px    INTEGER,
-                  duration_s   REAL,
-                  batch        TEXT,
-                  sha1         TEXT,
-                  created_at   TEXT NOT NULL,
-                  version      INTEGER DEFAULT 1,
-                  parent_id    TEXT,
-                  preview_path TEXT,
-                  sort_order   INTEGER DEFAULT 0
-              );
-            """)
-            cx.execute("CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime);")
-            cx.execute("CREATE INDEX IF NOT EXISTS idx_files_batch ON files(batch);")
-            cx.execute("CREATE INDEX IF NOT EXISTS idx_files_sha1 ON files(sha1);")
-
-            cx.execute("""
-              CREATE TABLE IF NOT EXISTS copies (
-                  sha1 TEXT PRIMARY KEY,
-                  dest TEXT,
-                  ts   REAL
-              );
-            """)
-
-            if cx.execute("PRAGMA user_version").fetchone()[0] < 1:
-                cx.executescript("""
-                  CREATE VIRTUAL TABLE files_fts
-                  USING fts5(
-                    path, mime, batch,
-                    content='files', content_rowid='rowid'
-                  );
-                  CREATE TRIGGER files_ai AFTER INSERT ON files BEGIN
-                    INSERT INTO files_fts(rowid,path,mime,batch)
-                    VALUES (new.rowid,new.path,new.mime,new.batch);
-                  END;
-                  CREATE TRIGGER files_ad AFTER DELETE ON files BEGIN
-                    DELETE FROM files_fts WHERE rowid=old.rowid;
-                  END;
-                  CREATE TRIGGER files_au AFTER UPDATE ON files BEGIN
-                    UPDATE files_fts
-                       SET path=new.path, mime=new.mime, batch=new.batch
-                     WHERE rowid=old.rowid;
-                  END;
-                  PRAGMA user_version=1;
-                """)
+        """Bring the schema up to ``SCHEMA_VERSION`` (see ``MIGRATIONS``)."""
+        with self.writer() as cx:
+            applied = migrate(cx)
+        if applied:
+            logging.getLogger("video.db").info(
+                "schema migrated to v%d (%s)", SCHEMA_VERSION,
+                ", ".join(f"{v}:{name}" for v, name in applied))
+            self.optimize(analyze=True)
+
+    def schema_version(self) -> int:
+        with self.reader() as cx:
+            return cx.execute("PRAGMA user_version").fetchone()[0]
+
+    def optimize(self, analyze: bool = False) -> None:
+        """
+        Refresh planner statistics.
+
+        ``PRAGMA optimize`` only re-analyses tables whose row counts moved
+        enough to matter; ``analyze=True`` forces a full (bounded) ANALYZE,
+        used right after migrations create new indexes.
+        """
+        with self.writer() as cx:
+            cx.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+            cx.execute("ANALYZE" if analyze else "PRAGMA optimize")
+
+    # ─── connection management ──────────────────────────────────────────
+
+    def _get_pool(self, read_only: bool = False) -> _ConnectionPool:
+        """Return the pool for the current db_path/process, (re)creating it."""
+        attr = "_ro_pool" if read_only else "_pool"
+        pool = getattr(self, attr)
+        if pool is None or pool.pid != os.getpid() or pool.db_path != self.db_path:
+            with _POOL_LOCK:
+                pool = getattr(self, attr)
+                if pool is None or pool.pid != os.getpid() or pool.db_path != self.db_path:
+                    if pool is not None and pool.pid == os.getpid():
+                        pool.close()            # db_path moved (tmpfs proxy)
+                    pool = _ConnectionPool(self.db_path, read_only=read_only)
+                    setattr(self, attr, pool)
+        return pool
+
+    @contextmanager
+    def reader(self):
+        """
+        Borrow this thread's read-only connection (``mode=ro``, ``query_only``).
+
+        Read helpers use this pool so API reads never share a connection
+        with – or queue behind – the scanner's writes; under WAL they see
+        the last committed snapshot.  Falls back to the read-write pool if
+        the file can't be opened read-only (``VIDEO_DB_READONLY_POOL=0``
+        forces that).
+        """
+        cx = None
+        if READONLY_POOL and not self._ro_disabled:
+            try:
+                cx = self._get_pool(read_only=True).reader()
+            except sqlite3.OperationalError as exc:
+                logging.getLogger("video.db").warning(
+                    "read-only connection unavailable (%s); using read-write pool", exc)
+                self._ro_disabled = True
+        if cx is None:
+            cx = self._get_pool().reader()
+        try:
+            yield cx
+        finally:
+            if cx.in_transaction:
+                cx.rollback()
 
     @contextmanager
     def conn(self):
-        cx = sqlite3.connect(
-            self.db_path,
-            timeout=30,
-            check_same_thread=False,
-            isolation_level=None
-        )
-        cx.row_factory = sqlite3.Row
-        cx.execute("PRAGMA foreign_keys=ON;")
-        cx.execute("PRAGMA busy_timeout=5000;")
-        cx.execute("PRAGMA cache_size = -2000;")  # limit to 2MB RAM
+        """
+        Borrow this thread's pooled connection (autocommit mode).
+
+        Any transaction the caller opened explicitly is committed on success
+        and rolled back on error; the connection itself stays open.
+        """
+        cx = self._get_pool().reader()
         try:
             yield cx
-            cx.commit()
-            cx.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            if cx.in_transaction:
+                cx.commit()
         except Exception:
-            cx.rollback()
+            if cx.in_transaction:
+                cx.rollback()
             raise
+
+    @contextmanager
+    def writer(self):
+        """
+        Borrow the shared writer connection inside ``BEGIN IMMEDIATE``.
+
+        Re-entrant: a nested ``writer()`` on the same thread joins the
+        outer transaction instead of starting a new one.
+        """
+        pool = self._get_pool()
+        with pool.write_lock:
+            cx = pool.writer()
+            if cx.in_transaction:
+                yield cx
+                return
+            cx.execute("BEGIN IMMEDIATE")
+            try:
+                yield cx
+                cx.commit()
+            except BaseException:
+                cx.rollback()
+                raise
+
+    def checkpoint(self, mode: str = "PASSIVE") -> tuple:
+        """
+        Run ``PRAGMA wal_checkpoint(mode)`` on the writer connection.
+
+        Kept off the per-call path: SQLite auto-checkpoints passively as the
+        WAL grows, and the snapshot thread / ``close()`` truncate it.
+        """
+        mode = mode.upper()
+        if mode not in {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}:
+            raise ValueError(f"invalid checkpoint mode {mode!r}")
+        pool = self._get_pool()
+        with pool.write_lock:
+            return tuple(pool.writer().execute(f"PRAGMA wal_checkpoint({mode});").fetchone())
+
+    # ─── writer-thread mode ─────────────────────────────────────────────
+
+    def _writer_queue(self) -> Optional[_WriterThread]:
+        """The writer thread when enabled (started lazily, per process)."""
+        if not self._use_writer_thread:
+            return None
+        wq = self._wq
+        if wq is None or wq.pid != os.getpid():
+            with _POOL_LOCK:
+                wq = self._wq
+                if wq is None or wq.pid != os.getpid():
+                    wq = self._wq = _WriterThread(self)
+        return wq
+
+    def _submit(self, sql: str | Callable[[sqlite3.Connection], Any],
+                params: Any = (), many: bool = False) -> Optional[Future]:
+        """
+        Queue on the writer thread, or execute now when it's disabled.
+        *sql* may also be a callable run with the writer connection, for
+        multi-statement writes that must stay in one transaction.
+        """
+        wq = self._writer_queue()
+        if wq is not None:
+            return wq.submit(sql, params, many)
+        with self.writer() as cx:
+            if callable(sql):
+                sql(cx)
+            elif many:
+                cx.executemany(sql, params)
+            else:
+                cx.execute(sql, params)
+        return None
+
+    def flush_writes(self, timeout: Optional[float] = None) -> None:
+        """Wait until every write queued so far is committed (no-op if direct)."""
+        wq = self._wq
+        if wq is not None and wq.pid == os.getpid():
+            wq.barrier().result(timeout)
+
+    def writer_stats(self) -> Dict[str, Any]:
+        """Queue depth + group-commit latency of the writer thread."""
+        wq = self._wq
+        if wq is None or wq.pid != os.getpid():
+            return {"mode": "writer-thread (idle)" if self._use_writer_thread else "direct"}
+        return wq.stats()
+
+    def close(self) -> None:
+        """Drain writes, checkpoint + close every pooled connection (idempotent)."""
+        wq, self._wq = self._wq, None
+        if wq is not None and wq.pid == os.getpid():
+            wq.stop()
+        ro, self._ro_pool = self._ro_pool, None
+        if ro is not None and ro.pid == os.getpid():
+            ro.close()
+        pool, self._pool = self._pool, None
+        if pool is None or pool.pid != os.getpid():
+            return
+        try:
+            with pool.write_lock:
+                cx = pool.writer()
+                cx.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+                cx.execute("PRAGMA optimize")      # cheap; recommended on close
+                cx.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        except sqlite3.Error:
+            pass
+        pool.close()
+
+    def upsert_file(self, row: Dict[str, Any]) -> Optional[Future]:
+        """
+        Insert or update a file record, bumping version if sha1 changed.
+
+        In writer-thread mode the row is queued and a ``Future`` is returned;
+        ``.result()`` it when you need to read the row back straight away.
+        """
+        batch = [_with_defaults(row)]
+        return self._submit(lambda cx: _upsert_rows(cx, batch))
+
+    def upsert_many(self, rows: Iterable[Dict[str, Any]],
+                    rejected: Optional[List[Tuple[Dict[str, Any], str]]] = None,
+                    *,
+                    fingerprints: Optional[Dict[Tuple[int, int, int, int], Dict[str, str]]] = None,
+                    media_tech: Optional[Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]] = None,
+                    copies: Optional[Dict[str, str]] = None
+                    ) -> int | Future:
+        """
+        Upsert *rows* in one transaction (same semantics as ``upsert_file``,
+        applied in order – a path repeated with a new sha1 bumps twice).
+        Returns the number of rows written (a ``Future`` in writer-thread mode).
+
+        By default one bad row rolls the whole batch back.  Pass a list as
+        *rejected* to skip such rows instead; each is appended as
+        ``(row, error)`` and the others are still written.  *fingerprints*
+        (``{key: {algo: digest}}``), *media_tech* (``{fingerprint:
+        (probe, columns)}``) and *copies* (``{sha1: dest}``) go into the same
+        transaction.
+        """
+        batch = [_with_defaults(r) for r in rows]
+        if not (batch or fingerprints or media_tech or copies):
+            return 0
+        written = [0]
+
+        def _op(cx: sqlite3.Connection) -> int:
+            if fingerprints:
+                _fingerprint_rows(cx, fingerprints)
+            if media_tech:
+                _media_tech_rows(cx, media_tech)
+            if copies:
+                _copy_rows(cx, copies)
+            written[0] = _upsert_rows(cx, batch, rejected) if batch else 0
+            return written[0]
+
+        fut = self._submit(_op)
+        return fut if fut is not None else written[0]
+
+    @contextmanager
+    def unit_of_work(self,
+                     batch_rows: Optional[int] = None,
+                     batch_secs: Optional[float] = None):
+        """
+        Group many ``upsert`` calls into a few transactions::
+
+            with db.unit_of_work() as uow:
+                for row in rows:
+                    uow.upsert(row)
+
+        Rows are flushed whenever *batch_rows* accumulate or the oldest
+        pending row is *batch_secs* old, and once more on exit.  Safe to share
+        between worker threads.
+        """
+        uow = UnitOfWork(self,
+                         batch_rows or UOW_BATCH_ROWS,
+                         UOW_BATCH_SECS if batch_secs is None else batch_secs)
+        try:
+            yield uow
         finally:
-            cx.close()
-
-    def upsert_file(self, row: Dict[str, Any]) -> None:
-        """Insert or update a file record, bumping version if sha1 changed"""
-        sql = """
-        INSERT INTO files (
-          id, path, size_bytes, mtime, mime, width_px, height_px,
-          duration_s, batch, sha1, created_at, version, parent_id, preview_path
-        ) VALUES (
-          :id, :path, :size_bytes, :mtime, :mime, :width_px, :height_px,
-          :duration_s, :batch, :sha1, :created_at, 1, NULL, :preview_path
-        )
-        ON CONFLICT(path) DO UPDATE SET
-          size_bytes   = excluded.size_bytes,
-          mtime        = excluded.mtime,
-          sha1         = excluded.sha1,
-          batch        = excluded.batch,
-          preview_path = excluded.preview_path,
-          version      = files.version + (excluded.sha1 <> files.sha1),
-          parent_id    = CASE WHEN (excluded.sha1 <> files.sha1) THEN files.id ELSE files.parent_id END
-        """
-        with self.conn() as cx:
-            cx.execute(sql, row)
+            uow.flush()
+            uow.wait()
 
     def get_file_by_path(self, path: str) -> Optional[sqlite3.Row]:
         """Get file record by path"""
-        with self.conn() as cx:
+        with self.reader() as cx:
             return cx.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
 
     def get_file_by_sha1(self, sha1: str) -> Optional[sqlite3.Row]:
         """Get file record by SHA1 hash"""
-        with self.conn() as cx:
+        with self.reader() as cx:
             return cx.execute("SELECT * FROM files WHERE sha1 = ?", (sha1,)).fetchone()
 
-    def list_recent(self, limit: int = 20) -> List[sqlite3.Row]:
-        """Get recently indexed files"""
-        with self.conn() as cx:
-            return cx.execute(
-                "SELECT * FROM files ORDER BY created_at DESC LIMIT ?", (limit,)
-            ).fetchall()
+    def query(self, sql: str, params: Any = ()) -> List[sqlite3.Row]:
+        """Run a statement on this thread's read-only connection."""
+        with self.reader() as cx:
+            return cx.execute(sql, params).fetchall()
 
-    def list_by_batch(self, batch_name: str) -> List[sqlite3.Row]:
-        """Get files by batch/album name"""
-        with self.conn() as cx:
-            return cx.execute(
-                "SELECT * FROM files WHERE batch = ? ORDER BY mtime DESC", (batch_name,)
-            ).fetchall()
+    def list_recent(self, limit: int = 20,
+                    cursor: Optional[str] = None) -> List[sqlite3.Row]:
+        """Get recently indexed files (newest first), optionally after *cursor*"""
+        sql, params = "SELECT * FROM files", []
+        if cursor:
+            created_at, fid = decode_cursor(cursor)
+            sql += " WHERE (created_at, id) < (?, ?)"
+            params += [created_at, fid]
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self.reader() as cx:
+            return cx.execute(sql, params).fetchall()
+
+    def page_recent(self, limit: int = 20,
+                    cursor: Optional[str] = None) -> Dict[str, Any]:
+        """``list_recent`` as ``{"items": [...], "next_cursor": str | None}``."""
+        rows = [dict(r) for r in self.list_recent(limit, cursor)]
+        nxt = (encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+               if len(rows) == limit else None)
+        return {"items": rows, "next_cursor": nxt}
+
+    def list_by_batch(self, batch_name: str,
+                      limit: Optional[int] = None,
+                      cursor: Optional[str] = None) -> List[sqlite3.Row]:
+        """
+        Get files by batch/album name in display order
+        (``sort_order``, newest first).  ``_UNSORTED`` selects rows with no
+        batch.  With *limit*/*cursor* this pages by keyset instead of
+        returning the whole batch.
+        """
+        if batch_name == "_UNSORTED":
+            sql, params = "SELECT * FROM files WHERE batch IS NULL", []
+        else:
+            sql, params = "SELECT * FROM files WHERE batch = ?", [batch_name]
+        if cursor:
+            sort_order, created_at, fid = decode_cursor(cursor)
+            sql += (" AND (sort_order > ? OR"
+                    " (sort_order = ? AND (created_at, id) < (?, ?)))")
+            params += [sort_order, sort_order, created_at, fid]
+        sql += " ORDER BY sort_order, created_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.reader() as cx:
+            return cx.execute(sql, params).fetchall()
+
+    def page_by_batch(self, batch_name: str, limit: int = 50,
+                      cursor: Optional[str] = None) -> Dict[str, Any]:
+        """``list_by_batch`` as ``{"items": [...], "next_cursor": str | None}``."""
+        rows = [dict(r) for r in self.list_by_batch(batch_name, limit, cursor)]
+        nxt = None
+        if len(rows) == limit:
+            last = rows[-1]
+            nxt = encode_cursor(last["sort_order"], last["created_at"], last["id"])
+        return {"items": rows, "next_cursor": nxt}
 
     def list_all_files(self) -> List[Dict[str, Any]]:
         """Return every row from the files table as a list of dicts."""
-        with self.conn() as cx:
-            rows = cx.execute("SELECT * FROM files ORDER BY created_at").fetchall()
-        return [dict(row) for row in rows]
-
-    def iter_all_files(self):
-        """Yield one file-row dict at a time (memory-efficient)."""
-        with self.conn() as cx:
-            for row in cx.execute("SELECT * FROM files ORDER BY created_at"):
+        return list(self.iter_all_files())
+
+    # ─── folder tree ────────────────────────────────────────────────────
+
+    def list_folders(self, parent: Optional[str] = None) -> List[sqlite3.Row]:
+        """Every folder, or only the direct children of *parent*."""
+        with self.reader() as cx:
+            if parent is None:
+                return cx.execute(
+                    "SELECT id, parent_id, path, name FROM folders ORDER BY path"
+                ).fetchall()
+            return cx.execute("""
+                SELECT c.id, c.parent_id, c.path, c.name
+                  FROM folders c
+                  JOIN folders p ON c.parent_id = p.id
+                 WHERE p.path = ?
+                 ORDER BY c.name
+            """, (_norm_folder(parent),)).fetchall()
+
+    def list_folder_files(self, folder: str) -> List[sqlite3.Row]:
+        """Files directly inside *folder* (not its sub-folders)."""
+        with self.reader() as cx:
+            return cx.execute("""
+                SELECT f.*
+                  FROM folders d
+                  JOIN files f ON f.folder_id = d.id
+                 WHERE d.path = ?
+                 ORDER BY f.sort_order, f.path
+            """, (_norm_folder(folder),)).fetchall()
+
+    def folder_snapshot(self, folder: str) -> Tuple[Dict[str, Tuple[float, int]],
+                                                    Dict[str, str]]:
+        """
+        ``({file name: (mtime as epoch seconds, size_bytes)}, {sub-folder
+        name: path})`` for what is indexed directly inside *folder* – one
+        indexed query, for rescan diffs.
+        """
+        with self.reader() as cx:
+            rows = cx.execute("""
+                SELECT 0 AS sub, f.path, f.mtime, f.size_bytes
+                  FROM folders d
+                  JOIN files f ON f.folder_id = d.id
+                 WHERE d.path = :folder
+                UNION ALL
+                SELECT 1, c.path, NULL, NULL
+                  FROM folders d
+                  JOIN folders c ON c.parent_id = d.id
+                 WHERE d.path = :folder
+            """, {"folder": _norm_folder(folder)}).fetchall()
+        files: Dict[str, Tuple[float, int]] = {}
+        subs: Dict[str, str] = {}
+        for sub, path, mtime, size in rows:
+            if sub:
+                subs[os.path.basename(path)] = path
+                continue
+            try:
+                ts = datetime.fromisoformat(mtime).timestamp()
+            except (TypeError, ValueError):
+                ts = float("nan")                  # never matches → rescanned
+            files[os.path.basename(path)] = (ts, size)
+        return files, subs
+
+    def paths_under(self, folder: str) -> List[str]:
+        """Every indexed path below *folder*, at any depth."""
+        lo, hi = path_prefix_range(folder)
+        with self.reader() as cx:
+            return [r[0] for r in cx.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ?", (lo, hi))]
+
+    # ─── scan_dirs journal ──────────────────────────────────────────────
+
+    def scan_dirs_under(self, root: str) -> Dict[str, sqlite3.Row]:
+        """Journal rows for *root* and every directory below it."""
+        root = _norm_folder(root)
+        lo, hi = path_prefix_range(root)
+        with self.reader() as cx:
+            rows = cx.execute("""
+                SELECT path, mtime_ns, entry_count, last_scanned
+                  FROM scan_dirs
+                 WHERE path = ? OR (path >= ? AND path < ?)
+            """, (root, lo, hi)).fetchall()
+        return {r["path"]: r for r in rows}
+
+    def record_scan_dirs(self, rows: Iterable[Tuple[str, int, int, float]]) -> None:
+        """Upsert ``(path, mtime_ns, entry_count, last_scanned)`` rows."""
+        rows = list(rows)
+        if rows:
+            self._submit("""
+                INSERT INTO scan_dirs (path, mtime_ns, entry_count, last_scanned)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                  mtime_ns     = excluded.mtime_ns,
+                  entry_count  = excluded.entry_count,
+                  last_scanned = excluded.last_scanned
+            """, rows, many=True)
+
+    def forget_scan_dirs(self, paths: Iterable[str]) -> None:
+        """Drop journal rows for *paths* and everything below them."""
+        args = []
+        for p in paths:
+            p = _norm_folder(p)
+            args.append((p, *path_prefix_range(p)))
+        if args:
+            self._submit("DELETE FROM scan_dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                         args, many=True)
+
+    # ─── fingerprint cache ──────────────────────────────────────────────
+
+    def get_fingerprints(self, key: Tuple[int, int, int, int]) -> Dict[str, str]:
+        """Cached ``{algo: digest}`` for a ``(dev, ino, size, mtime_ns)`` key."""
+        with self.reader() as cx:
+            rows = cx.execute("""
+                SELECT algo, digest FROM fingerprints
+                 WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?
+            """, key).fetchall()
+        return {r["algo"]: r["digest"] for r in rows}
+
+    def put_fingerprints(self, key: Tuple[int, int, int, int],
+                         digests: Dict[str, str]) -> Optional[Future]:
+        """Store *digests* for *key*, dropping rows of older versions of the inode."""
+        return self._submit(lambda cx: _fingerprint_rows(cx, {tuple(key): digests}))
+
+    # ─── technical metadata (media_tech) ────────────────────────────────
+
+    def get_media_tech(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Cached ffprobe output for a content fingerprint, or ``None``."""
+        with self.reader() as cx:
+            row = cx.execute("SELECT probe_json FROM media_tech WHERE fingerprint = ?",
+                             (fingerprint,)).fetchone()
+        return json.loads(row["probe_json"]) if row else None
+
+    def put_media_tech(self, fingerprint: str, probe: Dict[str, Any],
+                       columns: Dict[str, Any]) -> Optional[Future]:
+        """Store *probe* (raw ffprobe dict) plus its flattened *columns*."""
+        return self._submit(lambda cx: _media_tech_rows(cx, {fingerprint: (probe, columns)}))
+
+    def query_tech(self,
+                   vcodec: Optional[str] = None,
+                   acodec: Optional[str] = None,
+                   min_width: Optional[int] = None,
+                   min_height: Optional[int] = None,
+                   min_fps: Optional[float] = None,
+                   limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Indexed files filtered on technical metadata, e.g. all 4K HEVC::
+
+            db.query_tech(vcodec="hevc", min_height=2160)
+        """
+        where, args = [], []
+        for col, op, val in (("t.vcodec", "=", vcodec), ("t.acodec", "=", acodec),
+                             ("t.width", ">=", min_width), ("t.height", ">=", min_height),
+                             ("t.fps", ">=", min_fps)):
+            if val is not None:
+                where.append(f"{col} {op} ?")
+                args.append(val)
+        sql = f"""
+            SELECT f.path, f.size_bytes, {", ".join("t." + c for c in _TECH_COLUMNS)}
+              FROM media_tech t JOIN files f ON f.id = t.fingerprint
+             {"WHERE " + " AND ".join(where) if where else ""}
+             ORDER BY f.path
+             LIMIT ?
+        """
+        with self.reader() as cx:
+            return [dict(r) for r in cx.execute(sql, (*args, limit)).fetchall()]
+
+    def iter_all_files(self, page_size: int = 1000):
+        """
+        Yield one file-row dict at a time (memory-efficient).
+
+        Pages through the table by ``(created_at, id)`` so no read
+        transaction stays open while the caller works on a row.
+        """
+        sql = "SELECT * FROM files {} ORDER BY created_at, id LIMIT ?"
+        last: Optional[tuple] = None
+        while True:
+            with self.reader() as cx:
+                if last is None:
+                    rows = cx.execute(sql.format(""), (page_size,)).fetchall()
+                else:
+                    rows = cx.execute(sql.format("WHERE (created_at, id) > (?, ?)"),
+                                      (*last, page_size)).fetchall()
+            for row in rows:
                 yield dict(row)
+            if len(rows) < page_size:
+                return
+            last = (rows[-1]["created_at"], rows[-1]["id"])
 
     def get_stats(self) -> Dict[str, Any]:
-        """Get database statistics"""
-        with self.conn() as cx:
+        """
+        Get database statistics.
+
+        Reads the trigger-maintained ``stats_*`` tables, so the cost does not
+        grow with the library; ``rebuild_stats()`` repairs any drift.
+        """
+        with self.reader() as cx:
             stats: Dict[str, Any] = {}
-            # Total files
-            stats['total_files'] = cx.execute("SELECT COUNT(*) FROM files").fetchone()[0]
-            # Total size
-            stats['total_size_bytes'] = cx.execute("SELECT SUM(size_bytes) FROM files").fetchone()[0] or 0
-            # By mime
+            totals = cx.execute("SELECT files, bytes FROM stats_totals WHERE id = 1").fetchone()
+            stats['total_files']      = totals["files"] if totals else 0
+            stats['total_size_bytes'] = totals["bytes"] if totals else 0
+            # By mime ('' is how NULL mime is stored)
             mime_stats = cx.execute("""
-                SELECT mime, COUNT(*) AS count, SUM(size_bytes) AS size
-                FROM files
-                GROUP BY mime
-                ORDER BY count DESC
+                SELECT NULLIF(mime, '') AS mime, count, size
+                FROM stats_mime
+                ORDER BY count DESC, mime
             """).fetchall()
             stats['by_mime'] = [dict(r) for r in mime_stats]
             # By batch
             batch_stats = cx.execute("""
-                SELECT batch, COUNT(*) AS count
-                FROM files
-                WHERE batch IS NOT NULL
-                GROUP BY batch
-                ORDER BY count DESC
+                SELECT batch, count, size
+                FROM stats_batch
+                ORDER BY count DESC, batch
             """).fetchall()
             stats['by_batch'] = [dict(r) for r in batch_stats]
+            if self._use_writer_thread:
+                stats['writer'] = self.writer_stats()
             return stats
 
+    def rebuild_stats(self) -> Dict[str, Any]:
+        """
+        Recompute the ``stats_*`` counters from ``files``.
+
+        Returns the totals before and after so callers can see any drift.
+        """
+        with self.writer() as cx:
+            before = cx.execute("SELECT files, bytes FROM stats_totals WHERE id = 1").fetchone()
+            for stmt in _STATS_REBUILD.split(";"):
+                if stmt.strip():
+                    cx.execute(stmt)
+            after = cx.execute("SELECT files, bytes FROM stats_totals WHERE id = 1").fetchone()
+        return {
+            "before": dict(before) if before else None,
+            "after" : dict(after),
+            "drift" : (after["files"] - before["files"]) if before else None,
+        }
+
     def already_copied(self, sha1: str) -> bool:
         """Check if file was already copied (sync compatibility)"""
-        with self.conn() as cx:
+        with self.reader() as cx:
             return cx.execute("SELECT 1 FROM copies WHERE sha1 = ?", (sha1,)).fetchone() is not None
 
-    def remember_copy(self, sha1: str, dest: Path):
+    def remember_copy(self, sha1: str, dest: Path) -> Optional[Future]:
         """Remember that a file was copied (sync compatibility)"""
-        with self.conn() as cx:
-            cx.execute(
-                "INSERT OR REPLACE INTO copies(sha1, dest, ts) VALUES (?, ?, ?)",
-                (sha1, str(dest), datetime.now().timestamp())
-            )
+        return self._submit(
+            "INSERT OR REPLACE INTO copies(sha1, dest, ts) VALUES (?, ?, ?)",
+            (sha1, str(dest), datetime.now().timestamp())
+        )
+
+    def cleanup_missing_files(
+            self,
+            chunk_rows: Optional[int] = None,
+            resume_after: Optional[str] = None,
+            progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> int:
+        """
+        Remove records for files that no longer exist.
+
+        Rows are walked in path order, *chunk_rows* at a time, and grouped by
+        parent directory so each directory costs one ``os.scandir`` instead of
+        one ``stat`` per file.  Deletes are issued per chunk in primary-key
+        batches, so the writer lock is only held for the DELETEs themselves.
+
+        *progress* receives ``{"scanned", "removed", "dirs", "cursor"}`` after
+        every chunk; pass the last ``cursor`` back as *resume_after* to pick
+        up an interrupted run.  Directories that exist but can't be listed
+        (permissions, flaky mounts) are left alone.
+        """
+        chunk_rows = chunk_rows or CLEANUP_CHUNK_ROWS
+        cursor = resume_after or ""
+        scanned = removed = dirs = 0
+        listings: Dict[str, set | frozenset] = {}
 
-    def cleanup_missing_files(self) -> int:
-        """Remove records for files that no longer exist"""
-        removed = 0
-        with self.conn() as cx:
-            for row in cx.execute("SELECT id, path FROM files"):
-                if not Path(row['path']).exists():
-                    cx.execute("DELETE FROM files WHERE id = ?", (row['id'],))
-                    removed += 1
+        while True:
+            rows = self.query(
+                "SELECT id, path FROM files WHERE path > ? ORDER BY path LIMIT ?",
+                (cursor, chunk_rows))
+            if not rows:
+                break
+            cursor = rows[-1]["path"]
+
+            by_dir: Dict[str, List[sqlite3.Row]] = {}
+            for r in rows:
+                by_dir.setdefault(os.path.dirname(r["path"]), []).append(r)
+            # keep listings of directories that straddle the chunk boundary
+            listings = {d: listings[d] for d in by_dir if d in listings}
+
+            gone: List[str] = []
+            for d, members in by_dir.items():
+                if d not in listings:
+                    listings[d] = _list_dir(d)
+                    dirs += 1
+                names = listings[d]
+                if names is _UNREADABLE:
+                    continue
+                gone += [r["id"] for r in members
+                         if os.path.basename(r["path"]) not in names]
+
+            for i in range(0, len(gone), CLEANUP_DELETE_BATCH):
+                ids = gone[i:i + CLEANUP_DELETE_BATCH]
+                fut = self._submit(
+                    f"DELETE FROM files WHERE id IN ({','.join('?' * len(ids))})", ids)
+                if fut is not None:
+                    fut.result()
+            scanned += len(rows)
+            removed += len(gone)
+            if progress:
+                progress({"scanned": scanned, "removed": removed,
+                          "dirs": dirs, "cursor": cursor})
         return removed
 
+    def delete_paths(self, paths: Iterable[str]) -> int:
+        """Drop the rows for *paths* (e.g. files a watcher saw disappear)."""
+        paths = list(paths)
+        fut = None
+        for i in range(0, len(paths), CLEANUP_DELETE_BATCH):
+            chunk = paths[i:i + CLEANUP_DELETE_BATCH]
+            fut = self._submit(
+                f"DELETE FROM files WHERE path IN ({','.join('?' * len(chunk))})", chunk)
+        if fut is not None:
+            fut.result()
+        return len(paths)
+
     # ─── New utility methods ────────────────────────────────────────────
 
     def search_files(
@@ -317,74 +1973,87 @@ class MediaDB:
             mime: Optional[str] = None,
             limit: int = 50
     ) -> List[Dict[str, Any]]:
-        """Search by prefix via FTS; fall back to LIKE if term is a stop-word."""
-        with self.conn() as cx:
-            # ---------- 1. try FTS (fast path) ------------------------------
-            sql_fts = """
+        """
+        Substring search over path and batch, best matches first.
+
+        Terms of 3+ characters go through the trigram index (``files_tri``)
+        ranked by ``bm25()``; shorter input falls back to a token-prefix
+        match on ``files_fts`` and, failing that, a LIKE scan.
+        """
+        terms = q.split()
+        if not terms:
+            return []
+        mime_sql = " AND f.mime = ?" if mime else ""
+        mime_arg = [mime] if mime else []
+
+        with self.reader() as cx:
+            # ---------- 1. trigram substring match ---------------------------
+            if all(len(t) >= TRIGRAM_MIN for t in terms):
+                rows = cx.execute(f"""
+                    SELECT f.*
+                      FROM files_tri
+                      JOIN files f ON files_tri.rowid = f.rowid
+                     WHERE files_tri MATCH ?{mime_sql}
+                     ORDER BY bm25(files_tri)
+                     LIMIT ?
+                """, [_fts_query(terms), *mime_arg, limit]).fetchall()
+                return [dict(r) for r in rows]
+
+            # ---------- 2. short input: token prefix ------------------------
+            rows = cx.execute(f"""
                 SELECT f.*
                   FROM files_fts
                   JOIN files f ON files_fts.rowid = f.rowid
-                 WHERE files_fts MATCH ?
-            """
-            params: List[Any] = [f"{q.strip()}*"]
-            if mime:
-                sql_fts += " AND f.mime = ?"
-                params.append(mime)
-            sql_fts += " LIMIT ?"
-            params.append(limit)
-
-            rows = cx.execute(sql_fts, params).fetchall()
+                 WHERE files_fts MATCH ?{mime_sql}
+                 ORDER BY bm25(files_fts)
+                 LIMIT ?
+            """, [_fts_query(terms, prefix=True), *mime_arg, limit]).fetchall()
             if rows:
                 return [dict(r) for r in rows]
 
-            # ---------- 2. fall back to LIKE (stop-word safe) ---------------
+            # ---------- 3. fall back to LIKE (1–2 characters only) ----------
             like = f"%{q.strip()}%"
-            sql_like = """
-                SELECT *
-                  FROM files
-                 WHERE (path  LIKE ? OR
-                        batch LIKE ?)
-            """
-            like_params: List[Any] = [like, like]
-            if mime:
-                sql_like += " AND mime = ?"
-                like_params.append(mime)
-            sql_like += " ORDER BY mtime DESC LIMIT ?"
-            like_params.append(limit)
-
-            rows = cx.execute(sql_like, like_params).fetchall()
+            rows = cx.execute(f"""
+                SELECT f.*
+                  FROM files f
+                 WHERE (f.path LIKE ? OR f.batch LIKE ?){mime_sql}
+                 ORDER BY f.mtime DESC
+                 LIMIT ?
+            """, [like, like, *mime_arg, limit]).fetchall()
             return [dict(r) for r in rows]
-            
+
     def clean_all(self) -> int:
         """Delete all file records and their FTS entries; return number removed"""
-        with self.conn() as cx:
+        with self.writer() as cx:
             total = cx.execute("SELECT COUNT(*) FROM files").fetchone()[0]
             cx.execute("DELETE FROM files")
-            cx.execute("DELETE FROM files_fts")
+            for fts in _FTS_TABLES:
+                cx.execute(f"INSERT INTO {fts}({fts}) VALUES('delete-all')")
         # Always ensure FTS is rebuilt after destructive ops
         self._repair_fts()
         return total
 
 
-    # Only _repair_fts() implementation shown – keep the rest of your helpers
     def _repair_fts(self) -> int:
-        with self.conn() as cx:
-            exists = cx.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='files_fts'"
-            ).fetchone()
-            if not exists:
-                return 0
-            missing = cx.execute("""
-              SELECT rowid,path,mime,batch
-                FROM files
-               WHERE rowid NOT IN (SELECT rowid FROM files_fts)
-            """).fetchall()
-            for r in missing:
-                cx.execute(
-                  "INSERT INTO files_fts(rowid,path,mime,batch) VALUES (?,?,?,?)",
-                  (r["rowid"], r["path"], r["mime"], r["batch"])
-                )
-            return len(missing)
+        """
+        Rebuild any FTS index whose document count has drifted from
+        ``files`` (e.g. rows written by a tool that bypassed the triggers).
+        Returns the number of indexes rebuilt.
+        """
+        rebuilt = 0
+        with self.writer() as cx:
+            total = cx.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            for fts in _FTS_TABLES:
+                exists = cx.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                    (f"{fts}_docsize",)).fetchone()
+                if not exists:
+                    continue
+                indexed = cx.execute(f"SELECT COUNT(*) FROM {fts}_docsize").fetchone()[0]
+                if indexed != total:
+                    cx.execute(f"INSERT INTO {fts}({fts}) VALUES('rebuild')")
+                    rebuilt += 1
+        return rebuilt
 
 # ---------------------------------------------------------------------------
 # module-level singleton: **import once, use everywhere**
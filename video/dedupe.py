@@ -0,0 +1,189 @@
+# video/dedupe.py
+"""
+Staged duplicate detection – only files that might be copies get read.
+
+    report = Deduper([Path("/data/media")]).run()
+    report.reclaimable_bytes, report.groups[0].paths
+
+1. **size**   walk the roots (``walk_dirs``, per-device list budget) and
+              bucket files by size; a unique size can't have a copy.
+2. **quick**  ``fingerprint`` "quick" digest (first + last ``QUICK_BLOCK``)
+              inside each size bucket.  For files up to 2 × ``QUICK_BLOCK``
+              that already covers every byte, so those groups are final.
+3. **full**   SHA-1 over the whole file, only for quick-digest collisions –
+              long recordings with identical headers and trailers are told
+              apart here.  Runs on ``DEDUPE_WORKERS`` threads
+              (``VIDEO_DEDUPE_WORKERS``, default 2), each holding a read
+              slot of its device (``iosched.reading``).
+
+Digests land in the ``fingerprints`` cache, so a second run reads nothing
+for unchanged files.  Hard links to one inode count once (they free no
+space).  ``Deduper.start()`` runs the same thing on a background thread.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import iosched
+from .fingerprint import QUICK_BLOCK, fingerprint
+from .scanner import Scanner, walk_dirs
+
+log = logging.getLogger("video.dedupe")
+
+DEDUPE_WORKERS = int(os.getenv("VIDEO_DEDUPE_WORKERS", "2"))
+
+Entry = Tuple[Path, os.stat_result]
+
+
+@dataclass
+class DupeGroup:
+    size:   int
+    digest: str
+    algo:   str                         # "quick" (small files) or "sha1"
+    paths:  List[str]
+
+    @property
+    def reclaimable(self) -> int:
+        return self.size * (len(self.paths) - 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "reclaimable": self.reclaimable}
+
+
+@dataclass
+class DupeReport:
+    groups:       List[DupeGroup] = field(default_factory=list)
+    files:        int = 0               # files seen by the walk
+    size_buckets: int = 0               # sizes shared by ≥ 2 files
+    quick_hashed: int = 0
+    full_hashed:  int = 0
+    full_bytes:   int = 0               # bytes read by stage 3 (before cache hits)
+    errors:       int = 0
+    elapsed_s:    float = 0.0
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return sum(g.reclaimable for g in self.groups)
+
+    def to_dict(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        d = {k: v for k, v in asdict(self).items() if k != "groups"}
+        d["reclaimable_bytes"] = self.reclaimable_bytes
+        d["duplicate_files"] = sum(len(g.paths) - 1 for g in self.groups)
+        d["groups"] = [g.to_dict() for g in self.groups[:limit]]
+        return d
+
+
+class Deduper:
+    """Find byte-identical files under *roots* (see module docstring)."""
+
+    def __init__(self, roots: Iterable[Path], *, db: Any = None,
+                 min_size: int = 1, media_only: bool = True,
+                 workers: int = DEDUPE_WORKERS) -> None:
+        self.roots      = [Path(r) for r in roots]
+        self.db         = db
+        self.min_size   = max(1, min_size)
+        self.media_only = media_only
+        self.workers    = max(1, workers)
+        self._exts      = Scanner.VIDEO_EXTS | Scanner.IMAGE_EXTS | Scanner.AUDIO_EXTS
+
+    # ─── stage 1: size buckets ─────────────────────────────────────────────
+    def _buckets(self, report: DupeReport) -> Dict[int, List[Entry]]:
+        by_size: Dict[int, List[Entry]] = {}
+        inodes = set()
+        for root in self.roots:
+            if not root.exists():
+                log.warning("dedupe root does not exist: %s", root)
+                continue
+            walkers = iosched.limits_for(root).list
+            for _, files, _ in walk_dirs(root, workers=walkers):
+                for entry in files:
+                    if self.media_only and Path(entry.name).suffix.lower() not in self._exts:
+                        continue
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError as exc:
+                        log.debug("cannot stat %s: %s", entry.path, exc)
+                        report.errors += 1
+                        continue
+                    if st.st_size < self.min_size or (st.st_dev, st.st_ino) in inodes:
+                        continue
+                    inodes.add((st.st_dev, st.st_ino))
+                    report.files += 1
+                    by_size.setdefault(st.st_size, []).append((Path(entry.path), st))
+        return {s: e for s, e in by_size.items() if len(e) > 1}
+
+    # ─── stages 2 + 3: digests inside a group ──────────────────────────────
+    def _digest(self, entry: Entry, algo: str) -> Optional[str]:
+        path, st = entry
+        try:
+            with iosched.reading(path, st):
+                return fingerprint(path, (algo,), st=st, db=self.db)[algo]
+        except OSError as exc:
+            log.warning("cannot read %s: %s", path, exc)
+            return None
+
+    def _split(self, pool: ThreadPoolExecutor, groups: List[List[Entry]],
+               algo: str, report: DupeReport) -> List[Tuple[str, List[Entry]]]:
+        """Sub-group every group by *algo*; keep those still colliding."""
+        flat = [e for g in groups for e in g]
+        digests = list(pool.map(lambda e: self._digest(e, algo), flat))
+        report.errors += digests.count(None)
+        out: Dict[Tuple[int, str], List[Entry]] = {}
+        for entry, dig in zip(flat, digests):
+            if dig is not None:
+                out.setdefault((entry[1].st_size, dig), []).append(entry)
+        return [(dig, es) for (_, dig), es in out.items() if len(es) > 1]
+
+    def run(self) -> DupeReport:
+        t0 = time.monotonic()
+        report = DupeReport()
+        buckets = self._buckets(report)
+        report.size_buckets = len(buckets)
+
+        quick_workers = max([self.workers] +
+                            [iosched.limits_for(r).read for r in self.roots if r.exists()])
+        with ThreadPoolExecutor(quick_workers, thread_name_prefix="dedupe-quick") as pool:
+            candidates = self._split(pool, list(buckets.values()), "quick", report)
+        report.quick_hashed = sum(len(e) for e in buckets.values())
+
+        exact  = [(d, es) for d, es in candidates if es[0][1].st_size <= 2 * QUICK_BLOCK]
+        verify = [es for d, es in candidates if es[0][1].st_size > 2 * QUICK_BLOCK]
+        report.full_hashed = sum(len(es) for es in verify)
+        report.full_bytes = sum(e[1].st_size for es in verify for e in es)
+        log.info("dedupe: %d files, %d size buckets, %d quick collisions, "
+                 "%d files to verify", report.files, len(buckets), len(candidates),
+                 report.full_hashed)
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="dedupe-full") as pool:
+            verified = self._split(pool, verify, "sha1", report)
+
+        report.groups = sorted(
+            [DupeGroup(es[0][1].st_size, d, "quick", sorted(p.as_posix() for p, _ in es))
+             for d, es in exact] +
+            [DupeGroup(es[0][1].st_size, d, "sha1", sorted(p.as_posix() for p, _ in es))
+             for d, es in verified],
+            key=lambda g: (-g.reclaimable, g.paths[0]))
+        report.elapsed_s = round(time.monotonic() - t0, 3)
+        return report
+
+    def start(self) -> "Future[DupeReport]":
+        """``run()`` on a background thread; the Future carries the report."""
+        fut: "Future[DupeReport]" = Future()
+
+        def _job() -> None:
+            if not fut.set_running_or_notify_cancel():
+                return
+            try:
+                fut.set_result(self.run())
+            except BaseException as exc:            # surfaced through the Future
+                log.exception("dedupe job failed")
+                fut.set_exception(exc)
+
+        threading.Thread(target=_job, daemon=True, name="video-dedupe").start()
+        return fut
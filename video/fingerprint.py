@@ -0,0 +1,189 @@
+# video/fingerprint.py
+"""
+One read pass per file, every digest a caller needs – pure stdlib.
+
+    fp = fingerprint(path, ("quick", "sha256"))   # {"quick": …, "sha256": …}
+    digest(path, "sha1")                          # one digest
+
+Digests
+~~~~~~~
+``quick``   SHA-1 of the first + last ``QUICK_BLOCK`` bytes (whole file when
+            smaller) – the scanner's ``files.id`` and the preview file name.
+``sha1`` / ``sha256`` / any other ``hashlib`` name – over the whole file.
+
+Whenever a full-file digest has to be computed, every digest in
+``FULL_SET`` (``VIDEO_FP_DIGESTS``, default ``quick,sha1,sha256``) is
+computed in the same pass, so ingest (sha1), artifacts and DAM (sha256)
+and the scanner (quick) share one read of the file.
+
+Results are cached per ``(st_dev, st_ino, size, mtime_ns)``: in memory
+(``VIDEO_FP_CACHE_SIZE`` entries) and in the ``fingerprints`` table of the
+given MediaDB – or of the global ``video.DB`` when none is passed.  A file
+that is modified gets a new key, so a stale digest is never served.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+log = logging.getLogger("video.fingerprint")
+
+QUICK_BLOCK = 1024 * 1024
+READ_CHUNK  = int(os.getenv("VIDEO_FP_CHUNK", str(8 * 1024 * 1024)))
+CACHE_SIZE  = int(os.getenv("VIDEO_FP_CACHE_SIZE", "4096"))
+FULL_SET    = tuple(a.strip() for a in
+                    os.getenv("VIDEO_FP_DIGESTS", "quick,sha1,sha256").split(",")
+                    if a.strip())
+
+Key = Tuple[int, int, int, int]
+
+_mem: "OrderedDict[Key, Dict[str, str]]" = OrderedDict()
+_mem_lock = threading.Lock()
+
+
+def file_key(st: os.stat_result) -> Key:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _quick_algo(block: int) -> str:
+    return "quick" if block == QUICK_BLOCK else f"quick@{block}"
+
+
+def _default_db():
+    try:
+        from video import DB                    # late import avoids cycles
+        return DB
+    except Exception:                           # partially initialised package
+        return None
+
+
+# ─── cache ─────────────────────────────────────────────────────────────────
+def _cached(key: Key, db) -> Dict[str, str]:
+    with _mem_lock:
+        hit = _mem.get(key)
+        if hit is not None:
+            _mem.move_to_end(key)
+            return dict(hit)
+    if db is None:
+        return {}
+    try:
+        found = db.get_fingerprints(key)
+    except Exception as exc:                    # old schema, closed DB …
+        log.debug("fingerprint cache read failed: %s", exc)
+        return {}
+    if found:
+        _remember(key, found)
+    return found
+
+
+def _remember(key: Key, digests: Dict[str, str]) -> None:
+    with _mem_lock:
+        merged = {**_mem.pop(key, {}), **digests}
+        _mem[key] = merged
+        while len(_mem) > CACHE_SIZE:
+            _mem.popitem(last=False)
+
+
+def clear_cache() -> None:
+    """Forget the in-memory cache (the DB table is left alone)."""
+    with _mem_lock:
+        _mem.clear()
+
+
+# ─── hashing ───────────────────────────────────────────────────────────────
+def _read_quick(path: Path, block: int) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        head = f.read(block)
+        h.update(head)
+        if len(head) == block:
+            f.seek(-block, os.SEEK_END)
+            h.update(f.read(block))
+    return h.hexdigest()
+
+
+def _read_full(path: Path, algos: Iterable[str], block: int) -> Dict[str, str]:
+    """Stream the file once, feeding every hasher (and the quick head/tail)."""
+    algos = list(algos)
+    quick = [a for a in algos if a.startswith("quick")]
+    hashers = {a: hashlib.new(a) for a in algos if not a.startswith("quick")}
+    buf = bytearray(max(READ_CHUNK, block))
+    view = memoryview(buf)
+    head = b""
+    tail = b""
+    with open(path, "rb", buffering=0) as f:
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            chunk = view[:n]
+            for h in hashers.values():
+                h.update(chunk)             # hashlib drops the GIL on big buffers
+            if quick:
+                if len(head) < block:
+                    head += bytes(chunk[:block - len(head)])
+                tail = (tail + bytes(chunk[-block:]))[-block:]
+
+    out = {a: h.hexdigest() for a, h in hashers.items()}
+    if quick:
+        h = hashlib.sha1(head)
+        if len(head) == block:
+            h.update(tail)
+        out[_quick_algo(block)] = h.hexdigest()
+    return out
+
+
+def fingerprint(path: str | Path,
+                digests: Iterable[str] = ("quick",),
+                *,
+                st: Optional[os.stat_result] = None,
+                db: Any = None,
+                quick_block: int = QUICK_BLOCK) -> Dict[str, str]:
+    """
+    ``{algo: hexdigest}`` for every name in *digests*.
+
+    Raises ``OSError`` when the file can't be read; callers keep their own
+    fallbacks.  Pass *st* when a fresh ``stat`` is already at hand and *db*
+    to use a specific MediaDB as the persistent cache – or one of its
+    ``unit_of_work()``s, which then commits the new digests with its batch.
+    """
+    path = Path(path)
+    digests = list(digests)
+    want = [_quick_algo(quick_block) if a == "quick" else a for a in digests]
+    st = st or os.stat(path)
+    key = file_key(st)
+    db = db if db is not None else _default_db()
+
+    have = _cached(key, db)
+    missing = [a for a in want if a not in have]
+    if missing:
+        full = [a for a in missing if not a.startswith("quick")]
+        if full:
+            # one pass anyway – compute everything a later caller may ask for
+            extra = [_quick_algo(quick_block) if a == "quick" else a for a in FULL_SET]
+            todo = list(dict.fromkeys(full + missing + extra))
+            new = _read_full(path, [a for a in todo if a not in have], quick_block)
+        else:
+            new = {a: _read_quick(path, quick_block) for a in missing}
+        have.update(new)
+        _remember(key, new)
+        if db is not None:
+            try:
+                db.put_fingerprints(key, new)
+            except Exception as exc:            # read-only / old schema
+                log.debug("fingerprint cache write failed: %s", exc)
+    return {a: have[b] for a, b in zip(digests, want)}
+
+
+def digest(path: str | Path, algo: str = "sha1", **kw: Any) -> str:
+    """Single digest – see ``fingerprint``."""
+    return fingerprint(path, (algo,), **kw)[algo]
@@ -6,14 +6,16 @@ Falls back to vanilla paths automatically.
 
 import shutil, subprocess, os, tempfile, logging
 
+from . import runner
+
 _FFMPEG = shutil.which("ffmpeg") or "/opt/ffmpeg-rpi/bin/ffmpeg"
 
 def has_vc7():
     """Detect usable v4l2_request decoders."""
     if not os.path.exists(_FFMPEG):
         return False
-    out = subprocess.check_output([_FFMPEG, "-hide_banner", "-decoders"],
-                                  text=True)
+    out = runner.run_sync([_FFMPEG, "-hide_banner", "-decoders"],
+                          tool="ffmpeg", timeout=30, check=True).stdout.decode()
     return "h264_v4l2m2m" in out or "hevc_v4l2request" in out
 
 def transcode_hw(src: str, dst: str, vcodec: str = "h264"):
@@ -38,7 +40,7 @@ def transcode_hw(src: str, dst: str, vcodec: str = "h264"):
         dst
     ]
     logging.debug("Running: %s", " ".join(cmd))
-    subprocess.check_call(cmd)
+    runner.run_sync(cmd, tool="ffmpeg", check=True, capture_stdout=False)
 
 def frame_iter_hw(src: str):
     """
@@ -0,0 +1,440 @@
+# video/imagemeta.py
+"""
+Header-only image metadata – pure stdlib, replaces ``imghdr``.
+
+    info = read_image_meta(Path("IMG_0001.HEIC"))
+    # {"format": "heic", "width": 4032, "height": 3024, "orientation": 6,
+    #  "datetime_original": "2024-05-01T12:00:00", "camera_make": "Apple",
+    #  "camera_model": "iPhone 15", "gps_lat": 52.37, "gps_lon": 4.89, …}
+
+Covers JPEG, PNG, GIF, BMP, WebP, TIFF/DNG and HEIC/HEIF (every
+``Scanner.IMAGE_EXTS``) from the first ``IMAGE_HEAD`` bytes; EXIF is
+decoded wherever the container carries it (JPEG APP1, PNG eXIf, WebP EXIF,
+TIFF IFDs, HEIC Exif item).  Keys follow ``ImageMeta``; anything not found
+is left out.  Returns ``None`` for formats it doesn't recognise.
+"""
+from __future__ import annotations
+
+import logging
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+log = logging.getLogger("video.imagemeta")
+
+IMAGE_HEAD = 256 * 1024
+EXIF_MAX   = 64 * 1024             # HEIC Exif item read past the head
+
+# EXIF / TIFF tags
+_WIDTH, _HEIGHT, _MAKE, _MODEL, _ORIENT = 0x100, 0x101, 0x10F, 0x110, 0x112
+_DATETIME, _SUBIFDS, _SUBFILE = 0x132, 0x14A, 0xFE
+_EXIF_IFD, _GPS_IFD, _DT_ORIG = 0x8769, 0x8825, 0x9003
+_PIX_X, _PIX_Y = 0xA002, 0xA003
+_TYPE_SIZE = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8}
+
+
+class _Bad(Exception):
+    pass
+
+
+def read_image_meta(path: Path) -> Optional[Dict[str, Any]]:
+    """Dimensions, orientation, capture time, camera and GPS – or ``None``."""
+    path = Path(path)
+    try:
+        with open(path, "rb") as f:
+            buf = f.read(IMAGE_HEAD)
+            for sniff, parser in _PARSERS:
+                if sniff(buf):
+                    info = parser(buf, f)
+                    return {k: v for k, v in info.items() if v is not None} or None
+    except (_Bad, OSError, struct.error, ValueError, IndexError) as exc:
+        log.debug("image header parse failed for %s: %s", path, exc)
+    return None
+
+
+def image_dimensions(path: Path) -> Tuple[Optional[int], Optional[int]]:
+    info = read_image_meta(path) or {}
+    return info.get("width"), info.get("height")
+
+
+def as_probe(info: Dict[str, Any]) -> Dict[str, Any]:
+    """ffprobe-shaped wrapper (see ``video.container``) for the probe cache."""
+    stream = {"index": 0, "codec_type": "video", "codec_name": info.get("format"),
+              "width": info.get("width"), "height": info.get("height")}
+    return {"format": {"format_name": info.get("format"), "nb_streams": 1},
+            "streams": [stream], "source": "header", "image": info}
+
+
+# ─── EXIF (TIFF structure) ─────────────────────────────────────────────────
+class _Tiff:
+    def __init__(self, data: bytes) -> None:
+        if data[:2] == b"II":
+            self.e = "<"
+        elif data[:2] == b"MM":
+            self.e = ">"
+        else:
+            raise _Bad("not TIFF")
+        if struct.unpack_from(self.e + "H", data, 2)[0] not in (42, 43):
+            raise _Bad("bad TIFF magic")
+        self.data = data
+
+    def ifd(self, off: int) -> Dict[int, Any]:
+        d, e = self.data, self.e
+        if not 0 < off < len(d) - 2:
+            return {}
+        n = struct.unpack_from(e + "H", d, off)[0]
+        out: Dict[int, Any] = {}
+        for i in range(min(n, 512)):
+            p = off + 2 + 12 * i
+            if p + 12 > len(d):
+                break
+            tag, typ, count = struct.unpack_from(e + "HHI", d, p)
+            size = _TYPE_SIZE.get(typ, 0) * count
+            if not size:
+                continue
+            vo = p + 8 if size <= 4 else struct.unpack_from(e + "I", d, p + 8)[0]
+            if vo + size > len(d):
+                continue                            # beyond what we read
+            out[tag] = self._value(typ, count, vo)
+        return out
+
+    def next_ifd(self, off: int) -> int:
+        n = struct.unpack_from(self.e + "H", self.data, off)[0]
+        p = off + 2 + 12 * n
+        return struct.unpack_from(self.e + "I", self.data, p)[0] if p + 4 <= len(self.data) else 0
+
+    def _value(self, typ: int, count: int, off: int) -> Any:
+        d, e = self.data, self.e
+        if typ == 2:
+            return d[off:off + count].split(b"\0", 1)[0].decode("utf-8", "replace").strip()
+        if typ in (1, 6, 7):
+            vals = list(d[off:off + count])
+        elif typ in (5, 10):
+            fmt = e + ("II" if typ == 5 else "ii") * count
+            raw = struct.unpack_from(fmt, d, off)
+            vals = [n / den if den else 0.0 for n, den in zip(raw[::2], raw[1::2])]
+        else:
+            code = {3: "H", 4: "I", 8: "h", 9: "i"}[typ]
+            vals = list(struct.unpack_from(e + code * count, d, off))
+        return vals[0] if count == 1 else vals
+
+
+def _exif(data: bytes) -> Dict[str, Any]:
+    """Decode a TIFF/EXIF blob (optionally ``Exif\\0\\0``-prefixed)."""
+    if data[:6] == b"Exif\0\0":
+        data = data[6:]
+    t = _Tiff(data)
+    ifd0 = t.ifd(struct.unpack_from(t.e + "I", data, 4)[0])
+    exif = t.ifd(ifd0[_EXIF_IFD]) if isinstance(ifd0.get(_EXIF_IFD), int) else {}
+    gps = t.ifd(ifd0[_GPS_IFD]) if isinstance(ifd0.get(_GPS_IFD), int) else {}
+    out: Dict[str, Any] = {
+        "orientation": ifd0.get(_ORIENT) if isinstance(ifd0.get(_ORIENT), int) else None,
+        "camera_make": ifd0.get(_MAKE) or None,
+        "camera_model": ifd0.get(_MODEL) or None,
+        "datetime_original": _exif_time(exif.get(_DT_ORIG) or ifd0.get(_DATETIME)),
+        "width": _int(exif.get(_PIX_X)),
+        "height": _int(exif.get(_PIX_Y)),
+    }
+    out.update(_gps(gps))
+    return out
+
+
+def _int(v: Any) -> Optional[int]:
+    return v if isinstance(v, int) and v > 0 else None
+
+
+def _exif_time(v: Any) -> Optional[str]:
+    """'2024:05:01 12:00:00' → '2024-05-01T12:00:00'"""
+    if not isinstance(v, str) or len(v) < 19 or v.startswith("0000"):
+        return None
+    return f"{v[0:4]}-{v[5:7]}-{v[8:10]}T{v[11:19]}"
+
+
+def _gps(g: Dict[int, Any]) -> Dict[str, Any]:
+    def _deg(v: Any, ref: Any, neg: str) -> Optional[float]:
+        if not isinstance(v, list) or len(v) != 3:
+            return None
+        val = v[0] + v[1] / 60 + v[2] / 3600
+        return round(-val if ref == neg else val, 7)
+
+    out = {"gps_lat": _deg(g.get(2), g.get(1), "S"),
+           "gps_lon": _deg(g.get(4), g.get(3), "W")}
+    alt = g.get(6)
+    if isinstance(alt, float):
+        out["gps_alt"] = round(-alt if g.get(5) == 1 else alt, 2)
+    return out
+
+
+# ─── formats ───────────────────────────────────────────────────────────────
+_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg(buf: bytes, f) -> Dict[str, Any]:
+    info: Dict[str, Any] = {"format": "jpeg"}
+    pos = 2
+    while pos + 4 <= len(buf):
+        if buf[pos] != 0xFF:
+            raise _Bad("lost JPEG sync")
+        marker = buf[pos + 1]
+        if marker == 0xFF:                          # fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack_from(">H", buf, pos + 2)[0]
+        seg = buf[pos + 4:pos + 2 + length]
+        if marker == 0xE1 and seg[:6] == b"Exif\0\0" and "exif" not in info:
+            info["exif"] = True
+            info.update({k: v for k, v in _exif(seg).items() if v is not None})
+        elif marker in _SOF:
+            h, w = struct.unpack_from(">HH", seg, 1)
+            info["width"], info["height"] = w, h        # the frame beats EXIF hints
+            break
+        elif marker == 0xDA:                         # start of scan – no SOF?
+            break
+        pos += 2 + length
+    info.pop("exif", None)
+    return info
+
+
+def _png(buf: bytes, f) -> Dict[str, Any]:
+    w, h = struct.unpack_from(">II", buf, 16)
+    info: Dict[str, Any] = {"format": "png", "width": w, "height": h}
+    pos = 8
+    while pos + 8 <= len(buf):
+        n, kind = struct.unpack_from(">I4s", buf, pos)
+        if kind == b"eXIf":
+            exif = _exif(buf[pos + 8:pos + 8 + n])
+            exif.pop("width", None), exif.pop("height", None)
+            info.update({k: v for k, v in exif.items() if v is not None})
+        if kind in (b"IDAT", b"IEND"):
+            break
+        pos += 12 + n
+    return info
+
+
+def _gif(buf: bytes, f) -> Dict[str, Any]:
+    w, h = struct.unpack_from("<HH", buf, 6)
+    return {"format": "gif", "width": w, "height": h}
+
+
+def _bmp(buf: bytes, f) -> Dict[str, Any]:
+    hdr = struct.unpack_from("<I", buf, 14)[0]
+    if hdr == 12:                                   # BITMAPCOREHEADER
+        w, h = struct.unpack_from("<HH", buf, 18)
+    else:
+        w, h = struct.unpack_from("<ii", buf, 18)
+    return {"format": "bmp", "width": w, "height": abs(h)}
+
+
+def _webp(buf: bytes, f) -> Dict[str, Any]:
+    info: Dict[str, Any] = {"format": "webp"}
+    pos = 12
+    while pos + 8 <= len(buf):
+        kind, n = struct.unpack_from("<4sI", buf, pos)
+        body = buf[pos + 8:pos + 8 + n]
+        if kind == b"VP8X":
+            w = int.from_bytes(body[4:7], "little") + 1
+            h = int.from_bytes(body[7:10], "little") + 1
+            info["width"], info["height"] = w, h
+        elif kind == b"VP8 " and "width" not in info:
+            if body[3:6] != b"\x9d\x01\x2a":
+                raise _Bad("bad VP8 start code")
+            w, h = struct.unpack_from("<HH", body, 6)
+            info["width"], info["height"] = w & 0x3FFF, h & 0x3FFF
+        elif kind == b"VP8L" and "width" not in info:
+            if body[0] != 0x2F:
+                raise _Bad("bad VP8L signature")
+            bits = int.from_bytes(body[1:5], "little")
+            info["width"], info["height"] = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        elif kind == b"EXIF":
+            exif = _exif(body)
+            exif.pop("width", None), exif.pop("height", None)
+            info.update({k: v for k, v in exif.items() if v is not None})
+        pos += 8 + n + (n & 1)
+    return info
+
+
+def _tiff(buf: bytes, f) -> Dict[str, Any]:
+    """TIFF and TIFF-based raws (DNG): the largest full-resolution IFD wins."""
+    t = _Tiff(buf)
+    info = _exif(buf)
+    info["format"] = "dng" if _is_dng(t) else "tiff"
+    best = (0, 0)
+    off, seen = struct.unpack_from(t.e + "I", buf, 4)[0], set()
+    ifds: List[Dict[int, Any]] = []
+    while off and off not in seen and len(seen) < 16:
+        seen.add(off)
+        ifd = t.ifd(off)
+        ifds.append(ifd)
+        subs = ifd.get(_SUBIFDS)
+        for s in (subs if isinstance(subs, list) else [subs] if subs else []):
+            ifds.append(t.ifd(s))
+        off = t.next_ifd(off)
+    for ifd in ifds:
+        if ifd.get(_SUBFILE, 0) & 1:                # reduced-resolution preview
+            continue
+        w, h = _int(ifd.get(_WIDTH)), _int(ifd.get(_HEIGHT))
+        if w and h and w * h > best[0] * best[1]:
+            best = (w, h)
+    if best[0]:
+        info["width"], info["height"] = best
+    return info
+
+
+def _is_dng(t: _Tiff) -> bool:
+    off = struct.unpack_from(t.e + "I", t.data, 4)[0]
+    return 0xC612 in t.ifd(off)                      # DNGVersion
+
+
+# ─── HEIF / HEIC ───────────────────────────────────────────────────────────
+def _boxes(buf: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", buf, pos)
+        head = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", buf, pos + 8)[0]
+            head = 16
+        elif size == 0:
+            size = end - pos
+        if size < head:
+            raise _Bad("bad box size")
+        yield kind, pos + head, min(pos + size, end)
+        pos += size
+
+
+def _heif(buf: bytes, f) -> Dict[str, Any]:
+    meta = next(((s, e) for k, s, e in _boxes(buf, 0, len(buf)) if k == b"meta"), None)
+    if meta is None:
+        raise _Bad("no meta box in head")
+    primary, props, assoc, exif_item, locs = None, [], {}, None, {}
+    for k, s, e in _boxes(buf, meta[0] + 4, meta[1]):            # meta is a FullBox
+        if k == b"pitm":
+            primary = struct.unpack_from(">H" if buf[s] == 0 else ">I", buf, s + 4)[0]
+        elif k == b"iprp":
+            for k2, s2, e2 in _boxes(buf, s, e):
+                if k2 == b"ipco":
+                    props = list(_boxes(buf, s2, e2))
+                elif k2 == b"ipma":
+                    assoc = _ipma(buf, s2, e2)
+        elif k == b"iinf":
+            exif_item = _exif_item_id(buf, s, e)
+        elif k == b"iloc":
+            locs = _iloc(buf, s, e)
+
+    info: Dict[str, Any] = {"format": "heic" if buf[8:12] in (b"heic", b"heix", b"heim", b"heis")
+                            else "heif"}
+    if exif_item is not None and exif_item in locs:
+        off, length = locs[exif_item]
+        blob = buf[off:off + length] if off + length <= len(buf) else _read_at(f, off, length)
+        if blob and len(blob) > 4:
+            skip = struct.unpack_from(">I", blob, 0)[0]      # offset to the TIFF header
+            exif = _exif(blob[4 + skip:])
+            exif.pop("width", None), exif.pop("height", None)
+            info.update({k: v for k, v in exif.items() if v is not None})
+
+    for idx in assoc.get(primary, []):
+        if not 0 < idx <= len(props):
+            continue
+        k, s, e = props[idx - 1]
+        if k == b"ispe":
+            info["width"], info["height"] = struct.unpack_from(">II", buf, s + 4)
+        elif k == b"irot":
+            # anticlockwise quarter turns → EXIF orientation
+            info["orientation"] = {0: 1, 1: 8, 2: 3, 3: 6}[buf[s] & 3]
+    return info
+
+
+def _read_at(f, off: int, length: int) -> bytes:
+    if length > EXIF_MAX:
+        return b""
+    f.seek(off)
+    return f.read(length)
+
+
+def _ipma(buf: bytes, s: int, e: int) -> Dict[int, List[int]]:
+    version, flags = buf[s], int.from_bytes(buf[s + 1:s + 4], "big")
+    pos = s + 4
+    n = struct.unpack_from(">I", buf, pos)[0]
+    pos += 4
+    out: Dict[int, List[int]] = {}
+    for _ in range(n):
+        if version < 1:
+            item = struct.unpack_from(">H", buf, pos)[0]
+            pos += 2
+        else:
+            item = struct.unpack_from(">I", buf, pos)[0]
+            pos += 4
+        count = buf[pos]
+        pos += 1
+        idxs = []
+        for _ in range(count):
+            if flags & 1:
+                idxs.append(struct.unpack_from(">H", buf, pos)[0] & 0x7FFF)
+                pos += 2
+            else:
+                idxs.append(buf[pos] & 0x7F)
+                pos += 1
+        out[item] = idxs
+    return out
+
+
+def _exif_item_id(buf: bytes, s: int, e: int) -> Optional[int]:
+    version = buf[s]
+    pos = s + 4 + (2 if version == 0 else 4)
+    for k, bs, be in _boxes(buf, pos, e):
+        if k != b"infe" or buf[bs] < 2:
+            continue
+        v = buf[bs]
+        item = struct.unpack_from(">H" if v == 2 else ">I", buf, bs + 4)[0]
+        tpos = bs + 4 + (2 if v == 2 else 4) + 2
+        if buf[tpos:tpos + 4] == b"Exif":
+            return item
+    return None
+
+
+def _iloc(buf: bytes, s: int, e: int) -> Dict[int, Tuple[int, int]]:
+    """item id → (file offset, length) of its first extent."""
+    version = buf[s]
+    pos = s + 4
+    a, b = buf[pos], buf[pos + 1]
+    off_size, len_size, base_size = a >> 4, a & 15, b >> 4
+    idx_size = b & 15 if version in (1, 2) else 0
+    pos += 2
+
+    def _n(size: int) -> int:
+        nonlocal pos
+        v = int.from_bytes(buf[pos:pos + size], "big") if size else 0
+        pos += size
+        return v
+
+    count = _n(2 if version < 2 else 4)
+    out: Dict[int, Tuple[int, int]] = {}
+    for _ in range(count):
+        item = _n(2 if version < 2 else 4)
+        method = _n(2) & 15 if version in (1, 2) else 0
+        _n(2)                                        # data_reference_index
+        base = _n(base_size)
+        extents = _n(2)
+        first = None
+        for _ in range(extents):
+            _n(idx_size)
+            off, length = _n(off_size), _n(len_size)
+            first = first or (base + off, length)
+        if first and method == 0:                    # file offsets only
+            out[item] = first
+    return out
+
+
+_PARSERS = [
+    (lambda b: b[:3] == b"\xff\xd8\xff", _jpeg),
+    (lambda b: b[:8] == b"\x89PNG\r\n\x1a\n", _png),
+    (lambda b: b[:6] in (b"GIF87a", b"GIF89a"), _gif),
+    (lambda b: b[:2] == b"BM" and len(b) >= 26, _bmp),
+    (lambda b: b[:4] == b"RIFF" and b[8:12] == b"WEBP", _webp),
+    (lambda b: b[:4] in (b"II*\0", b"MM\0*"), _tiff),
+    (lambda b: b[4:8] == b"ftyp" and b[8:12] in (b"heic", b"heix", b"heim", b"heis",
+                                                  b"mif1", b"msf1", b"avif"), _heif),
+]
@@ -0,0 +1,158 @@
+# video/iosched.py
+"""
+Per-device I/O budgets for the scanner.
+
+    lim = iosched.limits_for(root)          # IOLimits(kind="network", list=16, read=8)
+    with iosched.reading(path, st):         # at most lim.read readers per st_dev
+        digest(path, "sha1")
+
+Every filesystem (``st_dev``) gets two numbers:
+
+``list``  concurrent ``scandir`` calls for ``walk_dirs`` – listing an SMB/NFS
+          share is latency-bound, so many in flight hide the round trips.
+``read``  concurrent file readers (hashing, header parsing) – a single
+          spinning disk thrashes with more than a couple of streams.
+
+Defaults come from the mount: network filesystems (``stat -f`` type, as
+``storage.wal_proxy`` detects it) get wide listing and moderate reads,
+rotational block devices (``/sys/dev/block/…/queue/rotational``) get narrow
+both, everything else (SSD, NVMe, tmpfs) lists a little wider and reads at
+``2 × CPUs``.  Per-root overrides live in ``video.cfg``::
+
+    [io]
+    limits = /mnt/nas=32/4, /srv/archive=/1      # root=list/read, either optional
+
+or ``$VIDEO_IO_LIMITS`` in the same syntax (see ``config.get_io_limits``).
+An override applies to the whole device its root lives on.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+log = logging.getLogger("video.iosched")
+
+_CPUS = os.cpu_count() or 2
+
+# kind → (list, read)
+DEFAULTS = {
+    "network":    (16, 8),
+    "rotational": (2, 2),
+    "local":      (4, 2 * _CPUS),
+}
+# in wal_proxy._NET_FS for their WAL semantics, but block devices for I/O
+_BLOCK_FS = {b"fuseblk", b"ntfs", b"exfat"}
+
+
+@dataclass(frozen=True)
+class IOLimits:
+    kind: str
+    list: int
+    read: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _rotational(dev: int) -> Optional[bool]:
+    base = Path(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+    for q in (base / "queue" / "rotational", base.resolve().parent / "queue" / "rotational"):
+        try:
+            return q.read_text().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+
+def detect(path: Path, st: Optional[os.stat_result] = None) -> IOLimits:
+    """Default limits for the filesystem *path* lives on."""
+    from .storage.wal_proxy import _NET_FS, _fs_type
+    try:
+        fs = _fs_type(path)
+    except Exception as exc:                    # no `stat -f`, vanished mount …
+        log.debug("fs type of %s unknown: %s", path, exc)
+        fs = b""
+    if fs in _NET_FS and fs not in _BLOCK_FS:
+        kind = "network"
+    else:
+        st = st or os.stat(path)
+        kind = "rotational" if _rotational(st.st_dev) else "local"
+    return IOLimits(kind, *DEFAULTS[kind])
+
+
+class IOScheduler:
+    """``IOLimits`` and reader semaphores, one set per ``st_dev``."""
+
+    def __init__(self, overrides: Optional[Dict[Path, tuple]] = None) -> None:
+        self._overrides = overrides
+        self._by_dev: Dict[int, IOLimits] = {}
+        self._sems: Dict[int, threading.BoundedSemaphore] = {}
+        self._active: Dict[int, int] = {}
+        self._waiting: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _override_for(self, dev: int) -> tuple:
+        if self._overrides is None:
+            from .config import get_io_limits
+            self._overrides = get_io_limits()
+        for root, lim in self._overrides.items():
+            try:
+                if os.stat(root).st_dev == dev:
+                    return lim
+            except OSError:
+                continue
+        return (None, None)
+
+    def limits_for(self, path: Path, st: Optional[os.stat_result] = None) -> IOLimits:
+        st = st or os.stat(path)
+        dev = st.st_dev
+        with self._lock:
+            hit = self._by_dev.get(dev)
+        if hit is not None:
+            return hit
+        lim = detect(path, st)
+        n_list, n_read = self._override_for(dev)
+        lim = IOLimits(lim.kind, n_list or lim.list, n_read or lim.read)
+        with self._lock:
+            if dev not in self._by_dev:
+                self._by_dev[dev] = lim
+                self._sems[dev] = threading.BoundedSemaphore(lim.read)
+                log.info("I/O budget for %s (dev %d): %s", path, dev, lim)
+            return self._by_dev[dev]
+
+    @contextmanager
+    def reading(self, path: Path, st: Optional[os.stat_result] = None) -> Iterator[None]:
+        """Hold one of the device's ``read`` slots for the duration."""
+        st = st or os.stat(path)
+        self.limits_for(path, st)
+        dev = st.st_dev
+        sem = self._sems[dev]
+        with self._lock:
+            self._waiting[dev] = self._waiting.get(dev, 0) + 1
+        sem.acquire()
+        with self._lock:
+            self._waiting[dev] -= 1
+            self._active[dev] = self._active.get(dev, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[dev] -= 1
+            sem.release()
+
+    def stats(self) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            return {dev: {**lim.to_dict(), "active": self._active.get(dev, 0),
+                          "waiting": self._waiting.get(dev, 0)}
+                    for dev, lim in self._by_dev.items()}
+
+
+_SCHED = IOScheduler()
+limits_for = _SCHED.limits_for
+reading    = _SCHED.reading
+stats      = _SCHED.stats
@@ -41,5 +41,6 @@ class VideoCard(BaseModel):
     score:     Optional[float] = None
 
 class CardResponse(BaseModel):
-    batch_id: str
-    items:    List[VideoCard]
\ No newline at end of file
+    batch_id:    str
+    items:       List[VideoCard]
+    next_cursor: Optional[str] = None   # keyset cursor for the next page
\ No newline at end of file
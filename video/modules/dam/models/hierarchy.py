@@ -18,6 +18,9 @@ import numpy as np
 from scenedetect import detect, ContentDetector
 from scenedetect.video_splitter import split_video_ffmpeg
 
+from video import runner
+from video.fingerprint import digest
+
 logger = logging.getLogger(__name__)
 
 class VideoSlice:
@@ -75,14 +78,8 @@ class HierarchyManager:
     
     async def get_file_hash(self, path: str) -> str:
         """Generate SHA256 hash of video file for caching."""
-        def _hash_file():
-            hash_sha256 = hashlib.sha256()
-            with open(path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_sha256.update(chunk)
-            return hash_sha256.hexdigest()
-        
-        return await asyncio.get_event_loop().run_in_executor(None, _hash_file)
+        return await asyncio.get_event_loop().run_in_executor(
+            None, digest, path, "sha256")
     
     async def get_video_info(self, path: str) -> Optional[Dict[str, Any]]:
         """Get comprehensive video information."""
@@ -222,24 +219,21 @@ class HierarchyManager:
     
     async def extract_audio_segment(self, path: str, start_time: float, end_time: float) -> Optional[str]:
         """Extract audio segment and return path to temporary file."""
-        def _extract():
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                cmd = [
-                    "ffmpeg", "-i", path,
-                    "-ss", str(start_time),
-                    "-to", str(end_time),
-                    "-vn", "-acodec", "pcm_s16le",
-                    "-y", tmp.name
-                ]
-                
-                try:
-                    subprocess.run(cmd, check=True, capture_output=True)
-                    return tmp.name
-                except subprocess.CalledProcessError as e:
-                    logger.error(f"Error extracting audio: {e}")
-                    return None
-        
-        return await asyncio.get_event_loop().run_in_executor(None, _extract)
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+            cmd = [
+                "ffmpeg", "-i", path,
+                "-ss", str(start_time),
+                "-to", str(end_time),
+                "-vn", "-acodec", "pcm_s16le",
+                "-y", tmp.name
+            ]
+
+        try:
+            await runner.run(cmd, tool="ffmpeg", check=True, capture_stdout=False)
+            return tmp.name
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.error(f"Error extracting audio: {e}")
+            return None
     
     async def save_hierarchy_cache(self, path: str, hierarchy: Dict[str, List[VideoSlice]]):
         """Save hierarchy to cache file."""
@@ -26,15 +26,19 @@ def cli_explore(args: Namespace) -> None:
     """
     • `video explore`              → recent feed (default limit 20)  
     • `video explore --limit 5`    → recent feed (limit 5)  
+    • `video explore --cursor <c>` → next page of the recent feed  
     • `video explore --batch <id>` → full batch manifest/cards
     """
+    from video.bootstrap import STORAGE
     store = STORAGE                     # same instance FastAPI uses
 
     # ---------------- Recent feed -----------------
     if not args.batch:
-        rows  = store.list_recent(args.limit)
+        page  = store.page_recent(args.limit, getattr(args, "cursor", None))
+        rows  = page["items"]
         model = CardResponse(batch_id="_recent",
-                             items=_rows_to_cards(rows))
+                             items=_rows_to_cards(rows),
+                             next_cursor=page["next_cursor"])
         log.info("recent feed – %d rows (limit=%d)", len(rows), args.limit)
 
     # ---------------- Batch manifest -------------
@@ -58,4 +62,5 @@ def add_parser(sub) -> None:
     p = sub.add_parser("explore", help="Explorer feed / batch view")
     p.add_argument("--limit", type=int, default=20,
                    help="Number of recent items to return")
+    p.add_argument("--cursor", help="next_cursor from the previous page")
     p.add_argument("--batch", help="Batch ID to inspect")
\ No newline at end of file
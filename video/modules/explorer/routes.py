@@ -67,17 +67,24 @@ def _manifest_to_cards(manifest) -> list[VideoCard]:
 async def list_recent(
     request: Request,
     limit: int = Query(50, le=500),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
     store: StorageEngine = Depends(_store),
 ):
     """
     Returns the N most recently ingested VideoArtifacts (created DESC).
+    Follow `next_cursor` for the next page – cost stays O(limit) at any depth.
     """
     t0 = time.perf_counter()
-    rows = store.list_recent(limit)
+    try:
+        page = store.page_recent(limit, cursor)
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    rows = page["items"]
     elapsed = (time.perf_counter() - t0) * 1000
     log.info("%s → /explorer [limit=%d]: %d rows in %.1f ms",
              _stamp(request), limit, len(rows), elapsed)
-    return CardResponse(batch_id="_recent", items=_rows_to_cards(rows))
+    return CardResponse(batch_id="_recent", items=_rows_to_cards(rows),
+                        next_cursor=page["next_cursor"])
 
 
 # --------------------------------------------------------------------------- #
@@ -139,18 +146,20 @@ async def set_position(
 # --------------------------------------------------------------------------- #
 # NEW – folder list  GET /explorer/folders
 # --------------------------------------------------------------------------- #
-@router.get("/folders", summary="All folders (flat)")
+@router.get("/folders", summary="All folders (flat), or children of one")
 async def list_folders(
     request: Request,
+    parent: str | None = Query(None, description="Only direct children of this folder"),
     store: StorageEngine = Depends(_store),
 ):
     """
-    Returns every *distinct* folder that currently contains media.
+    Returns every folder that contains media (and their ancestors), or just
+    the direct children of `parent`.
     Shape expected by React:
         [{id, name, path, parent_id}, …]
     """
     t0 = time.perf_counter()
-    rows = store.list_all_folders()
+    rows = store.list_all_folders(Path(parent) if parent else None)
     elapsed = (time.perf_counter() - t0) * 1000
     log.info("%s → /explorer/folders: %d folders in %.1f ms",
              _stamp(request), len(rows), elapsed)
@@ -0,0 +1,201 @@
+# video/pipeline.py
+"""
+Tiny threaded stage pipeline – pure stdlib.
+
+    pipe = Pipeline(source=paths, stages=[
+        Stage("hash",  hash_fn,  workers=8),
+        Stage("probe", probe_fn, workers=4),
+        Stage("write", write_fn, workers=1),
+    ])
+    stats = pipe.run()
+
+``source`` is any iterable; it is consumed by its own thread, so the first
+item reaches stage one while the iterable is still producing.  Stages are
+joined by bounded ``queue.Queue``s: a slow stage back-pressures everything
+upstream, so memory stays flat however many items the source yields.
+
+A stage function returns the item to pass downstream, or ``None`` to drop
+it (counted as ``dropped``).  Exceptions are logged and counted as
+``errors`` for that stage; the item is dropped and the pipeline goes on.
+Pass *on_error* to learn which items failed (``on_error(stage, item, exc)``),
+and *on_progress* to receive ``stats()`` every *progress_interval* seconds
+while the pipeline runs (from a separate thread; queue depths included).
+
+If the source itself raises, the items already emitted still drain, and
+``stats()["source_error"]`` carries the error – the run is incomplete.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+log = logging.getLogger("video.pipeline")
+
+QUEUE_FACTOR = int(os.getenv("VIDEO_PIPELINE_QUEUE_FACTOR", "4"))   # slots per worker
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name:    str
+    fn:      Callable[[Any], Any]
+    workers: int = 1
+    maxsize: int = 0                  # 0 → workers × QUEUE_FACTOR
+
+    # runtime counters (guarded by _lock)
+    seen:    int = 0
+    passed:  int = 0
+    dropped: int = 0
+    errors:  int = 0
+    busy_s:  float = 0.0
+    _lock:   threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _q:      Optional[queue.Queue] = field(default=None, repr=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in"     : self.seen,
+                "out"    : self.passed,
+                "dropped": self.dropped,
+                "errors" : self.errors,
+                "busy_s" : round(self.busy_s, 3),
+                "queued" : self._q.qsize() if self._q is not None else 0,
+                "queue_max": self._q.maxsize if self._q is not None else 0,
+            }
+
+
+class Pipeline:
+    """Run *source* through *stages*, each with its own worker threads."""
+
+    def __init__(self, source: Iterable[Any], stages: List[Stage],
+                 name: str = "pipeline",
+                 on_error: Optional[Callable[[str, Any, Exception], None]] = None,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 progress_interval: float = 1.0) -> None:
+        if not stages:
+            raise ValueError("pipeline needs at least one stage")
+        self.source  = source
+        self.stages  = stages
+        self.name    = name
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.emitted = 0
+        self.source_error: Optional[BaseException] = None
+        self._stop   = threading.Event()
+        self._done   = threading.Event()
+        self._t0: Optional[float] = None
+        for st in stages:
+            st.workers = max(1, st.workers)
+            st._q = queue.Queue(maxsize=st.maxsize or st.workers * QUEUE_FACTOR)
+
+    # -- control -------------------------------------------------------------
+    def cancel(self) -> None:
+        """Stop pulling from the source; items already queued still drain."""
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._t0 if self._t0 else 0.0
+        return {
+            "emitted"  : self.emitted,
+            "elapsed_s": round(elapsed, 3),
+            "source_error": None if self.source_error is None else repr(self.source_error),
+            "stages"   : {st.name: st.stats() for st in self.stages},
+        }
+
+    # -- run -----------------------------------------------------------------
+    def run(self) -> Dict[str, Any]:
+        """Block until the source is exhausted and every stage drained."""
+        self._t0 = time.monotonic()
+        threads: List[threading.Thread] = []
+        for i, st in enumerate(self.stages):
+            nxt = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            remaining = [st.workers]              # workers still alive in this stage
+            for n in range(st.workers):
+                t = threading.Thread(target=self._work, args=(st, nxt, remaining),
+                                     daemon=True, name=f"{self.name}-{st.name}-{n}")
+                t.start()
+                threads.append(t)
+
+        feeder = threading.Thread(target=self._feed, daemon=True,
+                                  name=f"{self.name}-source")
+        feeder.start()
+        reporter = None
+        if self.on_progress is not None:
+            reporter = threading.Thread(target=self._report, daemon=True,
+                                        name=f"{self.name}-progress")
+            reporter.start()
+        try:
+            feeder.join()
+            for t in threads:
+                t.join()
+        finally:
+            self._done.set()
+            if reporter is not None:
+                reporter.join()                   # no update after run() returns
+        return self.stats()
+
+    def _report(self) -> None:
+        while not self._done.wait(self.progress_interval):
+            try:
+                self.on_progress(self.stats())
+            except Exception:                      # noqa: BLE001
+                log.exception("%s: progress callback failed", self.name)
+
+    def _feed(self) -> None:
+        first = self.stages[0]
+        try:
+            for item in self.source:
+                if self._stop.is_set():
+                    break
+                first._q.put(item)
+                self.emitted += 1
+        except Exception as exc:                   # noqa: BLE001
+            log.exception("%s: source failed", self.name)
+            self.source_error = exc
+        finally:
+            for _ in range(first.workers):
+                first._q.put(_DONE)
+
+    def _work(self, st: Stage, nxt: Optional[Stage], remaining: List[int]) -> None:
+        while True:
+            item = st._q.get()
+            if item is _DONE:
+                break
+            t0 = time.perf_counter()
+            try:
+                out = st.fn(item)
+            except Exception as exc:               # noqa: BLE001
+                log.error("%s/%s failed on %r: %s", self.name, st.name, item, exc)
+                out, failed = None, True
+                if self.on_error is not None:
+                    self.on_error(st.name, item, exc)
+            else:
+                failed = False
+            dt = time.perf_counter() - t0
+            with st._lock:
+                st.seen   += 1
+                st.busy_s += dt
+                if failed:
+                    st.errors += 1
+                elif out is None:
+                    st.dropped += 1
+                else:
+                    st.passed += 1
+            if out is not None and nxt is not None:
+                nxt._q.put(out)
+
+        # last worker out closes the next stage
+        with st._lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and nxt is not None:
+            for _ in range(nxt.workers):
+                nxt._q.put(_DONE)
@@ -1,35 +1,50 @@
 # /video/preview.py
+"""
+Preview images.
 
+``generate_preview``      one JPEG frame (images, and videos as a fallback).
+``generate_preview_set``  for videos, from a single ffmpeg decode:
+                          a scrub sprite sheet, a WebVTT index for it and a
+                          poster frame at every ``POSTER_SIZES`` width.
+"""
+from dataclasses import dataclass, field
 from pathlib import Path
-import subprocess, shutil, logging, os, hashlib
+from typing import Dict, List, Optional
+import shutil, logging, os, hashlib, re
 
+from . import runner
 from .config import get_path, get_preview_root
+from .fingerprint import fingerprint
+from .probe import probe_cached, summarize
 
 log = logging.getLogger("video.preview")
 
 PREVIEW_ROOT = get_preview_root()
+PREVIEW_TIMEOUT = float(os.getenv("VIDEO_PREVIEW_TIMEOUT", "60"))
+
+SPRITE_FRAMES   = int(os.getenv("VIDEO_SPRITE_FRAMES", "20"))
+SPRITE_COLS     = int(os.getenv("VIDEO_SPRITE_COLS", "5"))
+SPRITE_TILE     = tuple(int(v) for v in os.getenv("VIDEO_SPRITE_TILE", "160x90").split("x"))
+SPRITE_KEYFRAMES = os.getenv("VIDEO_SPRITE_KEYFRAMES", "1") != "0"   # decode I-frames only
+SPRITE_TIMEOUT  = float(os.getenv("VIDEO_SPRITE_TIMEOUT", "600"))
+POSTER_SIZES    = tuple(int(v) for v in os.getenv("VIDEO_POSTER_SIZES", "128,256,512").split(","))
+POSTER_AT       = 3.0                   # seconds in (clamped for short clips)
+UNKNOWN_INTERVAL = 10.0                 # sprite spacing when the duration is unknown
+
+# one line per frame from the sprite branch's showinfo tap
+_SHOWINFO_FRAME = re.compile(r"\[Parsed_showinfo_\d+ @ [^\]]*\] n:\s*\d+ ")
 
 def hash_for_preview(src: Path, block_size=1024 * 1024) -> str:
     """
     Fast content-based hash for preview filenames.
-    - Hashes first and last MB for large files, whole file for small.
+    - Hashes first and last MB for large files, whole file for small
+      (the ``fingerprint`` "quick" digest – cached, shared with the scanner).
     - Fallback: hashes resolved file path.
     """
-    h = hashlib.sha1()
     try:
-        with src.open("rb") as f:
-            head = f.read(block_size)
-            h.update(head)
-            if len(head) == block_size:
-                try:
-                    f.seek(-block_size, os.SEEK_END)
-                    h.update(f.read(block_size))
-                except OSError:
-                    # File smaller than 2*block_size, just use what we read
-                    pass
+        return fingerprint(src, ("quick",), quick_block=block_size)["quick"]
     except Exception:
-        h.update(str(src.resolve()).encode())
-    return h.hexdigest()
+        return hashlib.sha1(str(src.resolve()).encode()).hexdigest()
 
 def make_preview_name(src: Path, hash_value: str = None) -> str:
     """
@@ -77,16 +92,158 @@ def generate_preview(src: Path, dst: Path = None, size: str = "256x144") -> bool
         str(dst)
     ]
     try:
-        subprocess.run(
-            cmd,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            check=True
-        )
-        return True
-    except subprocess.CalledProcessError:
-        log.warning("ffmpeg failed to generate preview for %s", src)
+        res = runner.run_sync(cmd, tool="ffmpeg", timeout=PREVIEW_TIMEOUT,
+                              capture_stdout=False)
+    except Exception as e:
+        log.error("Error running ffmpeg on %s: %s", src, e)
+        return False
+    if not res.ok:
+        log.warning("ffmpeg failed to generate preview for %s%s", src,
+                    " (timed out)" if res.timed_out else f": {res.stderr.strip()[-200:]}")
         return False
+    return True
+
+# ─── single-decode preview set (sprite + VTT + posters) ─────────────────────
+@dataclass
+class PreviewSet:
+    sprite:   Path
+    vtt:      Path
+    posters:  Dict[int, Path] = field(default_factory=dict)   # width → file
+    frames:   int = 0
+    interval: float = 0.0
+
+    def poster(self, width: int = 256) -> Path:
+        """The poster closest to *width*."""
+        return self.posters[min(self.posters, key=lambda w: abs(w - width))]
+
+
+def preview_set_paths(out_dir: Path, stem: str) -> PreviewSet:
+    """Where ``generate_preview_set`` writes the files for *stem*."""
+    return PreviewSet(sprite=out_dir / f"{stem}_sprite.jpg",
+                      vtt=out_dir / f"{stem}_sprite.vtt",
+                      posters={w: out_dir / f"{stem}_{w}.jpg" for w in POSTER_SIZES})
+
+
+def _timestamp(t: float) -> str:
+    ms = int(round(t * 1000))
+    return f"{ms // 3_600_000:02d}:{ms // 60_000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+def sprite_vtt(sprite_name: str, frames: int, interval: float,
+               duration: Optional[float] = None, cols: int = SPRITE_COLS,
+               tile: tuple = SPRITE_TILE) -> str:
+    """WebVTT cues mapping each time range to its ``#xywh`` sprite tile."""
+    w, h = tile
+    out = ["WEBVTT", ""]
+    for i in range(frames):
+        start = i * interval
+        end = (i + 1) * interval if i + 1 < frames or duration is None else max(duration, start)
+        out += [f"{_timestamp(start)} --> {_timestamp(end)}",
+                f"{sprite_name}#xywh={i % cols * w},{i // cols * h},{w},{h}", ""]
+    return "\n".join(out)
+
+
+def preview_set_command(ffmpeg: str, src: Path, paths: PreviewSet,
+                        duration: Optional[float], frames: int = SPRITE_FRAMES,
+                        cols: int = SPRITE_COLS, tile: tuple = SPRITE_TILE) -> List[str]:
+    """
+    One ffmpeg invocation: the first video stream is decoded once and
+    ``split`` into the sprite branch (``fps`` → fixed-size tiles → ``tile``)
+    and the poster branch (``trim`` at ``POSTER_AT`` → ``split`` → one
+    ``scale`` per width).  Without a *duration* the sprite branch also
+    logs each sampled frame (``showinfo``; see ``_sprite_frames``).
+    """
+    w, h = tile
+    rows = -(-frames // cols)
+    at = min(POSTER_AT, duration / 2) if duration else POSTER_AT
+    interval = duration / frames if duration else UNKNOWN_INTERVAL
+    sizes = sorted(paths.posters)
+    graph = [
+        "[0:v:0]split=2[s][p]",
+        f"[s]fps=1/{interval:.6f},{'' if duration else 'showinfo,'}"
+        f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,tile={cols}x{rows}[sprite]",
+        f"[p]trim=start={at:.3f},setpts=PTS-STARTPTS,split={len(sizes)}"
+        + "".join(f"[p{i}]" for i in range(len(sizes))),
+    ]
+    graph += [f"[p{i}]scale={size}:-2[o{i}]" for i, size in enumerate(sizes)]
+
+    cmd = [ffmpeg, "-y", "-hide_banner", "-nostats", "-v", "error" if duration else "info"]
+    if SPRITE_KEYFRAMES:
+        cmd += ["-skip_frame", "nokey"]
+    cmd += ["-i", str(src), "-filter_complex", ";".join(graph),
+            "-map", "[sprite]", "-frames:v", "1", "-q:v", "4", str(paths.sprite)]
+    for i, size in enumerate(sizes):
+        cmd += ["-map", f"[o{i}]", "-frames:v", "1", "-q:v", "3", str(paths.posters[size])]
+    return cmd
+
+
+def _probe_duration(src: Path) -> Optional[float]:
+    """Duration from the ``media_tech`` cache / header parser, else ffprobe."""
+    for fast in (True, False):
+        try:
+            probe = probe_cached(src, fast=fast)
+        except Exception as exc:                # unreadable file, closed DB …
+            log.debug("cannot probe %s: %s", src, exc)
+            return None
+        duration = summarize(probe)["duration_s"] if probe else None
+        if duration and duration > 0:
+            return duration
+    return None
+
+
+def _sprite_frames(stderr: str, frames: int) -> int:
+    """
+    Frames the sprite branch really sampled (``tile`` keeps the first
+    *frames*).  The runner keeps only a stderr tail, but that still holds
+    at least *frames* showinfo lines whenever there were that many.
+    """
+    return min(frames, len(_SHOWINFO_FRAME.findall(stderr)))
+
+
+def generate_preview_set(src: Path, out_dir: Path, stem: str,
+                         duration: Optional[float] = None) -> Optional[PreviewSet]:
+    """
+    Sprite sheet, VTT index and posters for the video *src* from a single
+    decode.  *duration* (seconds, e.g. from ``probe_cached``) spreads the
+    ``SPRITE_FRAMES`` evenly; when neither the caller nor a probe knows it,
+    one frame every ``UNKNOWN_INTERVAL`` s is taken and the VTT only indexes
+    the frames ffmpeg actually produced.
+    Returns ``None`` when ffmpeg is missing or fails.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        log.warning("ffmpeg not found in PATH; skipping preview set")
+        return None
+    try:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        log.warning("Cannot create preview directory %s: %s", out_dir, e)
+        return None
+
+    paths = preview_set_paths(out_dir, stem)
+    frames = SPRITE_FRAMES
+    if not (duration and duration > 0):
+        duration = _probe_duration(src)
+    interval = duration / frames if duration else UNKNOWN_INTERVAL
+    cmd = preview_set_command(ffmpeg, src, paths, duration, frames)
+    try:
+        res = runner.run_sync(cmd, tool="ffmpeg", timeout=SPRITE_TIMEOUT,
+                              capture_stdout=False)
     except Exception as e:
         log.error("Error running ffmpeg on %s: %s", src, e)
-        return False
\ No newline at end of file
+        return None
+    if not res.ok or not paths.sprite.exists():
+        log.warning("ffmpeg failed to generate preview set for %s%s", src,
+                    " (timed out)" if res.timed_out else f": {res.stderr.strip()[-200:]}")
+        return None
+
+    paths.posters = {w: p for w, p in paths.posters.items() if p.exists()}
+    if not paths.posters:                       # clip shorter than POSTER_AT …
+        log.warning("no poster frame written for %s", src)
+        return None
+    if duration is None:
+        frames = _sprite_frames(res.stderr, frames)
+    paths.vtt.write_text(sprite_vtt(paths.sprite.name, frames, interval, duration))
+    paths.frames, paths.interval = frames, interval
+    return paths
@@ -1,12 +1,27 @@
 # /video/probe.py
+"""
+ffprobe wrapper.
+
+``probe_media`` runs ffprobe; ``probe_cached`` first looks the file's
+content fingerprint up in the ``media_tech`` table, so moved, renamed or
+re-ingested files are never probed twice, then tries the header-only
+parsers (``video.container`` for MP4/MOV/MKV/WebM, ``video.imagemeta`` for
+photos) before spawning ffprobe.  ``summarize`` flattens a probe result into
+the queryable ``media_tech`` columns.
+"""
 from __future__ import annotations
 from pathlib import Path
-import subprocess, json, shutil, logging
+from typing import Any, Dict, Optional
+import json, shutil, logging
+
+from . import runner
+from .container import parse_header
+from .imagemeta import as_probe, read_image_meta
 
 log = logging.getLogger("video.probe")
 
 def probe_media(path: Path, timeout: int = 10) -> dict | None:
-    """Return ffprobe JSON dict or None on failure (stdlib only)."""
+    """Return ffprobe JSON dict or None on failure (via the shared runner)."""
     if not shutil.which("ffprobe"):
         log.warning("ffprobe not installed – skipping tech-metadata")
         return None
@@ -15,9 +30,119 @@ def probe_media(path: Path, timeout: int = 10) -> dict | None:
         "-show_format", "-show_streams", str(path)
     ]
     try:
-        proc = subprocess.run(cmd, check=True, capture_output=True,
-                              text=True, timeout=timeout)
-        return json.loads(proc.stdout)
+        res = runner.run_sync(cmd, tool="ffprobe", timeout=timeout, check=True)
+        return json.loads(res.stdout)
     except Exception as exc:
         log.error("ffprobe failed on %s: %s", path, exc)
-        return None
\ No newline at end of file
+        return None
+
+# ─── technical-metadata summary ─────────────────────────────────────────────
+def _num(v: Any, cast=float) -> Any:
+    try:
+        return cast(v) if v not in (None, "", "N/A") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate(v: Optional[str]) -> Optional[float]:
+    """'30000/1001' → 29.97"""
+    if not v or "/" not in v:
+        return _num(v)
+    num, den = v.split("/", 1)
+    num, den = _num(num), _num(den)
+    return round(num / den, 3) if num and den else None
+
+
+_EXIF_ROTATION = {3: 180, 4: 180, 5: 90, 6: 90, 7: 270, 8: 270}
+
+
+def _rotation(stream: Dict[str, Any]) -> Optional[int]:
+    rot = (stream.get("tags") or {}).get("rotate")
+    if rot is None:
+        for sd in stream.get("side_data_list") or []:
+            if "rotation" in sd:
+                rot = sd["rotation"]
+                break
+    rot = _num(rot, int)
+    return rot % 360 if rot is not None else None
+
+
+def summarize(probe: Dict[str, Any]) -> Dict[str, Any]:
+    """The ``media_tech`` columns of one ffprobe result."""
+    fmt     = probe.get("format") or {}
+    streams = probe.get("streams") or []
+    video   = next((s for s in streams if s.get("codec_type") == "video"
+                    and not (s.get("disposition") or {}).get("attached_pic")), {})
+    audio   = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    image   = probe.get("image") or {}
+    rotation = (_EXIF_ROTATION.get(image.get("orientation"), 0) if image
+                else _rotation(video) if video else None)
+    return {
+        "container"  : fmt.get("format_name"),
+        "duration_s" : _num(fmt.get("duration")),
+        "bitrate"    : _num(fmt.get("bit_rate"), int),
+        "width"      : _num(video.get("width"), int),
+        "height"     : _num(video.get("height"), int),
+        "vcodec"     : video.get("codec_name"),
+        "vprofile"   : video.get("profile"),
+        "pix_fmt"    : video.get("pix_fmt"),
+        "fps"        : _rate(video.get("avg_frame_rate") or video.get("r_frame_rate")),
+        "rotation"   : rotation,
+        "acodec"     : audio.get("codec_name"),
+        "channels"   : _num(audio.get("channels"), int),
+        "sample_rate": _num(audio.get("sample_rate"), int),
+        "streams"    : len(streams),
+    }
+
+
+def _header_probe(path: Path) -> dict | None:
+    probe = parse_header(path)
+    if probe is None:
+        info = read_image_meta(path)
+        probe = as_probe(info) if info and info.get("width") else None
+    return probe
+
+
+def probe_cached(path: Path, fingerprint: Optional[str] = None,
+                 db: Any = None, timeout: int = 10, fast: bool = True) -> dict | None:
+    """
+    ``probe_media`` through the ``media_tech`` cache.
+
+    *fingerprint* is the file's content id (``files.id``), by default the
+    "quick" digest the scanner uses; *db* defaults to the global
+    ``video.DB`` and may also be a ``unit_of_work()``, which then commits the
+    ``media_tech`` row with its batch.  Failed probes are not cached.
+
+    With *fast* (the default) MP4/MOV/MKV/WebM and image headers are parsed
+    in-process and ffprobe only runs when that fails; results of that path carry
+    ``"source": "header"``.  ``fast=False`` insists on (and caches) a full
+    ffprobe result.
+    """
+    if db is None:
+        try:
+            from video import DB as db          # late import avoids cycles
+        except Exception:
+            db = None
+    if fingerprint is None:
+        from video.fingerprint import fingerprint as _fp
+        try:
+            fingerprint = _fp(path, ("quick",), db=db)["quick"]
+        except OSError:
+            return probe_media(path, timeout)
+
+    if db is not None:
+        try:
+            hit = db.get_media_tech(fingerprint)
+        except Exception as exc:                # old schema, closed DB …
+            log.debug("media_tech lookup failed: %s", exc)
+            hit = None
+        if hit is not None and (fast or hit.get("source") != "header"):
+            return hit
+
+    probe = (_header_probe(path) if fast else None) or probe_media(path, timeout)
+    if probe and db is not None:
+        try:
+            db.put_media_tech(fingerprint, probe, summarize(probe))
+        except Exception as exc:
+            log.debug("media_tech write failed: %s", exc)
+    return probe
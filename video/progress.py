@@ -0,0 +1,149 @@
+# video/progress.py
+"""
+Live job progress – thread-safe fan-out to the event bus, SSE and WebSockets.
+
+    progress.publish(job_id, {"state": "running", "written": 120, …})   # any thread
+    async for p in progress.stream(job_id): …                         # async readers
+    progress.latest(job_id)                                           # last snapshot
+
+Producers (``Scanner.bulk_scan`` via ``Pipeline(on_progress=…)``) publish
+at most once per ``PROGRESS_INTERVAL`` seconds (``VIDEO_PROGRESS_INTERVAL``,
+default 1).  Every update goes to
+
+* async subscribers (``stream`` / ``sse``: ``/jobs/{id}/events``,
+  ``/ws/control``); each gets its own small queue that drops the oldest
+  update when the reader falls behind,
+* the event bus as ``Topic.SCAN_PROGRESS`` – through ``forward_to_bus``,
+  one such subscriber running on the loop that owns the bus (the API
+  starts it), so scan threads never touch the bus connection,
+* the ``latest`` snapshot, which a late subscriber receives first.
+
+A payload whose ``state`` is ``done`` or ``error`` ends a per-job stream.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+log = logging.getLogger("video.progress")
+
+PROGRESS_INTERVAL = float(os.getenv("VIDEO_PROGRESS_INTERVAL", "1.0"))
+KEEP_JOBS   = 64                        # latest snapshots remembered
+SUB_QUEUE   = 32                        # updates buffered per subscriber
+SSE_PING    = 15.0                      # keep-alive comment interval
+FINAL       = {"done", "error"}
+
+_Sub = Tuple[Optional[str], asyncio.AbstractEventLoop, asyncio.Queue]
+
+
+def _offer(q: asyncio.Queue, payload: Dict[str, Any]) -> None:
+    """Runs on the subscriber's loop: newest wins when the queue is full."""
+    if q.full():
+        try:
+            q.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    q.put_nowait(payload)
+
+
+class ProgressHub:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latest: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._subs: List[_Sub] = []
+
+    # -- producers -----------------------------------------------------------
+    def publish(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {**payload, "job_id": job_id, "ts": time.time()}
+        with self._lock:
+            self._latest.pop(job_id, None)
+            self._latest[job_id] = payload
+            while len(self._latest) > KEEP_JOBS:
+                self._latest.popitem(last=False)
+            subs = list(self._subs)
+        for want, loop, q in subs:
+            if want is None or want == job_id:
+                try:
+                    loop.call_soon_threadsafe(_offer, q, payload)
+                except RuntimeError:            # subscriber's loop is gone
+                    self._drop((want, loop, q))
+        return payload
+
+    # -- readers -------------------------------------------------------------
+    def latest(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._latest.get(job_id)
+
+    def _subscribe(self, job_id: Optional[str]) -> _Sub:
+        sub = (job_id, asyncio.get_running_loop(), asyncio.Queue(maxsize=SUB_QUEUE))
+        with self._lock:
+            self._subs.append(sub)
+            last = self._latest.get(job_id) if job_id else None
+        if last is not None:
+            sub[2].put_nowait(last)
+        return sub
+
+    def _drop(self, sub: _Sub) -> None:
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    async def stream(self, job_id: Optional[str] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Updates for *job_id* (every job when ``None``) until it finishes.
+        With *timeout*, yields ``None`` after that many idle seconds.
+        """
+        sub = self._subscribe(job_id)
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(sub[2].get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield payload
+                if job_id is not None and payload.get("state") in FINAL:
+                    return
+        finally:
+            self._drop(sub)
+
+    async def forward_to_bus(self, bus: Any = None) -> None:
+        """
+        Relay every update to the event bus (default ``get_bus()``) as
+        ``Topic.SCAN_PROGRESS``.  Run it as a task on the loop the bus
+        lives on; a slow bus only loses intermediate snapshots.
+        """
+        from video.core.event.types import Event, Topic
+        if bus is None:
+            from video.core.event import get_bus
+            bus = get_bus()
+            if bus is None:
+                return
+        async for payload in self.stream():
+            try:
+                await bus.publish(Event(topic=Topic.SCAN_PROGRESS, payload=payload))
+            except Exception as exc:            # noqa: BLE001
+                log.warning("progress → event bus failed: %s", exc)
+
+    async def sse(self, job_id: str) -> AsyncIterator[str]:
+        """``text/event-stream`` frames for one job, with keep-alive comments."""
+        async for payload in self.stream(job_id, timeout=SSE_PING):
+            if payload is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: progress\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+HUB = ProgressHub()
+publish = HUB.publish
+latest  = HUB.latest
+stream  = HUB.stream
+sse     = HUB.sse
+forward_to_bus = HUB.forward_to_bus
@@ -0,0 +1,202 @@
+# video/runner.py
+"""
+Shared, concurrency-limited subprocess runner for ffmpeg / ffprobe.
+
+    res = await runner.run(["ffprobe", …], timeout=10)      # from async code
+    res = runner.run_sync(["ffmpeg", …], check=True)        # from threads
+
+Every child runs on one private event loop ("video-proc" thread), behind a
+global semaphore (``VIDEO_MAX_PROCS``, default = CPUs) and a per-tool one
+(``VIDEO_PROC_LIMITS``, e.g. ``ffmpeg=2,ffprobe=8``).  However many scanner
+workers, executor threads and async routes ask at once, no more than that
+many processes are alive.
+
+Children start in their own session; a timeout or a cancelled caller kills
+the whole process group (ffmpeg's helpers included).  The last
+``STDERR_TAIL`` bytes of stderr are kept on the result for error reports.
+``check=True`` mirrors ``subprocess.run``: ``ProcError`` (a
+``CalledProcessError``) on a non-zero exit, ``TimeoutExpired`` on timeout.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+log = logging.getLogger("video.runner")
+
+_CPUS = os.cpu_count() or 2
+
+
+def _limits(text: str) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        tool, _, n = part.partition("=")
+        out[tool.strip()] = max(1, int(n))
+    return out
+
+
+MAX_PROCS   = int(os.getenv("VIDEO_MAX_PROCS", str(_CPUS)))
+TOOL_LIMITS = {"ffprobe": _CPUS, "ffmpeg": max(1, _CPUS // 2),
+               **_limits(os.getenv("VIDEO_PROC_LIMITS", ""))}
+STDERR_TAIL = 16 * 1024
+
+
+@dataclass
+class ProcResult:
+    args:       List[str]
+    returncode: Optional[int]
+    stdout:     bytes
+    stderr:     str
+    elapsed_s:  float
+    timed_out:  bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+
+class ProcError(subprocess.CalledProcessError):
+    """Non-zero exit under ``check=True``; ``stderr`` holds the captured tail."""
+
+    def __str__(self) -> str:
+        tail = (self.stderr or "").strip().splitlines()[-3:]
+        return super().__str__() + (" – " + " | ".join(tail) if tail else "")
+
+
+class _Runner:
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._global: Optional[asyncio.Semaphore] = None
+        self._tools: Dict[str, asyncio.Semaphore] = {}
+        self.running: Dict[str, int] = {}
+        self.waiting = 0
+
+    # -- loop ----------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True,
+                                 name="video-proc").start()
+                self._loop = loop
+            return self._loop
+
+    def _sem(self, tool: str) -> asyncio.Semaphore:
+        # only ever touched on the runner loop, so no locking needed
+        if self._global is None:
+            self._global = asyncio.Semaphore(MAX_PROCS)
+        if tool not in self._tools:
+            self._tools[tool] = asyncio.Semaphore(TOOL_LIMITS.get(tool, MAX_PROCS))
+        return self._tools[tool]
+
+    # -- execution (runner loop) ---------------------------------------------
+    async def _exec(self, args: List[str], tool: str, timeout: Optional[float],
+                    stdin: Optional[bytes], capture_stdout: bool) -> ProcResult:
+        tool_sem = self._sem(tool)
+        self.waiting += 1
+        try:
+            await tool_sem.acquire()
+            try:
+                await self._global.acquire()
+            except BaseException:
+                tool_sem.release()
+                raise
+        finally:
+            self.waiting -= 1
+
+        self.running[tool] = self.running.get(tool, 0) + 1
+        t0 = time.monotonic()
+        proc = None
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                start_new_session=True)
+            try:
+                out, err = await asyncio.wait_for(proc.communicate(stdin), timeout)
+                timed_out = False
+            except asyncio.TimeoutError:
+                self._kill(proc)
+                await proc.wait()
+                out, err, timed_out = b"", b"", True
+            return ProcResult(list(args), proc.returncode, out or b"",
+                              (err or b"")[-STDERR_TAIL:].decode(errors="replace"),
+                              round(time.monotonic() - t0, 3), timed_out)
+        except asyncio.CancelledError:
+            if proc is not None and proc.returncode is None:
+                self._kill(proc)
+                await asyncio.shield(proc.wait())
+            raise
+        finally:
+            self.running[tool] -= 1
+            self._global.release()
+            tool_sem.release()
+
+    @staticmethod
+    def _kill(proc: asyncio.subprocess.Process) -> None:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    # -- public --------------------------------------------------------------
+    async def run(self, args: Sequence[Any], *, tool: Optional[str] = None,
+                  timeout: Optional[float] = None, check: bool = False,
+                  stdin: Optional[bytes] = None,
+                  capture_stdout: bool = True) -> ProcResult:
+        """Run *args* on the shared runner; awaitable from any event loop."""
+        args = [str(a) for a in args]
+        tool = tool or Path(args[0]).name
+        loop = self._ensure_loop()
+        coro = self._exec(args, tool, timeout, stdin, capture_stdout)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            res = await coro
+        else:
+            res = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+        return _checked(res, timeout) if check else res
+
+    def run_sync(self, args: Sequence[Any], **kw: Any) -> ProcResult:
+        """Blocking variant for worker threads (never call it on an event loop)."""
+        check = kw.pop("check", False)
+        args = [str(a) for a in args]
+        kw.setdefault("tool", Path(args[0]).name)
+        fut = asyncio.run_coroutine_threadsafe(
+            self._exec(args, kw["tool"], kw.get("timeout"), kw.get("stdin"),
+                       kw.get("capture_stdout", True)),
+            self._ensure_loop())
+        res = fut.result()
+        return _checked(res, kw.get("timeout")) if check else res
+
+    def stats(self) -> Dict[str, Any]:
+        return {"max_procs": MAX_PROCS, "limits": dict(TOOL_LIMITS),
+                "running": {t: n for t, n in self.running.items() if n},
+                "waiting": self.waiting}
+
+
+def _checked(res: ProcResult, timeout: Optional[float]) -> ProcResult:
+    if res.timed_out:
+        raise subprocess.TimeoutExpired(res.args, timeout, res.stdout, res.stderr)
+    if res.returncode != 0:
+        raise ProcError(res.returncode, res.args, res.stdout, res.stderr)
+    return res
+
+
+_RUNNER = _Runner()
+run      = _RUNNER.run
+run_sync = _RUNNER.run_sync
+stats    = _RUNNER.stats
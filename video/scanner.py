@@ -1,23 +1,30 @@
 # video/scanner.py
 """File scanning and indexing module - pure stdlib"""
-from . import config
+from . import config, iosched
 from .config import MEDIA_ROOT, INCOMING_DIR
-from .probe   import probe_media
-from .preview import generate_preview
+from .probe   import probe_cached, summarize
+from .preview import generate_preview, generate_preview_set
+from .pipeline import Pipeline, Stage
+from .fingerprint import digest, fingerprint
+from .imagemeta import image_dimensions
+from .progress import PROGRESS_INTERVAL
 
 import hashlib
 import mimetypes
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Generator, Optional, Set, Dict, Any
+from dataclasses import dataclass, field
+from typing import Callable, Generator, Iterator, List, Optional, Set, Dict, Any, Tuple
 # from weakref import WeakValueDictionary
 
 # Try to import media detection modules (stdlib only)
 try:
-    import imghdr
     import wave
     import aifc
     try:
@@ -25,14 +32,7 @@ try:
     except ImportError:
         sndhdr = None  # Not available in Python 3.13+
 except ImportError:
-    imghdr = wave = aifc = sndhdr = None
-
-log = logging.getLogger("video.scanner")
-
-import os
-from pathlib import Path
-import logging
-from typing import Generator
+    wave = aifc = sndhdr = None
 
 log = logging.getLogger("video.scanner")
 
@@ -54,47 +54,209 @@ def safe_mkdir(path: Path, logger=None) -> bool:
             print(f"ERROR: Error creating directory {path}: {e}")
         return False
 
-def safe_iter_files(root: Path) -> Generator[Path, None, None]:
+SKIP_DIRS = {"$RECYCLE.BIN", "System Volume Information", ".Trash-1000"}
+
+
+MTIME_SLACK = float(os.getenv("VIDEO_SCAN_MTIME_SLACK", "2"))   # coarse-mtime FS (FAT, SMB)
+CACHE_SIZE  = int(os.getenv("VIDEO_SCAN_CACHE_SIZE", "1024"))   # recent process_file rows
+
+
+class ScanJournal:
     """
-    Recursively yield all files under `root`, but:
-     • Skip unreadable dirs (PermissionError)
-     • Ignore common trash folders
+    Directory mtimes from the previous scan (``scan_dirs`` table).
+
+    A directory's mtime moves whenever an entry is added, removed or renamed
+    in it, so a directory whose ``mtime_ns`` is unchanged is not listed
+    again: the walk only stats it and descends into the sub-directories the
+    journal already knows.  A rescan of an idle tree costs one ``stat`` per
+    directory instead of a ``scandir`` plus a ``stat`` per file.
+
+    Files rewritten *in place* don't touch their directory's mtime – use
+    ``full=True`` (``video scan --full``) to list everything again.
     """
-    SKIP_DIRS = {"$RECYCLE.BIN", "System Volume Information", ".Trash-1000"}
-    stack = [root]
 
-    while stack:
-        current = stack.pop()
+    def __init__(self, db, root: Path, full: bool = False) -> None:
+        self.db   = db
+        self.full = full
+        self.known: Dict[str, Any] = {} if full else db.scan_dirs_under(root.as_posix())
+        self.children: Dict[str, List[str]] = {}
+        for p in self.known:
+            self.children.setdefault(os.path.dirname(p), []).append(p)
+        self.listed: Dict[str, Tuple[int, int, float]] = {}
+        self.failed: Set[str] = set()
+        self.vanished: List[str] = []
+        self.skipped = 0
+
+    def unchanged(self, directory: Path, st: os.stat_result) -> bool:
+        row = self.known.get(directory.as_posix())
+        if row is None or row["mtime_ns"] != st.st_mtime_ns:
+            return False
+        # an mtime too close to the last listing may hide a same-tick change
+        return row["last_scanned"] - st.st_mtime_ns / 1e9 > MTIME_SLACK
+
+    def known_subdirs(self, directory: Path) -> List[Path]:
+        return [Path(p) for p in self.children.get(directory.as_posix(), ())]
+
+    def record(self, directory: Path, st: os.stat_result, entry_count: int,
+               listed_at: float) -> None:
+        self.listed[directory.as_posix()] = (st.st_mtime_ns, entry_count, listed_at)
+
+    def fail(self, directory: Path) -> None:
+        """Have *directory* listed again next time (e.g. a file in it failed)."""
+        self.failed.add(directory.as_posix())
+
+    def gone(self, directory: Path) -> None:
+        if directory.as_posix() in self.known:
+            self.vanished.append(directory.as_posix())
+
+    def commit(self) -> None:
+        """Persist what this walk listed; failed directories keep mtime -1."""
+        rows = [(p, -1 if p in self.failed else m, n, t)
+                for p, (m, n, t) in self.listed.items()]
+        rows += [(p, -1, 0, 0.0) for p in self.failed if p not in self.listed]
+        self.db.forget_scan_dirs(self.vanished)
+        self.db.record_scan_dirs(rows)
+
+
+def _list_dir(current: Path, journal: Optional[ScanJournal]) -> tuple:
+    """
+    One directory of ``walk_dirs``: ``(state, dir, stat, files, subdirs,
+    listed_at)`` with state ``"gone"``, ``"unchanged"``, ``"denied"`` or
+    ``"listed"``.  Only reads the journal, so it can run on any thread.
+    """
+    dst = None
+    if journal is not None:
         try:
-            # Use os.scandir for finer-grained control
-            with os.scandir(current) as it:
-                for entry in it:
-                    name = entry.name
-                    if name in SKIP_DIRS:
-                        continue
+            dst = os.stat(current)
+        except OSError:
+            return "gone", current, None, [], set(), 0.0
+        if journal.unchanged(current, dst):
+            return "unchanged", current, dst, [], set(), 0.0
+    listed_at = time.time()
 
-                    # Is it a directory?
-                    try:
-                        if entry.is_dir(follow_symlinks=False):
-                            stack.append(Path(entry.path))
-                            continue
-                    except PermissionError:
-                        log.warning("🔒 cannot access dir: %s", entry.path)
-                        continue
+    files: List[os.DirEntry] = []
+    subdirs: Set[str] = set()
+    try:
+        # Use os.scandir for finer-grained control
+        with os.scandir(current) as it:
+            for entry in it:
+                name = entry.name
+                if name in SKIP_DIRS:
+                    continue
 
-                    # Is it a file?
-                    try:
-                        if entry.is_file(follow_symlinks=False):
-                            yield Path(entry.path)
-                    except PermissionError:
-                        log.warning("🔒 cannot access file: %s", entry.path)
+                # Is it a directory?
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.add(name)
                         continue
+                except PermissionError:
+                    log.warning("🔒 cannot access dir: %s", entry.path)
+                    continue
+                except OSError:
+                    continue                    # entry vanished mid-listing
+
+                # Is it a file?
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        files.append(entry)
+                except PermissionError:
+                    log.warning("🔒 cannot access file: %s", entry.path)
+                    continue
+                except OSError:
+                    continue
+
+    except PermissionError:
+        log.warning("🔒 cannot scan directory: %s", current)
+        return "denied", current, dst, [], set(), listed_at
+    except (FileNotFoundError, NotADirectoryError):
+        return "gone", current, dst, [], set(), 0.0
+    return "listed", current, dst, files, subdirs, listed_at
+
+
+def walk_dirs(root: Path, journal: Optional[ScanJournal] = None, workers: int = 1
+              ) -> Generator[Tuple[Path, List[os.DirEntry], Set[str]], None, None]:
+    """
+    Yield ``(directory, file entries, sub-directory names)`` once per
+    directory under `root` – one ``os.scandir`` each – but:
+     • Skip unreadable dirs (PermissionError) and ones that vanish mid-walk
+     • Ignore common trash folders
+     • With a *journal*, don't list directories it reports unchanged
+
+    With *workers* > 1 that many directories are listed – and their files
+    stat'ed – concurrently (see ``iosched.IOLimits.list``); results, and
+    all journal updates, still arrive on the caller's thread.  Order is
+    then not depth-first.
+    """
+    stack = [root]
+
+    def _apply(result) -> Optional[Tuple[Path, List[os.DirEntry], Set[str]]]:
+        state, current, dst, files, subdirs, listed_at = result
+        if state == "gone":
+            if journal is not None:
+                journal.gone(current)
+        elif state == "unchanged":
+            journal.skipped += 1
+            stack.extend(journal.known_subdirs(current))
+        elif state == "denied":
+            if journal is not None:
+                journal.fail(current)
+        else:
+            stack.extend(current / name for name in subdirs)
+            if journal is not None:
+                journal.record(current, dst, len(files) + len(subdirs), listed_at)
+                for sub in journal.known_subdirs(current):
+                    if sub.name not in subdirs:
+                        journal.gone(sub)
+            return current, files, subdirs
+        return None
+
+    if workers <= 1:
+        while stack:
+            out = _apply(_list_dir(stack.pop(), journal))
+            if out is not None:
+                yield out
+        return
+
+    def _list_and_stat(current: Path) -> tuple:
+        result = _list_dir(current, journal)
+        for entry in result[3]:                 # DirEntry caches it for diff_directory
+            try:
+                entry.stat(follow_symlinks=False)
+            except OSError:
+                pass                            # reported where it's used
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan-walk")
+    pending: Set[Future] = set()
+    try:
+        while stack or pending:
+            while stack and len(pending) < workers:
+                pending.add(pool.submit(_list_and_stat, stack.pop()))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                out = _apply(fut.result())
+                if out is not None:
+                    yield out
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def safe_iter_files(root: Path) -> Generator[Path, None, None]:
+    """Recursively yield all files under `root` (see ``walk_dirs``)."""
+    for _, files, _ in walk_dirs(root):
+        for entry in files:
+            yield Path(entry.path)
+
+
+@dataclass
+class DirDiff:
+    """What a rescan of one directory found, relative to the DB."""
+    directory: Path
+    changed:   List[Tuple[Path, os.stat_result]] = field(default_factory=list)
+    removed:   List[str] = field(default_factory=list)
+    unchanged: int = 0
+
 
-        except PermissionError:
-            log.warning("🔒 cannot scan directory: %s", current)
-            continue
-            
-            
 class Scanner:
     """File scanner for media indexing"""
     
@@ -109,8 +271,8 @@ class Scanner:
         # Use root_path if provided, else MEDIA_ROOT (do NOT force /_INCOMING)
         self.root_path: Path = Path(root_path) if root_path else MEDIA_ROOT
 
-        # Use normal dict for cache (WeakValueDictionary can't hold dicts)
-        self.cache = dict()
+        # Recently indexed rows, LRU-bounded so long watch sessions stay flat
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
         self.logger = logging.getLogger("media_scanner")
         if not self.logger.handlers:
             h = logging.StreamHandler()
@@ -123,218 +285,237 @@ class Scanner:
         ext = path.suffix.lower()
         return ext in (self.VIDEO_EXTS | self.IMAGE_EXTS | self.AUDIO_EXTS)
     
-    def quick_hash(self, path: Path, block_size: int = 1024 * 1024) -> str:
-        """Compute quick hash using first and last blocks (like your video_cache.py)"""
+    def quick_hash(self, path: Path, block_size: int = 1024 * 1024,
+                   st: Optional[os.stat_result] = None, db: Any = None) -> str:
+        """
+        SHA1 of the first and last blocks (``fingerprint`` "quick" digest).
+        *db* may be a unit of work, so the digest cache row rides its batch.
+        """
+        db = db if db is not None else self.db
         try:
-            h = hashlib.sha1()
-            with path.open("rb") as f:
-                # Read first block
-                head = f.read(block_size)
-                if len(head) < block_size:
-                    # Small file, hash entirely
-                    h.update(head)
-                    return h.hexdigest()
-                
-                # Read last block
-                f.seek(-block_size, os.SEEK_END)
-                tail = f.read(block_size)
-                
-                h.update(head)
-                h.update(tail)
-                
-            return h.hexdigest()
+            return fingerprint(path, ("quick",), st=st, db=db,
+                               quick_block=block_size)["quick"]
         except (OSError, IOError) as e:
             self.logger.warning(f"Could not hash {path}: {e}")
             return hashlib.sha1(str(path).encode()).hexdigest()  # Fallback
     
-    def full_hash(self, path: Path) -> str:
-        """Compute full SHA1 hash of file"""
+    def full_hash(self, path: Path, st: Optional[os.stat_result] = None,
+                  db: Any = None) -> str:
+        """Compute full SHA1 hash of file (one pass shared with other digests)"""
+        db = db if db is not None else self.db
         try:
-            h = hashlib.sha1()
-            with path.open("rb") as f:
-                while chunk := f.read(8192):
-                    h.update(chunk)
-            return h.hexdigest()
+            return digest(path, "sha1", st=st, db=db)
         except (OSError, IOError) as e:
             self.logger.warning(f"Could not hash {path}: {e}")
             return hashlib.sha1(str(path).encode()).hexdigest()  # Fallback
     
     def detect_image_dimensions(self, path: Path) -> tuple[Optional[int], Optional[int]]:
-        """Detect image dimensions using stdlib only"""
-        if not imghdr:
-            return None, None
-            
+        """Detect image dimensions from the file header (stdlib only, every IMAGE_EXTS)"""
         try:
-            img_type = imghdr.what(path)
-            if not img_type:
-                return None, None
-            
-            # Basic dimension detection for common formats
-            with path.open('rb') as f:
-                if img_type == 'jpeg':
-                    return self._jpeg_dimensions(f)
-                elif img_type == 'png':
-                    return self._png_dimensions(f)
-                elif img_type == 'gif':
-                    return self._gif_dimensions(f)
+            return image_dimensions(path)
         except Exception as e:
             self.logger.debug(f"Could not get dimensions for {path}: {e}")
-        
         return None, None
-    
-    def _jpeg_dimensions(self, f):
-        """Extract JPEG dimensions"""
-        f.seek(0)
-        if f.read(2) != b'\xff\xd8':
-            return None, None
-        
-        while True:
-            marker = f.read(2)
-            if not marker or marker[0] != 0xff:
-                break
-            
-            if marker[1] in (0xc0, 0xc1, 0xc2):  # SOF markers
-                f.read(3)  # Skip length and precision
-                height = int.from_bytes(f.read(2), 'big')
-                width = int.from_bytes(f.read(2), 'big')
-                return width, height
-            
-            # Skip segment
-            length = int.from_bytes(f.read(2), 'big')
-            f.seek(length - 2, 1)
-        
-        return None, None
-    
-    def _png_dimensions(self, f):
-        """Extract PNG dimensions"""
-        f.seek(0)
-        if f.read(8) != b'\x89PNG\r\n\x1a\n':
-            return None, None
-        
-        # Read IHDR chunk
-        f.read(4)  # Chunk length
-        if f.read(4) != b'IHDR':
-            return None, None
-        
-        width = int.from_bytes(f.read(4), 'big')
-        height = int.from_bytes(f.read(4), 'big')
-        return width, height
-    
-    def _gif_dimensions(self, f):
-        """Extract GIF dimensions"""
-        f.seek(0)
-        header = f.read(6)
-        if header not in (b'GIF87a', b'GIF89a'):
-            return None, None
-        
-        width = int.from_bytes(f.read(2), 'little')
-        height = int.from_bytes(f.read(2), 'little')
-        return width, height
-    
+
     # ───────────────────────── Integration Point ───────────────────────── #
     # Tech-metadata (duration_s, codec, resolution)
     # Call probe_media() ▸ merge returned dict into metadata
     # ...
     
-    def analyze_file(self, path: Path, use_full_hash: bool = False) -> Dict[str, Any]:
-        """Analyze a single file and return metadata"""
+    def analyze_file(self, path: Path, use_full_hash: bool = False,
+                     db: Any = None) -> Dict[str, Any]:
+        """Analyze a single file and return metadata (*db*: see ``quick_hash``)"""
         try:
-            stat = path.stat()
-
-            # Use full hash or quick hash
-            file_hash = self.full_hash(path) if use_full_hash else self.quick_hash(path)
-
-            # Guess MIME type
-            mime_type, _ = mimetypes.guess_type(path.name)
-            if not mime_type:
-                ext = path.suffix.lower()
-                if ext in self.VIDEO_EXTS:
-                    mime_type = f"video/{ext[1:]}"
-                elif ext in self.IMAGE_EXTS:
-                    mime_type = f"image/{ext[1:]}"
-                elif ext in self.AUDIO_EXTS:
-                    mime_type = f"audio/{ext[1:]}"
-                else:
-                    mime_type = "application/octet-stream"
-
-            # Get dimensions for images
-            width, height = None, None
-            if mime_type and mime_type.startswith('image/'):
-                width, height = self.detect_image_dimensions(path)
-
-            # ---- ffprobe/tech metadata ----
-            extras = probe_media(path) or {}
-            if extras:
-                meta_stream  = extras.get("streams", [{}])[0]
-                duration     = extras["format"].get("duration")
-                duration_s   = float(duration) if duration else None
-                codec        = meta_stream.get("codec_name")
-                width        = meta_stream.get("width")  or width
-                height       = meta_stream.get("height") or height
-            else:
-                duration_s = None
-                codec      = None
-
-            # ---- preview thumb ----
-            prev_root = config.get_preview_root()
-            prev_root.mkdir(parents=True, exist_ok=True)   # ← simple, atomic, robust!
-            preview_jpg = prev_root / f"{file_hash}.jpg"
-            preview_path = None
-            try:
-                if generate_preview(path, preview_jpg):
-                    preview_path = preview_jpg.as_posix()
-            except PermissionError as e:
-                self.logger.warning(f"🔒 Cannot create preview for {path}: {e}")
-                preview_path = None
-                
-            # Determine batch from parent directory
-            batch = path.parent.name if path.parent.name != "_INCOMING" else None
-
-            return {
-                'id': file_hash,
-                'path': path.as_posix(),
-                'size_bytes': stat.st_size,
-                'mtime': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                'mime': mime_type,
-                'width_px': width,
-                'height_px': height,
-                'duration_s': duration_s,
-                'batch': batch,
-                'sha1': file_hash,
-                'created_at': datetime.now().isoformat(),
-                'codec': codec,
-                'preview_path': preview_path
-            }
+            metadata = self._basic_metadata(path, use_full_hash=use_full_hash, db=db)
+            self._probe_into(metadata, db=db)
+            self._preview_into(metadata)
+            return metadata
 
         except Exception as e:
             self.logger.error(f"Error analyzing {path}: {e}")
             return None
-            
-    def process_file(self, path: Path) -> bool:
-        """Process a single file"""
+
+    # The three steps of analyze_file(), also run as separate bulk_scan stages
+
+    def _basic_metadata(self, path: Path, st: Optional[os.stat_result] = None,
+                        use_full_hash: bool = False, db: Any = None) -> Dict[str, Any]:
+        """stat + hash + MIME + image dimensions (no ffprobe, no preview)"""
+        stat = st or path.stat()
+
+        # Use full hash or quick hash
+        file_hash = (self.full_hash(path, stat, db=db) if use_full_hash
+                     else self.quick_hash(path, st=stat, db=db))
+
+        # Guess MIME type
+        mime_type, _ = mimetypes.guess_type(path.name)
+        if not mime_type:
+            ext = path.suffix.lower()
+            if ext in self.VIDEO_EXTS:
+                mime_type = f"video/{ext[1:]}"
+            elif ext in self.IMAGE_EXTS:
+                mime_type = f"image/{ext[1:]}"
+            elif ext in self.AUDIO_EXTS:
+                mime_type = f"audio/{ext[1:]}"
+            else:
+                mime_type = "application/octet-stream"
+
+        # Get dimensions for images
+        width, height = None, None
+        if mime_type and mime_type.startswith('image/'):
+            width, height = self.detect_image_dimensions(path)
+
+        # Determine batch from parent directory
+        batch = path.parent.name if path.parent.name != "_INCOMING" else None
+
+        return {
+            'id': file_hash,
+            'path': path.as_posix(),
+            'size_bytes': stat.st_size,
+            'mtime': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'mime': mime_type,
+            'width_px': width,
+            'height_px': height,
+            'duration_s': None,
+            'batch': batch,
+            'sha1': file_hash,
+            'created_at': datetime.now().isoformat(),
+            'codec': None,
+            'preview_path': None
+        }
+
+    def _probe_into(self, metadata: Dict[str, Any], db: Any = None) -> Dict[str, Any]:
+        """
+        Merge ffprobe/tech metadata (duration_s, codec, resolution); *db* may
+        be a unit of work that carries the ``media_tech`` row.
+        """
+        db = db if db is not None else self.db
+        extras = probe_cached(Path(metadata['path']), metadata['id'], db=db) or {}
+        if extras:
+            tech = summarize(extras)
+            metadata['duration_s'] = tech['duration_s']
+            metadata['codec']      = tech['vcodec'] or tech['acodec']
+            metadata['width_px']   = tech['width']  or metadata['width_px']
+            metadata['height_px']  = tech['height'] or metadata['height_px']
+        return metadata
+
+    def _preview_into(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate the preview thumb and record its path.  Videos get the
+        single-decode set (sprite + VTT + posters); ``preview_path`` is then
+        the 256-wide poster.  Anything else, or a failed set, gets one frame.
+        """
+        path = Path(metadata['path'])
+        prev_root = config.get_preview_root()
+        prev_root.mkdir(parents=True, exist_ok=True)   # ← simple, atomic, robust!
+        preview_jpg = prev_root / f"{metadata['id']}.jpg"
+        try:
+            if (metadata.get('mime') or '').startswith('video/'):
+                pset = generate_preview_set(path, prev_root, metadata['id'],
+                                            duration=metadata.get('duration_s'))
+                if pset is not None:
+                    metadata['preview_path'] = pset.poster(256).as_posix()
+                    return metadata
+            if generate_preview(path, preview_jpg):
+                metadata['preview_path'] = preview_jpg.as_posix()
+        except PermissionError as e:
+            self.logger.warning(f"🔒 Cannot create preview for {path}: {e}")
+        return metadata
+
+    def _unchanged(self, path: Path, stat: os.stat_result) -> bool:
+        """True if the indexed row for *path* still matches its size + mtime"""
+        existing = self.db.get_file_by_path(path.as_posix())
+        if not existing:
+            return False
+        existing_mtime = datetime.fromisoformat(existing['mtime']).timestamp()
+        return (abs(existing_mtime - stat.st_mtime) < 1 and
+                existing['size_bytes'] == stat.st_size)
+
+    # ─── directory-level change detection ───────────────────────────────
+
+    def diff_directory(self, directory: Path, files: List[os.DirEntry],
+                       subdirs: Set[str]) -> DirDiff:
+        """
+        Compare one directory listing against the DB in memory: a single
+        query (``folder_snapshot``) returns the directory's file rows and
+        its indexed sub-folders, instead of a lookup per file.  Only a
+        sub-directory that vanished costs one more query, for the paths
+        indexed below it.
+
+        ``changed`` holds new or modified media files (with their stat);
+        ``removed`` lists indexed paths that are gone, including everything
+        under sub-directories that no longer exist.
+        """
+        diff  = DirDiff(directory)
+        known, known_subs = self.db.folder_snapshot(directory.as_posix())
+        for entry in files:
+            prev = known.pop(entry.name, None)
+            if not self.is_media_file(Path(entry.name)):
+                continue
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError as e:
+                self.logger.warning(f"Could not stat {entry.path}: {e}")
+                continue
+            if prev and abs(prev[0] - st.st_mtime) < 1 and prev[1] == st.st_size:
+                diff.unchanged += 1
+            else:
+                diff.changed.append((Path(entry.path), st))
+
+        diff.removed = [(directory / name).as_posix() for name in known]
+        for name, sub in known_subs.items():
+            if name not in subdirs:
+                diff.removed += self.db.paths_under(sub)
+        return diff
+
+    def iter_changes(self, root: Path,
+                     on_diff: Optional[Callable[[DirDiff], None]] = None,
+                     journal: Optional[ScanJournal] = None,
+                     walkers: int = 1) -> Iterator[Tuple[Path, os.stat_result]]:
+        """
+        Yield ``(path, stat)`` for new/changed media files under *root*;
+        with a *journal*, directories it reports unchanged are not listed.
+        *walkers* directories are listed concurrently.
+        """
+        for directory, files, subdirs in walk_dirs(root, journal, walkers):
+            diff = self.diff_directory(directory, files, subdirs)
+            if on_diff:
+                on_diff(diff)
+            yield from diff.changed
+
+    def process_file(self, path: Path, uow=None, check_unchanged: bool = True) -> bool:
+        """
+        Process a single file.
+
+        With *uow* (a ``MediaDB.unit_of_work()``) the row is queued for a
+        batched write instead of being committed on its own.  Callers that
+        already diffed the directory pass ``check_unchanged=False``.
+        """
         if not path.is_file() or not self.is_media_file(path):
             return False
         
         # Check if file changed since last scan
-        existing = self.db.get_file_by_path(path.as_posix())
-        if existing:
-            stat = path.stat()
-            existing_mtime = datetime.fromisoformat(existing['mtime']).timestamp()
-            if (abs(existing_mtime - stat.st_mtime) < 1 and 
-                existing['size_bytes'] == stat.st_size):
-                # File unchanged
-                return False
+        if check_unchanged and self._unchanged(path, path.stat()):
+            return False
         
         # Analyze file
-        metadata = self.analyze_file(path)
+        metadata = self.analyze_file(path, db=uow)
         if metadata:
-            self.db.upsert_file(metadata)
-            self.cache[metadata['id']] = metadata
+            if uow is not None:
+                uow.upsert(metadata)
+            else:
+                self.db.upsert_file(metadata)
+            self._remember(metadata)
             self.logger.info(f"Indexed: {path.name}")
             return True
         
         return False
     
+    def _remember(self, metadata: Dict[str, Any]) -> None:
+        self.cache.pop(metadata['id'], None)
+        self.cache[metadata['id']] = metadata
+        while len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+
     def scan_directory(self, directory: Path) -> int:
         """Scan a single directory"""
         if not directory.exists() or not directory.is_dir():
@@ -343,50 +524,175 @@ class Scanner:
         
         processed = 0
         try:
-            for path in safe_iter_files(directory):
-                if self.process_file(path):
-                    processed += 1
+            with self.db.unit_of_work() as uow:
+                for path, _ in self.iter_changes(directory):
+                    if self.process_file(path, uow, check_unchanged=False):
+                        processed += 1
         except Exception as e:
             self.logger.error(f"Error scanning {directory}: {e}")
         
         return processed
     
-    def bulk_scan(self, root_path: Optional[Path] = None, workers: int = 0) -> Dict[str, int]:
-        """Scan files in parallel"""
+    def bulk_scan(self, root_path: Optional[Path] = None, workers: int = 0,
+                  stage_workers: Optional[Dict[str, int]] = None,
+                  on_removed: Optional[Callable[[List[str]], None]] = None,
+                  full: bool = False,
+                  on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+                  ) -> Dict[str, Any]:
+        """
+        Scan files through a streaming pipeline:
+
+            walk ─▶ hash ─▶ probe ─▶ preview ─▶ write
+
+        Each stage has its own worker threads and a bounded input queue, so
+        indexing starts with the first file found and memory stays flat for
+        any tree size.  *workers* sets the hash/probe/preview pool size
+        (default 2 × CPUs); *stage_workers* overrides it per stage, e.g.
+        ``{"probe": 2, "preview": 1}``.  The write stage batches rows through
+        one ``unit_of_work`` and always runs single-threaded.
+
+        The walk is diff-based (``diff_directory``): unchanged files never
+        reach the hash stage.  Indexed files that disappeared are passed to
+        *on_removed* per directory and counted in the result; they are not
+        deleted here.
+
+        Directories whose mtime hasn't moved since the last scan are not
+        listed at all (``ScanJournal``); *full* lists every directory again.
+
+        The root's device budget (``iosched.limits_for``) sets how many
+        directories are listed at once, and hash/probe reads hold one of its
+        ``read`` slots – many on an NFS share, two on a spinning disk.
+
+        *on_progress* receives a snapshot (``_progress``) every
+        ``progress.PROGRESS_INTERVAL`` seconds while the scan runs and once
+        more with ``state="done"`` at the end.
+
+        ``processed`` counts rows committed to the DB; rows it refused (a
+        copy of an already-indexed file) are ``rejected``.  If the walk
+        itself fails, the scan is returned with ``complete=False`` and the
+        error, state ``"error"``, and the journal is left as it was.
+        """
         scan_root = root_path or self.root_path
 
         if not scan_root.exists():
             self.logger.warning(f"Scan root does not exist: {scan_root}")
-            return {'processed': 0, 'errors': 0}
+            return {'processed': 0, 'errors': 0, 'total': 0}
 
         self.logger.info(f"Starting scan of {scan_root}")
 
-        # ─── collect files safely ────────────────────────────────────────
-        all_files = [p for p in safe_iter_files(scan_root)
-                     if self.is_media_file(p)]
-        self.logger.info("Queued %d files for processing", len(all_files))
+        io = iosched.limits_for(scan_root)
+        n = workers or max((os.cpu_count() or 2) * 2, io.read)
+        counts = {"hash": n, "probe": n, "preview": n, **(stage_workers or {})}
 
-        processed = 0
-        errors = 0
-
-        max_workers = workers or (os.cpu_count() or 2) * 2  # ← New
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_path = {
-                executor.submit(self.process_file, path): path
-                for path in all_files
-            }
-            for future in as_completed(future_to_path):
-                path = future_to_path[future]
-                try:
-                    if future.result():
-                        processed += 1
-                except Exception as e:
-                    self.logger.error(f"Error processing {path}: {e}")
-                    errors += 1
+        walk = {"dirs": 0, "unchanged": 0, "removed": 0, "bytes": 0}
+        walk_lock = threading.Lock()
+
+        def _on_diff(diff: DirDiff) -> None:
+            walk["dirs"]      += 1
+            walk["unchanged"] += diff.unchanged
+            walk["removed"]   += len(diff.removed)
+            if diff.removed and on_removed:
+                on_removed(diff.removed)
+
+        def _hash(item):
+            path, st = item
+            with iosched.reading(path, st):
+                metadata = self._basic_metadata(path, st, db=uow)
+            with walk_lock:
+                walk["bytes"] += st.st_size
+            return metadata
+
+        def _probe(metadata):
+            with iosched.reading(Path(metadata['path'])):
+                return self._probe_into(metadata, db=uow)
+
+        journal = ScanJournal(self.db, scan_root, full=full)
+
+        def _on_error(stage, item, exc):
+            path = item[0] if isinstance(item, tuple) else Path(item["path"])
+            journal.fail(path.parent)
 
+        with self.db.unit_of_work() as uow:
+            def _write(metadata):
+                uow.upsert(metadata)
+                self.logger.info(f"Indexed: {Path(metadata['path']).name}")
+                return metadata
+
+            rate = {"t": time.monotonic(), "bytes": 0}
+
+            def _tick(stats, state="running"):
+                now = time.monotonic()
+                with walk_lock:
+                    done_bytes = walk["bytes"]
+                dt = max(now - rate["t"], 1e-6)
+                bps = (done_bytes - rate["bytes"]) / dt
+                rate.update(t=now, bytes=done_bytes)
+                on_progress(self._progress(scan_root, stats, walk, journal, bps, state,
+                                           uow.written))
+
+            pipe = Pipeline(self.iter_changes(scan_root, _on_diff, journal, io.list),
+                            name="scan", on_error=_on_error,
+                            on_progress=_tick if on_progress else None,
+                            progress_interval=PROGRESS_INTERVAL, stages=[
+                Stage("hash",    _hash,              workers=counts["hash"]),
+                Stage("probe",   _probe,             workers=counts["probe"]),
+                Stage("preview", self._preview_into, workers=counts["preview"]),
+                Stage("write",   _write,             workers=1),
+            ])
+            stats = pipe.run()
+        complete = stats["source_error"] is None
+        if complete:
+            journal.commit()
+        else:
+            self.logger.error(f"Scan of {scan_root} incomplete: walk failed with "
+                              f"{stats['source_error']}")
+        if on_progress:
+            # whole-scan average for the closing snapshot
+            rate.update(t=time.monotonic() - max(stats["elapsed_s"], 1e-6), bytes=0)
+            _tick(pipe.stats(), "done" if complete else "error")
+
+        st = stats["stages"]
+        processed = uow.written
+        errors = sum(s["errors"] for s in st.values())
         self.logger.info(f"Scan complete: {processed} processed, {errors} errors")
         return {
             'processed': processed,
+            'rejected': len(uow.rejected),
+            'complete': complete,
+            'source_error': stats["source_error"],
             'errors': errors,
-            'total_files': len(all_files),
-        }
\ No newline at end of file
+            'total': stats["emitted"] + walk["unchanged"],
+            'skipped': walk["unchanged"],
+            'removed': walk["removed"],
+            'dirs_skipped': journal.skipped,
+            'io': io.to_dict(),
+            'stages': st,
+        }
+
+    @staticmethod
+    def _progress(root: Path, stats: Dict[str, Any], walk: Dict[str, int],
+                  journal: ScanJournal, bytes_per_s: float, state: str,
+                  committed: int = 0) -> Dict[str, Any]:
+        """One progress snapshot of ``bulk_scan`` (counts, throughput, queues)."""
+        st = stats["stages"]
+        return {
+            'state': state,
+            'root': root.as_posix(),
+            'elapsed_s': stats["elapsed_s"],
+            'discovered': stats["emitted"] + walk["unchanged"],
+            'skipped': walk["unchanged"],
+            'hashed': st["hash"]["out"],
+            'probed': st["probe"]["out"],
+            'previewed': st["preview"]["out"],
+            'written': st["write"]["out"],
+            'committed': committed,
+            'errors': sum(s["errors"] for s in st.values()),
+            'removed': walk["removed"],
+            'dirs': walk["dirs"],
+            'dirs_skipped': journal.skipped,
+            'bytes_hashed': walk["bytes"],
+            'bytes_per_s': round(bytes_per_s),
+            'queues': {name: {'queued': s["queued"], 'max': s["queue_max"],
+                              'busy_s': s["busy_s"], 'workers': s["workers"]}
+                       for name, s in st.items()},
+        }
@@ -1,6 +1,7 @@
 -- /video/schema.sql
 -- Database schema for media indexer
--- This file shows you exactly what tables are created
+-- Reference only: the live schema is built by the ordered steps in
+-- video/db.py:MIGRATIONS (PRAGMA user_version = 9).  Keep this in sync.
 
 PRAGMA foreign_keys = ON;
 PRAGMA journal_mode = WAL;
@@ -8,7 +9,7 @@ PRAGMA journal_mode = WAL;
 -- Main files table - stores metadata about all indexed media files
 CREATE TABLE IF NOT EXISTS files (
     id            TEXT PRIMARY KEY,        -- SHA1 hash of file content
-    path          TEXT UNIQUE NOT NULL,    -- Full path to file
+    path          TEXT UNIQUE NOT NULL,    -- Full path to file (UNIQUE index also serves prefix range scans)
     size_bytes    INTEGER NOT NULL,        -- File size in bytes
     mtime         TEXT NOT NULL,           -- Last modified time (ISO-8601)
     mime          TEXT,                    -- MIME type (video/mp4, image/jpeg, etc.)
@@ -17,13 +18,80 @@ CREATE TABLE IF NOT EXISTS files (
     duration_s    REAL,                    -- Video duration in seconds (NULL for images/unknown)
     batch         TEXT,                    -- Album/folder name (for grouping)
     sha1          TEXT,                    -- SHA1 hash (compatibility with existing scripts)
-    created_at    TEXT NOT NULL            -- When this record was created (ISO-8601)
+    created_at    TEXT NOT NULL,           -- When this record was created (ISO-8601)
+    version       INTEGER DEFAULT 1,       -- Bumped when content (sha1) changes at the same path
+    parent_id     TEXT,                    -- id of the previous version
+    preview_path  TEXT,                    -- Generated preview / thumbnail
+    sort_order    INTEGER DEFAULT 0,       -- Manual order inside a batch
+    tags          TEXT NOT NULL DEFAULT '[]', -- JSON list of tags
+    updated_at    TEXT,                    -- Last time the record was written (ISO-8601)
+    folder_id     INTEGER                  -- folders.id of the parent directory
 );
 
+-- Directory tree for the Explorer: each file's parent directory plus all
+-- ancestors.  Filled on upsert; empty folders are pruned bottom-up by the
+-- files_folder_ad / folders_prune_ad triggers (PRAGMA recursive_triggers=ON).
+CREATE TABLE IF NOT EXISTS folders (
+    id        INTEGER PRIMARY KEY,
+    parent_id INTEGER REFERENCES folders(id),
+    path      TEXT UNIQUE NOT NULL,
+    name      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_folders_parent ON folders(parent_id);
+
 -- Indexes for fast queries
-CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime);
-CREATE INDEX IF NOT EXISTS idx_files_batch ON files(batch);  
-CREATE INDEX IF NOT EXISTS idx_files_sha1 ON files(sha1);
+CREATE INDEX IF NOT EXISTS idx_files_mtime       ON files(mtime);
+CREATE INDEX IF NOT EXISTS idx_files_sha1        ON files(sha1);
+CREATE INDEX IF NOT EXISTS idx_files_created     ON files(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_files_batch_order ON files(batch, sort_order, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_files_parent      ON files(parent_id) WHERE parent_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_files_folder      ON files(folder_id);
+
+-- Directory journal for incremental scans: a directory whose mtime_ns is
+-- unchanged since last_scanned is not listed again (`video scan --full`
+-- ignores it).  mtime_ns = -1 forces a relisting next time.
+CREATE TABLE IF NOT EXISTS scan_dirs (
+    path         TEXT PRIMARY KEY,
+    mtime_ns     INTEGER NOT NULL,
+    entry_count  INTEGER NOT NULL,         -- files + sub-directories when listed
+    last_scanned REAL    NOT NULL          -- unix time of that listing
+) WITHOUT ROWID;
+
+-- Digest cache for video/fingerprint.py: one row per (inode version, algo).
+-- A new size/mtime for the same dev+ino drops the older rows.
+CREATE TABLE IF NOT EXISTS fingerprints (
+    dev      INTEGER NOT NULL,             -- st_dev
+    ino      INTEGER NOT NULL,             -- st_ino
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    algo     TEXT    NOT NULL,             -- quick | sha1 | sha256 …
+    digest   TEXT    NOT NULL,
+    PRIMARY KEY (dev, ino, size, mtime_ns, algo)
+) WITHOUT ROWID;
+
+-- Full ffprobe output per content id (files.id), so moved / renamed /
+-- re-ingested files are never probed twice, plus flat columns for filters.
+CREATE TABLE IF NOT EXISTS media_tech (
+    fingerprint TEXT PRIMARY KEY,          -- files.id of the content
+    container   TEXT,                      -- format_name (mov,mp4,m4a,…)
+    duration_s  REAL,
+    bitrate     INTEGER,                   -- bits/s (container)
+    width       INTEGER,                   -- first non-cover-art video stream
+    height      INTEGER,
+    vcodec      TEXT,
+    vprofile    TEXT,
+    pix_fmt     TEXT,
+    fps         REAL,                      -- avg_frame_rate
+    rotation    INTEGER,                   -- degrees, 0-359
+    acodec      TEXT,                      -- first audio stream
+    channels    INTEGER,
+    sample_rate INTEGER,
+    streams     INTEGER,
+    probe_json  TEXT NOT NULL,             -- ffprobe -show_format -show_streams
+    probed_at   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_media_tech_video ON media_tech(vcodec, height, width);
+CREATE INDEX IF NOT EXISTS idx_media_tech_audio ON media_tech(acodec);
 
 -- Sync tracking table (compatible with your existing photo sync script)
 CREATE TABLE IF NOT EXISTS copies (
@@ -32,20 +100,52 @@ CREATE TABLE IF NOT EXISTS copies (
     ts   REAL                              -- Timestamp when copy was made
 );
 
+-- Full-text search (both kept in sync by the files_ai/ad/au triggers):
+--   files_fts  token index over path / mime / batch (short-query prefix search)
+--   files_tri  trigram index over path / batch (substring search, bm25 ranked)
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts
+USING fts5(path, mime, batch, content='files', content_rowid='rowid');
+CREATE VIRTUAL TABLE IF NOT EXISTS files_tri
+USING fts5(path, batch, content='files', content_rowid='rowid', tokenize='trigram');
+
+-- Materialised counters for get_stats() (kept in sync by files_stats_* triggers;
+-- `video stats --rebuild` recomputes them).  NULL mime is stored as ''.
+CREATE TABLE IF NOT EXISTS stats_totals (
+    id    INTEGER PRIMARY KEY CHECK (id = 1),
+    files INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS stats_mime (
+    mime  TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    size  INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS stats_batch (
+    batch TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    size  INTEGER NOT NULL DEFAULT 0
+);
+
 -- Example queries you can run:
 
 -- Get recent files
--- SELECT * FROM files ORDER BY created_at DESC LIMIT 10;
+-- SELECT * FROM files ORDER BY created_at DESC, id DESC LIMIT 10;
 
 -- Get files by album/batch
--- SELECT * FROM files WHERE batch = 'YourAlbumName' ORDER BY mtime DESC;
+-- SELECT * FROM files WHERE batch = 'YourAlbumName' ORDER BY sort_order, created_at DESC;
+
+-- Get everything below a folder (index range scan instead of LIKE)
+-- SELECT * FROM files WHERE path >= '/media/album/' AND path < '/media/album0';
+
+-- Files directly inside one folder
+-- SELECT f.* FROM folders d JOIN files f ON f.folder_id = d.id WHERE d.path = '/media/album';
+
+-- All 4K HEVC
+-- SELECT f.path FROM media_tech t JOIN files f ON f.id = t.fingerprint
+--  WHERE t.vcodec = 'hevc' AND t.height >= 2160;
 
 -- Get statistics
--- SELECT 
---   COUNT(*) as total_files,
---   SUM(size_bytes) as total_bytes,
---   COUNT(DISTINCT batch) as total_batches
--- FROM files;
-
--- Get files by type  
--- SELECT mime, COUNT(*) as count FROM files GROUP BY mime ORDER BY count DESC;
\ No newline at end of file
+-- SELECT files, bytes FROM stats_totals;
+
+-- Get files by type
+-- SELECT mime, count FROM stats_mime ORDER BY count DESC;
@@ -12,12 +12,13 @@ the class still satisfies StorageEngine with just MediaDB.
 from __future__ import annotations
 
 import os
+import json
 import asyncio
 import logging
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from video.db import MediaDB
+from video.db import MediaDB, encode_cursor, decode_cursor
 from video.storage.base   import StorageEngine          # abstract interface
 from video.storage.wal_proxy import WALProxyDB
 from video.config import DB_PATH
@@ -119,8 +120,19 @@ class AutoStorage(StorageEngine):
     def get_video(self, sha1: str) -> Optional[Dict[str, Any]]:
         return self._db.get_file_by_sha1(sha1)
 
-    def list_videos(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        return self._db.list_recent(limit=limit)[offset:]
+    def list_videos(self, limit: int = 50, offset: int = 0,
+                    cursor: str | None = None) -> List[Dict[str, Any]]:
+        """
+        Newest-first page of videos.  Prefer *cursor* (keyset, O(limit));
+        *offset* is kept for old callers and is pushed down into SQL.
+        """
+        if cursor or not offset:
+            return [dict(r) for r in self._db.list_recent(limit=limit, cursor=cursor)]
+        rows = self._db.query(
+            "SELECT * FROM files ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        )
+        return [dict(r) for r in rows]
 
     # ------------------------------------------------------------------ #
     # Explorer & DAM convenience helpers                                 #
@@ -141,36 +153,35 @@ class AutoStorage(StorageEngine):
             GROUP  BY COALESCE(batch,'_UNSORTED')
             ORDER  BY last_added DESC
         """
-        return [dict(r) for r in self._db.execute(q)]
+        return [dict(r) for r in self._db.query(q)]
 
     # ───── cards for one batch ─────────────────────────────────────────
-    def list_by_batch(self, batch: str) -> list[dict]:
-        q = """
-            SELECT *
-            FROM   files
-            WHERE  COALESCE(batch,'_UNSORTED') = ?
-            ORDER  BY sort_order, created_at DESC
-        """
-        return [dict(r) for r in self._db.execute(q, (batch,))]
-
-    # ───── flat folder list (tree is built client-side) ────────────────
-    def list_all_folders(self) -> list[dict]:
-        rows     = self._db.execute("SELECT path FROM files")
-        folders  = {os.path.dirname(r["path"]) for r in rows}
+    def list_by_batch(self, batch: str, limit: int | None = None,
+                      cursor: str | None = None) -> list[dict]:
+        """Display-ordered rows of one batch; keyset-paged when *limit* given."""
+        return [dict(r) for r in self._db.list_by_batch(batch, limit, cursor)]
+
+    def page_by_batch(self, batch: str, limit: int = 50,
+                      cursor: str | None = None) -> dict:
+        return self._db.page_by_batch(batch, limit, cursor)
+
+    # ───── folder tree (flat list; tree is built client-side) ──────────
+    def list_all_folders(self, parent: Path | None = None) -> list[dict]:
+        """Every folder, or only the direct children of *parent*."""
+        rows = self._db.list_folders(parent.as_posix() if parent else None)
         return [
             {
-                "id":        f"folder_{abs(hash(f))}",
-                "name":      os.path.basename(f) or f,
-                "path":      f,
-                "parent_id": f"folder_{abs(hash(os.path.dirname(f)))}",
+                "id":        f"folder_{r['id']}",
+                "name":      r["name"],
+                "path":      r["path"],
+                "parent_id": f"folder_{r['parent_id']}" if r["parent_id"] else None,
             }
-            for f in folders
+            for r in rows
         ]
 
     # ───── direct children of one folder ───────────────────────────────
     def list_assets(self, folder: Path) -> list[dict]:
-        like = f"{folder.as_posix().rstrip('/')}/%"
-        rows = self._db.execute("SELECT * FROM files WHERE path LIKE ?", (like,))
+        rows = self._db.list_folder_files(folder.as_posix())
 
         def _row_to_asset(r):
             mime = r["mime"] or ""
@@ -188,7 +199,7 @@ class AutoStorage(StorageEngine):
                 "modified": r["updated_at"],
                 "path"    : r["path"],
                 "tags"    : json.loads(r["tags"] or "[]"),
-                "status"  : r.get("status", "processed"),
+                "status"  : "processed",
                 "thumbnail": f"/static/thumbs/{r['sha1']}_0.jpg",
             }
 
@@ -196,22 +207,32 @@ class AutoStorage(StorageEngine):
 
     # ───── drag-and-drop sort-order persistence ────────────────────────
     def set_position(self, sha1: str, pos: int) -> None:
-        self._db.execute("UPDATE files SET sort_order=? WHERE sha1=?", (pos, sha1))
-        self._db.commit()
+        with self._db.writer() as cx:
+            cx.execute("UPDATE files SET sort_order=? WHERE sha1=?", (pos, sha1))
 
     # ------------------------------------------------------------------ #
     # Simple passthroughs to MediaDB that higher layers rely on          #
     # ------------------------------------------------------------------ #
-    def list_recent(self, limit: int = 50) -> list[dict]:
-        rows = self._db.execute(
-            "SELECT sha1, path, width_px AS width, height_px AS height,"
-            "       mime, created_at "
-            "FROM   files "
-            "ORDER  BY created_at DESC "
-            "LIMIT  ?",
-            (limit,),
-        )
-        return [dict(r) for r in rows]
+    _RECENT_COLS = ("SELECT id, sha1, path, width_px AS width, height_px AS height,"
+                    "       mime, created_at "
+                    "FROM   files ")
+
+    def list_recent(self, limit: int = 50, cursor: str | None = None) -> list[dict]:
+        return self.page_recent(limit, cursor)["items"]
+
+    def page_recent(self, limit: int = 50, cursor: str | None = None) -> dict:
+        """Keyset page of the recent feed: ``{"items", "next_cursor"}``."""
+        sql, params = self._RECENT_COLS, []
+        if cursor:
+            created_at, fid = decode_cursor(cursor)
+            sql += "WHERE (created_at, id) < (?, ?) "
+            params += [created_at, fid]
+        sql += "ORDER  BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        rows = [dict(r) for r in self._db.query(sql, params)]
+        nxt = (encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+               if len(rows) == limit else None)
+        return {"items": rows, "next_cursor": nxt}
 
     # ---- VECTORS / SEARCH --------------------------------------------------
 
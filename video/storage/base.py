@@ -19,7 +19,7 @@ class StorageEngine(ABC):
 
     @abstractmethod
     def list_videos(
-        self, limit: int = 50, offset: int = 0
+        self, limit: int = 50, offset: int = 0, cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]: ...
 
     # ------------------------------------------------------------
@@ -33,7 +33,7 @@ class StorageEngine(ABC):
         return []
 
     # ---------- explorer helpers ----------
-    def list_all_folders(self) -> List[Dict[str, Any]]:
+    def list_all_folders(self, parent: Optional[Path] = None) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
     def list_assets(self, folder: Path) -> List[Dict[str, Any]]:
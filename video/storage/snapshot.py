@@ -0,0 +1,190 @@
+# video/storage/snapshot.py
+"""
+Online, incremental SQLite snapshots.
+
+    svc = SnapshotService(db_path, "/backups/media_index.sqlite3", keep=3)
+    svc.start(interval=300)          # background thread
+    svc.snapshot(force=True)         # one-off
+
+Uses ``sqlite3.Connection.backup`` in steps of *pages* pages, sleeping
+between steps so writers on the live DB keep making progress.  A snapshot
+is skipped when ``PRAGMA data_version`` shows no commit since the last one.
+Generations rotate as ``name``, ``name.1`` … ``name.<keep-1>``; the newest
+copy is only renamed into place once the backup completed.  An optional
+*checkpoint* callable runs after each snapshot taken, so the caller that
+owns the writer (``MediaDB.checkpoint("TRUNCATE")``) can trim the WAL.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+log = logging.getLogger("video.snapshot")
+
+SNAPSHOT_KEEP     = int(os.getenv("VIDEO_DB_BACKUP_KEEP", "3"))
+SNAPSHOT_PAGES    = int(os.getenv("VIDEO_DB_BACKUP_PAGES", "1024"))
+SNAPSHOT_SLEEP_MS = float(os.getenv("VIDEO_DB_BACKUP_SLEEP_MS", "20"))
+MAX_RESTARTS      = 3       # then fall back to a single-step copy
+
+
+class _Restarted(Exception):
+    """Raised from the progress hook when a busy source keeps resetting the copy."""
+
+
+class SnapshotService:
+    """Paged backups of one database file into rotated generations."""
+
+    def __init__(self,
+                 db_path: str | Path,
+                 dest: str | Path,
+                 keep: int = SNAPSHOT_KEEP,
+                 pages: int = SNAPSHOT_PAGES,
+                 step_sleep_ms: float = SNAPSHOT_SLEEP_MS,
+                 checkpoint: Optional[Callable[[], Any]] = None) -> None:
+        self.db_path = Path(db_path)
+        self.dest    = Path(dest)
+        if self.dest.resolve() == self.db_path.resolve():
+            raise ValueError(f"snapshot target {self.dest} is the live database")
+        self.keep       = max(1, keep)
+        self.pages      = max(1, pages)
+        self.step_sleep = step_sleep_ms / 1000.0
+        self.checkpoint = checkpoint
+        self._src: Optional[sqlite3.Connection] = None
+        self._last_version: Optional[int] = None
+        self._lock   = threading.Lock()
+        self._stop   = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last: Dict[str, Any] = {}
+
+    # -- source connection ---------------------------------------------------
+    def _source(self) -> sqlite3.Connection:
+        # data_version is per connection, so the same one is kept for the
+        # life of the service; read-only so it never takes a write lock.
+        if self._src is None:
+            self._src = sqlite3.connect(
+                f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True,
+                timeout=30, check_same_thread=False)
+        return self._src
+
+    def data_version(self) -> int:
+        return self._source().execute("PRAGMA data_version").fetchone()[0]
+
+    # -- snapshot ------------------------------------------------------------
+    def snapshot(self, force: bool = False) -> Optional[Path]:
+        """
+        Copy the DB into ``dest`` (rotating older generations).
+
+        Returns the snapshot path, or ``None`` when nothing changed since the
+        previous snapshot and *force* is false.
+        """
+        with self._lock:
+            version = self.data_version()
+            if not force and version == self._last_version and self.dest.exists():
+                return None
+
+            self.dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.dest.with_name(self.dest.name + ".tmp")
+            tmp.unlink(missing_ok=True)
+            t0 = time.perf_counter()
+            try:
+                restarts = self._copy(tmp)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+            self._rotate()
+            tmp.replace(self.dest)
+
+            self._last_version = version
+            self.last = {
+                "path"    : str(self.dest),
+                "bytes"   : self.dest.stat().st_size,
+                "seconds" : round(time.perf_counter() - t0, 3),
+                "restarts": restarts,
+                "ts"      : time.time(),
+            }
+            log.info("DB snapshot → %s (%d bytes, %.2fs)",
+                     self.dest, self.last["bytes"], self.last["seconds"])
+            if self.checkpoint is not None:
+                self._checkpoint(version)
+            return self.dest
+
+    def _checkpoint(self, version: int) -> None:
+        # a checkpoint bumps data_version by one without changing any data;
+        # adopt the new value only if nothing else committed meanwhile
+        try:
+            before = self.data_version()
+            self.checkpoint()
+            after = self.data_version()
+        except Exception as exc:                # busy readers, closed DB …
+            log.warning("WAL checkpoint after snapshot failed: %r", exc)
+            return
+        if before == version and after == before + 1:
+            self._last_version = after
+
+    def _copy(self, tmp: Path) -> int:
+        src = self._source()
+        state = {"remaining": None, "restarts": 0}
+
+        def _progress(status: int, remaining: int, total: int) -> None:
+            prev = state["remaining"]
+            if prev is not None and remaining > prev:      # source changed → restart
+                state["restarts"] += 1
+                if state["restarts"] > MAX_RESTARTS:
+                    raise _Restarted
+            state["remaining"] = remaining
+            if remaining and self.step_sleep:
+                time.sleep(self.step_sleep)
+
+        dst = sqlite3.connect(tmp)
+        try:
+            try:
+                src.backup(dst, pages=self.pages, progress=_progress)
+            except _Restarted:
+                # the DB is too busy for a paged copy to converge: take one
+                # consistent pass under a single read transaction instead
+                log.info("DB snapshot restarted %d× – copying in one step",
+                         state["restarts"])
+                src.backup(dst, pages=-1)
+            # the copy inherits WAL mode; make it a self-contained single file
+            dst.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dst.close()
+        return state["restarts"]
+
+    def _rotate(self) -> None:
+        """dest → dest.1 → … → dest.<keep-1>; the oldest falls off."""
+        if self.keep == 1:
+            return                      # tmp.replace(dest) overwrites atomically
+        gens = [self.dest] + [self.dest.with_name(f"{self.dest.name}.{i}")
+                              for i in range(1, self.keep)]
+        gens[-1].unlink(missing_ok=True)
+        for newer, older in zip(reversed(gens[:-1]), reversed(gens[1:])):
+            if newer.exists():
+                newer.replace(older)
+
+    # -- background loop -----------------------------------------------------
+    def start(self, interval: float) -> threading.Thread:
+        def _loop() -> None:
+            while not self._stop.is_set():
+                try:
+                    self.snapshot()
+                except Exception as exc:
+                    log.warning("DB snapshot failed: %r", exc)
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=_loop, daemon=True, name="db-backup")
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._src is not None:
+            self._src.close()
+            self._src = None
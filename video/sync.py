@@ -110,63 +110,65 @@ class PhotoSync:
             import photos
         except ImportError:
             return {"error": "Photos module not available"}
-        
+
         assets = photos.get_assets(album=album, include_videos=True)
         synced = skipped = 0
-        
-        for asset in assets:
-            # Get asset data
-            if asset.media_type == photos.MEDIA_TYPE_IMAGE:
-                data = asset.get_image_data()
-                ext = "jpg"
-            else:
-                data = asset.get_video_data()
-                ext = "mov"
-            
-            # Compute hash
-            sha1 = self.sha1_of_data(data)
-            
-            # Check if already copied
-            if self.db.already_copied(sha1):
-                skipped += 1
-                continue
-            
-            # Generate filename
-            ts = asset.creation_date.strftime("%Y%m%d_%H%M%S")
-            fname = f"{ts}_{synced:04d}.{ext}"
-            out_path = dest_dir / fname
-            
-            # Write file
-            try:
-                with open(out_path, "wb") as fp:
-                    fp.write(data)
-                
-                # Remember in sync table
-                self.db.remember_copy(sha1, out_path)
-                
-                # Index in main database
-                metadata = {
-                    'id': sha1,
-                    'path': out_path.as_posix(),
-                    'size_bytes': len(data),
-                    'mtime': asset.creation_date.isoformat(),
-                    'mime': f"image/{ext}" if ext == "jpg" else f"video/{ext}",
-                    'width_px': None,
-                    'height_px': None,
-                    'duration_s': None,
-                    'batch': album_name,
-                    'sha1': sha1,
-                    'created_at': datetime.now().isoformat()
-                }
-                self.db.upsert_file(metadata)
-                
-                synced += 1
-                self.logger.info(f"Synced: {fname}")
-                
-            except Exception as e:
-                self.logger.error(f"Failed to write {out_path}: {e}")
-                continue
-        
+
+        # Batch the index rows; one commit per VIDEO_DB_BATCH_ROWS assets
+        with self.db.unit_of_work() as uow:
+            for asset in assets:
+                # Get asset data
+                if asset.media_type == photos.MEDIA_TYPE_IMAGE:
+                    data = asset.get_image_data()
+                    ext = "jpg"
+                else:
+                    data = asset.get_video_data()
+                    ext = "mov"
+
+                # Compute hash
+                sha1 = self.sha1_of_data(data)
+
+                # Check if already copied
+                if uow.already_copied(sha1):
+                    skipped += 1
+                    continue
+
+                # Generate filename
+                ts = asset.creation_date.strftime("%Y%m%d_%H%M%S")
+                fname = f"{ts}_{synced:04d}.{ext}"
+                out_path = dest_dir / fname
+
+                # Write file
+                try:
+                    with open(out_path, "wb") as fp:
+                        fp.write(data)
+
+                    # Remember in sync table – commits with the index row below
+                    uow.remember_copy(sha1, out_path)
+
+                    # Index in main database
+                    metadata = {
+                        'id': sha1,
+                        'path': out_path.as_posix(),
+                        'size_bytes': len(data),
+                        'mtime': asset.creation_date.isoformat(),
+                        'mime': f"image/{ext}" if ext == "jpg" else f"video/{ext}",
+                        'width_px': None,
+                        'height_px': None,
+                        'duration_s': None,
+                        'batch': album_name,
+                        'sha1': sha1,
+                        'created_at': datetime.now().isoformat()
+                    }
+                    uow.upsert(metadata)
+
+                    synced += 1
+                    self.logger.info(f"Synced: {fname}")
+
+                except Exception as e:
+                    self.logger.error(f"Failed to write {out_path}: {e}")
+                    continue
+
         result = {
             "category": album.title.split("/")[0] if "/" in album.title else "unknown",
             "album": album_name,
@@ -174,10 +176,10 @@ class PhotoSync:
             "skipped": skipped,
             "dest": str(dest_dir)
         }
-        
+
         self.logger.info(f"Sync complete: {synced} new, {skipped} skipped")
         return result
-    
+
     def sync_from_shortcuts(self, stdin_json: str = None) -> str:
         """
         Main entry point for Shortcuts integration
@@ -217,7 +219,7 @@ class PhotoSync:
     
     def get_synced_albums(self) -> list:
         """Get list of albums that have been synced"""
-        with self.db.conn() as cx:
+        with self.db.reader() as cx:
             result = cx.execute("""
                 SELECT batch, COUNT(*) as file_count, 
                        MIN(created_at) as first_sync,
@@ -232,7 +234,7 @@ class PhotoSync:
     def cleanup_orphaned_copies(self) -> int:
         """Remove copy records for files that no longer exist"""
         removed = 0
-        with self.db.conn() as cx:
+        with self.db.writer() as cx:
             copies = cx.execute("SELECT sha1, dest FROM copies").fetchall()
             for row in copies:
                 if not Path(row['dest']).exists():
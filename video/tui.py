@@ -6,6 +6,7 @@ Textual dashboard for That DAM Toolbox – uses the existing CLI for data.
 from __future__ import annotations
 
 import json, asyncio
+from pathlib import Path
 from typing import Any
 
 from textual.app import App, ComposeResult
@@ -34,8 +35,12 @@ class Dashboard(App):
         Binding("r", "refresh_all", "Refresh"),
         Binding("/", "search_prompt", "Search"),
         Binding("b", "scan_batch", "Quick batch scan"),
+        Binding("n", "recent_next", "Recent ▸ next page"),
+        Binding("p", "recent_prev", "Recent ◂ prev page"),
     ]
 
+    RECENT_PAGE = 100
+
     # ─── layout ───────────────────────────────────────────────────────────
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
@@ -57,6 +62,9 @@ class Dashboard(App):
 
     # ─── lifecycle ────────────────────────────────────────────────────────
     async def on_mount(self) -> None:
+        # keyset cursors of the recent pages visited so far ([None] = page 1)
+        self._recent_cursors: list[str | None] = [None]
+        self._recent_next: str | None = None
         self.set_interval(5, self.action_refresh_all)
         await self.action_refresh_all()
 
@@ -68,6 +76,16 @@ class Dashboard(App):
             self._load_batches(),
         )
 
+    async def action_recent_next(self) -> None:
+        if self._recent_next:
+            self._recent_cursors.append(self._recent_next)
+            await self._load_recent()
+
+    async def action_recent_prev(self) -> None:
+        if len(self._recent_cursors) > 1:
+            self._recent_cursors.pop()
+            await self._load_recent()
+
     async def action_scan_batch(self) -> None:
         await self._show_spinner("Scanning…")
         res = await asyncio.to_thread(run_cli_json, {"action": "scan", "workers": 4})
@@ -95,10 +113,14 @@ class Dashboard(App):
 
     async def _load_recent(self) -> None:
         tbl = self.query_one("#tbl-recent", DataTable)
-        rows = await asyncio.to_thread(run_cli_json, {"action": "recent", "limit": 100})
+        page = await asyncio.to_thread(run_cli_json, {
+            "action": "recent", "limit": self.RECENT_PAGE,
+            "cursor": self._recent_cursors[-1], "page": True,
+        })
+        self._recent_next = page["next_cursor"]
         _table_clear_and_cols(tbl, "Batch", "Filename", "Added")
-        for r in rows:
-            tbl.add_row(r["batch"] or "-", r["name"], r["created"][:19])
+        for r in page["items"]:
+            tbl.add_row(r["batch"] or "-", Path(r["path"]).name, r["created_at"][:19])
 
     async def _load_batches(self) -> None:
         tbl = self.query_one("#tbl-batches", DataTable)
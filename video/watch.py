@@ -0,0 +1,413 @@
+# video/watch.py
+"""
+Continuous incremental indexing – ``video watch``.
+
+    w = Watcher(scanner)             # all config.get_all_roots()
+    w.run()                          # blocks until w.stop()
+
+Local roots are watched with Linux inotify (ctypes, no third-party deps):
+one watch per directory, re-armed as directories appear.  Events are
+coalesced per path and a file is only indexed once it has been quiet for
+``VIDEO_WATCH_DEBOUNCE`` seconds *and* its size/mtime stopped moving, so a
+copy in progress is picked up once, when it is complete.  Ready files go
+through ``Scanner.process_file`` in one unit of work per burst.
+
+Roots on network filesystems (see ``storage.wal_proxy._NET_FS``) don't
+deliver inotify events for remote writers; they – and any root where
+inotify is unavailable or the watch limit runs out – are rescanned with
+the diff scanner (``Scanner.bulk_scan``) every ``VIDEO_WATCH_POLL_SECS``.
+A kernel queue overflow, or an event that could not be handled, triggers
+the same diff scan for the root it hit.  Those rescans ignore the
+directory journal: with events lost, an unchanged directory mtime no
+longer proves that the files in it were not rewritten in place.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from . import config
+from .scanner import SKIP_DIRS, Scanner, walk_dirs
+
+log = logging.getLogger("video.watch")
+
+WATCH_DEBOUNCE = float(os.getenv("VIDEO_WATCH_DEBOUNCE", "2"))      # quiet seconds
+WATCH_POLL_SECS = float(os.getenv("VIDEO_WATCH_POLL_SECS", "300"))   # fallback rescans
+
+# ─── inotify (linux/inotify.h) ─────────────────────────────────────────────
+IN_MODIFY      = 0x00000002
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ONLYDIR     = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR       = 0x40000000
+IN_NONBLOCK    = os.O_NONBLOCK
+IN_CLOEXEC     = os.O_CLOEXEC
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF |
+              IN_ONLYDIR | IN_DONT_FOLLOW)
+
+_EVENT = struct.Struct("iIII")          # wd, mask, cookie, len
+
+
+class Inotify:
+    """Minimal ctypes binding: one non-blocking inotify fd."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+
+    def add_watch(self, path: Path, mask: int = WATCH_MASK) -> int:
+        wd = self._add(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e), str(path))
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm(self.fd, wd)
+
+    def read(self) -> List[Tuple[int, int, int, str]]:
+        """Drain pending events as ``(wd, mask, cookie, name)``."""
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            off = 0
+            while off < len(buf):
+                wd, mask, cookie, n = _EVENT.unpack_from(buf, off)
+                off += _EVENT.size
+                name = os.fsdecode(buf[off:off + n].rstrip(b"\0"))
+                off += n
+                events.append((wd, mask, cookie, name))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def is_network_fs(path: Path) -> bool:
+    """True for mounts inotify can't see remote writes on (or can't tell)."""
+    from .storage.wal_proxy import _NET_FS, _fs_type
+    try:
+        return _fs_type(path) in _NET_FS
+    except Exception as exc:                    # no `stat -f`, vanished mount …
+        log.debug("fs type of %s unknown (%s) – polling it", path, exc)
+        return True
+
+
+# ─── watcher ───────────────────────────────────────────────────────────────
+class Watcher:
+    """Feed filesystem changes under *roots* into *scanner* until stopped."""
+
+    def __init__(self,
+                 scanner: Scanner,
+                 roots: Optional[List[Path]] = None,
+                 debounce: float = WATCH_DEBOUNCE,
+                 poll_interval: float = WATCH_POLL_SECS,
+                 initial_scan: bool = True) -> None:
+        self.scanner       = scanner
+        self.db            = scanner.db
+        self.roots         = [Path(r) for r in (roots or config.get_all_roots())]
+        self.debounce      = debounce
+        self.poll_interval = poll_interval
+        self.initial_scan  = initial_scan
+
+        self._ino: Optional[Inotify] = None
+        self._wd: Dict[int, Path] = {}          # wd → directory
+        self._dirs: Dict[Path, int] = {}        # directory → wd
+        self._root_of: Dict[int, Path] = {}     # wd → root it belongs to
+        # path → (deadline, size, mtime_ns) of files still settling
+        self._pending: Dict[Path, Tuple[float, int, int]] = {}
+        self._removed: Set[Path] = set()
+        self._rescan: Set[Path] = set()         # roots needing a diff scan
+        self._full: Set[Path] = set()           # … of which: ignore the journal
+        self._polled: Dict[Path, float] = {}    # root → next poll time
+        self._stop = threading.Event()
+        self.stats = {"events": 0, "indexed": 0, "removed": 0,
+                      "rescans": 0, "watches": 0, "rejected": 0, "errors": 0}
+
+    # -- setup ---------------------------------------------------------------
+    def _watch_tree(self, top: Path, root: Path) -> None:
+        """Add a watch on *top* and every directory below it."""
+        try:
+            for directory, _, _ in walk_dirs(top):
+                if directory in self._dirs:
+                    continue
+                try:
+                    wd = self._ino.add_watch(directory)
+                except OSError as exc:
+                    if exc.errno == errno.ENOSPC:
+                        log.warning("inotify watch limit reached under %s – "
+                                    "polling it instead (raise "
+                                    "fs.inotify.max_user_watches)", root)
+                        self._poll_root(root)
+                        return
+                    log.debug("cannot watch %s: %s", directory, exc)
+                    continue
+                self._wd[wd] = directory
+                self._dirs[directory] = wd
+                self._root_of[wd] = root
+        except OSError as exc:                  # removed/renamed before we got to it
+            log.debug("%s is gone: %s", top, exc)
+        finally:
+            self.stats["watches"] = len(self._wd)
+
+    def _poll_root(self, root: Path) -> None:
+        self._polled.setdefault(root, time.monotonic() + self.poll_interval)
+
+    def _full_rescan(self, roots) -> None:
+        """Diff-scan *roots* without trusting the directory journal."""
+        self._rescan.update(roots)
+        self._full.update(roots)
+
+    def _setup(self) -> None:
+        local = []
+        for root in self.roots:
+            if is_network_fs(root):
+                log.info("👀 %s is a network mount – diff scan every %.0fs",
+                         root, self.poll_interval)
+                self._poll_root(root)
+            else:
+                local.append(root)
+        if local:
+            try:
+                self._ino = Inotify()
+            except (OSError, AttributeError) as exc:  # not Linux / no inotify
+                log.warning("inotify unavailable (%s) – polling every root", exc)
+                for root in local:
+                    self._poll_root(root)
+                local = []
+        for root in local:
+            self._watch_tree(root, root)
+            log.info("👀 watching %s (%d dirs)", root, len(self._wd))
+        if self.initial_scan:
+            # catch up on anything that changed while nobody was watching
+            self._rescan.update(self.roots)
+
+    # -- event handling ------------------------------------------------------
+    def _touch(self, path: Path) -> None:
+        """(Re)arm the debounce timer of *path*."""
+        try:
+            st = path.stat()
+        except OSError:
+            self._pending.pop(path, None)
+            return
+        self._removed.discard(path)
+        self._pending[path] = (time.monotonic() + self.debounce,
+                               st.st_size, st.st_mtime_ns)
+
+    def _handle(self, wd: int, mask: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            log.warning("inotify queue overflow – diff-scanning watched roots")
+            self._full_rescan(set(self._root_of.values()))
+            return
+        directory = self._wd.get(wd)
+        if directory is None:
+            return
+        if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+            self._unwatch(directory)
+            return
+        if name in SKIP_DIRS:
+            return
+        path = directory / name
+
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(path, self._root_of[wd])
+                # files may have landed before the watch existed
+                try:
+                    for _, files, _ in walk_dirs(path):
+                        for entry in files:
+                            if self.scanner.is_media_file(Path(entry.name)):
+                                self._touch(Path(entry.path))
+                except OSError as exc:
+                    log.debug("%s is gone: %s", path, exc)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._unwatch_tree(path)
+                self._removed.add(path)
+            return
+
+        if not self.scanner.is_media_file(path):
+            return
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            self._pending.pop(path, None)
+            self._removed.add(path)
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY):
+            self._touch(path)
+
+    def _unwatch(self, directory: Path) -> None:
+        wd = self._dirs.pop(directory, None)
+        if wd is not None:
+            self._wd.pop(wd, None)
+            self._root_of.pop(wd, None)
+        self.stats["watches"] = len(self._wd)
+
+    def _unwatch_tree(self, top: Path) -> None:
+        """Drop the watches of *top* and below (a moved-away subtree)."""
+        for directory in [d for d in self._dirs if d == top or top in d.parents]:
+            wd = self._dirs[directory]
+            self._ino.rm_watch(wd)
+            self._unwatch(directory)
+
+    # -- draining ------------------------------------------------------------
+    def _ready(self, now: float) -> List[Path]:
+        """Files quiet for ``debounce`` seconds whose size/mtime held still."""
+        ready = []
+        for path, (deadline, size, mtime_ns) in list(self._pending.items()):
+            if deadline > now:
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                del self._pending[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._touch(path)               # still being written
+                continue
+            del self._pending[path]
+            ready.append(path)
+        return ready
+
+    def _flush_removed(self) -> None:
+        if not self._removed:
+            return
+        paths: List[str] = []
+        for p in self._removed:
+            if p.exists():
+                continue                        # moved back / recreated
+            paths.append(p.as_posix())
+            paths += self.db.paths_under(p.as_posix())
+        self._removed.clear()
+        if paths:
+            self.db.forget_scan_dirs(paths)
+            self.stats["removed"] += self.db.delete_paths(paths)
+
+    def _index(self, paths: List[Path]) -> None:
+        """
+        Index settled files in one unit of work.  Rows the DB refuses (a
+        copy of an already-indexed file) are counted as ``rejected``; if the
+        write itself fails the files are re-armed and tried again later.
+        """
+        uow = None
+        try:
+            with self.db.unit_of_work() as uow:
+                for path in paths:
+                    try:
+                        self.scanner.process_file(path, uow)
+                    except Exception as exc:    # noqa: BLE001
+                        self.stats["errors"] += 1
+                        log.error("watch: indexing %s failed: %s", path, exc)
+        except Exception as exc:                # noqa: BLE001
+            self.stats["errors"] += 1
+            log.error("watch: writing %d file(s) failed, will retry: %s", len(paths), exc)
+            for path in paths:
+                self._touch(path)
+        if uow is not None:
+            self.stats["indexed"]  += uow.written
+            self.stats["rejected"] += len(uow.rejected)
+
+    def _diff_scan(self, root: Path) -> None:
+        self.stats["rescans"] += 1
+
+        def _removed(paths: List[str]) -> None:
+            self.stats["removed"] += self.db.delete_paths(paths)
+
+        full = root in self._full
+        self._full.discard(root)
+        try:
+            res = self.scanner.bulk_scan(root, on_removed=_removed, full=full)
+            self.stats["indexed"] += res.get("processed", 0)
+        except Exception as exc:                # noqa: BLE001
+            log.error("watch: diff scan of %s failed: %s", root, exc)
+
+    def _timeout(self, now: float) -> Optional[float]:
+        due = [d for d, _, _ in self._pending.values()] + list(self._polled.values())
+        if self._rescan:
+            return 0.0
+        if not due:
+            return None
+        return max(0.0, min(due) - now)
+
+    # -- main loop -----------------------------------------------------------
+    def run(self) -> Dict[str, Any]:
+        """Block until ``stop()``; returns the counters."""
+        self._setup()
+        poller = select.poll()
+        if self._ino is not None:
+            poller.register(self._ino.fd, select.POLLIN)
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                timeout = self._timeout(now)
+                # wake at least once a second so stop() is noticed
+                ms = 1000 if timeout is None else min(1000, int(timeout * 1000) + 1)
+                if self._ino is not None and poller.poll(ms):
+                    for wd, mask, _, name in self._ino.read():
+                        self.stats["events"] += 1
+                        try:
+                            self._handle(wd, mask, name)
+                        except Exception as exc:    # noqa: BLE001
+                            self.stats["errors"] += 1
+                            root = self._root_of.get(wd)
+                            log.error("watch: event %#x on %r failed, rescanning "
+                                      "%s: %s", mask, name, root or "all roots", exc)
+                            self._full_rescan({root} if root else self.roots)
+                elif self._ino is None:
+                    self._stop.wait(ms / 1000)
+
+                now = time.monotonic()
+                for root, when in list(self._polled.items()):
+                    if when <= now:
+                        self._full_rescan({root})
+                        self._polled[root] = now + self.poll_interval
+                while self._rescan and not self._stop.is_set():
+                    self._diff_scan(self._rescan.pop())
+
+                try:
+                    self._flush_removed()
+                except Exception as exc:        # noqa: BLE001
+                    self.stats["errors"] += 1
+                    log.error("watch: dropping removed paths failed: %s", exc)
+                ready = self._ready(now)
+                if ready:
+                    self._index(ready)
+        finally:
+            if self._ino is not None:
+                self._ino.close()
+                self._ino = None
+        return dict(self.stats)
+
+    def start(self) -> threading.Thread:
+        t = threading.Thread(target=self.run, daemon=True, name="video-watch")
+        t.start()
+        return t
+
+    def stop(self) -> None:
+        self._stop.set()
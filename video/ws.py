@@ -2,7 +2,8 @@
 """
 video/ws.py
 
-→ /ws/control   – JSON control & status (list_devices, start_record, stop_record)
+→ /ws/control   – JSON control & status (list_devices, start_record, stop_record,
+                  scan_progress); scan jobs' progress is pushed as `scan_progress`
 → /ws/webrtc    – SDP signaling for ultra-low-latency WebRTC preview
 
 REFACTORED: All device operations now go through hwcapture module for DRY compliance.
@@ -27,6 +28,7 @@ from video.modules.hwcapture import (
     list_video_devices, HWAccelRecorder, stream_jpeg_frames,
     record_multiple, capture_multiple, has_hw
 )
+from video import progress
 
 router = APIRouter(prefix="/ws")
 _log = logging.getLogger("video.ws")
@@ -82,6 +84,10 @@ class WSResp:
     def frame_captured(device, data):
         return {"event":"frame","device":device,"data":data}
     
+    @staticmethod
+    def scan_progress(snapshot):
+        return {"event":"scan_progress","data":snapshot}
+    
     @staticmethod
     def error(message):
         return {"event":"error","data":message}
@@ -92,6 +98,7 @@ _clients_lock = asyncio.Lock()
 _recorders: Dict[str, HWAccelRecorder] = {}
 _status_tasks: Dict[str, asyncio.Task] = {}
 _recording_lock = asyncio.Lock()
+_progress_task: Optional[asyncio.Task] = None
 
 # ──────────── Device Manager - Central abstraction ──────────────
 class DeviceManager:
@@ -148,11 +155,19 @@ class FramePool:
 _video_pool = FramePool(width=1920, height=1080, pool_size=3)
 
 # ──────────── Control WebSocket (using DeviceManager) ──────────────
+async def _forward_progress():
+    """Push every job-progress update to all control clients."""
+    async for snap in progress.stream():
+        await _broadcast_control(WSResp.scan_progress(snap))
+
 @router.websocket("/control")
 async def ws_control(ws: WebSocket):
+    global _progress_task
     await ws.accept()
     async with _clients_lock:
         _control_clients.add(ws)
+    if _progress_task is None or _progress_task.done():
+        _progress_task = asyncio.create_task(_forward_progress())
     
     try:
         while True:
@@ -176,6 +191,14 @@ async def ws_control(ws: WebSocket):
             elif action == "stop_record":
                 await _stop_record(cmd, ws)
             
+            # --- Latest progress of one job (updates are pushed anyway) ---
+            elif action == "scan_progress":
+                snap = progress.latest(cmd.get("job_id", ""))
+                if snap:
+                    await ws.send_json(WSResp.scan_progress(snap))
+                else:
+                    await ws.send_json(WSResp.error("unknown job"))
+            
             # --- Stream control ---
             elif action == "select_stream":
                 device = cmd.get("device", "/dev/video0")